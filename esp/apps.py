@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EspConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'esp'
+
+    def ready(self):
+        # ✅ نشر تحديثات الـ AI jobs للـ dashboard
+        from esp import signals  # noqa: F401
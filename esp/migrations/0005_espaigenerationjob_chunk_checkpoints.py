@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp', '0004_alter_espskill_skill_type'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='espaigenerationjob',
+            name='chunk_checkpoints',
+            field=models.JSONField(blank=True, default=dict, verbose_name='checkpoints الأجزاء'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp', '0006_espextractedbook_extraction_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EspExtractedBookPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(verbose_name='رقم الصفحة')),
+                ('text', models.TextField(blank=True, default='', verbose_name='النص')),
+                ('char_offset', models.PositiveBigIntegerField(default=0)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='esp.espextractedbook')),
+            ],
+            options={
+                'verbose_name': 'Esp Extracted Book Page',
+                'verbose_name_plural': 'Esp Extracted Book Pages',
+                'ordering': ['page_number'],
+                'abstract': False,
+                'unique_together': {('book', 'page_number')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 23:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('esp', '0007_espextractedbookpage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='espextractedbookpage',
+            name='term_counts',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
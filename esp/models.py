@@ -313,4 +313,4 @@ class StudentEspFavoriteCategory(TimeStampedModel):
         return f"{self.student.email} ♥ {self.category.name}"
     
 
-from .ai_models import EspExtractedBook, EspExtractedMedia, EspAIGenerationJob
\ No newline at end of file
+from .ai_models import EspExtractedBook, EspExtractedBookPage, EspExtractedMedia, EspAIGenerationJob
\ No newline at end of file
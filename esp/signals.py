@@ -0,0 +1,16 @@
+# esp/signals.py
+
+from esp.ai_models import EspAIGenerationJob, EspExtractedBook, EspExtractedMedia
+from sabr_questions.job_events import connect_job_events
+
+
+# ============================================
+# تحديثات الكتب/الميديا/الـ jobs → ai/events/ (sabr_questions/job_events.py)
+# ============================================
+
+connect_job_events(
+    'esp',
+    book_model=EspExtractedBook,
+    media_model=EspExtractedMedia,
+    job_model=EspAIGenerationJob,
+)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('general', '0006_generalaigenerationjob_chunk_checkpoints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generalextractedbook',
+            name='extraction_mode',
+            field=models.CharField(choices=[('LAYOUT', 'Layout (pdfplumber)'), ('TEXT', 'Text only (pdfminer)')], default='LAYOUT', max_length=10, verbose_name='طريقة الاستخراج'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2 on 2026-10-18 23:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('general', '0007_generalextractedbook_extraction_mode'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneralExtractedBookPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(verbose_name='رقم الصفحة')),
+                ('text', models.TextField(blank=True, default='', verbose_name='النص')),
+                ('char_offset', models.PositiveBigIntegerField(default=0)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='general.generalextractedbook')),
+            ],
+            options={
+                'verbose_name': 'General Extracted Book Page',
+                'verbose_name_plural': 'General Extracted Book Pages',
+                'ordering': ['page_number'],
+                'abstract': False,
+                'unique_together': {('book', 'page_number')},
+            },
+        ),
+    ]
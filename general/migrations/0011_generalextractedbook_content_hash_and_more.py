@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('general', '0010_generalextractedmedia_transcript_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='generalextractedbook',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='generalextractedmedia',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
@@ -312,4 +312,4 @@ class StudentFavoriteCategory(TimeStampedModel):
     def __str__(self):
         return f"{self.student.email} ♥ {self.category.name}"
     
-from .ai_models import GeneralExtractedBook, GeneralExtractedMedia, GeneralAIGenerationJob
\ No newline at end of file
+from .ai_models import GeneralExtractedBook, GeneralExtractedBookPage, GeneralExtractedMedia, GeneralAIGenerationJob
\ No newline at end of file
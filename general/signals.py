@@ -0,0 +1,16 @@
+# general/signals.py
+
+from general.ai_models import GeneralAIGenerationJob, GeneralExtractedBook, GeneralExtractedMedia
+from sabr_questions.job_events import connect_job_events
+
+
+# ============================================
+# تحديثات الكتب/الميديا/الـ jobs → ai/events/ (sabr_questions/job_events.py)
+# ============================================
+
+connect_job_events(
+    'general',
+    book_model=GeneralExtractedBook,
+    media_model=GeneralExtractedMedia,
+    job_model=GeneralAIGenerationJob,
+)
@@ -2,62 +2,44 @@ import static_ffmpeg
 static_ffmpeg.add_paths()
 
 import os
-import json
-import tempfile
 import logging
 from celery import shared_task
 from django.db import transaction
 
 logger = logging.getLogger(__name__)
 
-MAX_PDF_PAGES = 20
-
 
 # ============================================================
 # TASK 1 — PDF Extraction
 # ============================================================
 
-@shared_task(bind=True, max_retries=2)
+@shared_task(bind=True, max_retries=2, acks_late=True)
 def general_extract_book_task(self, book_id: int):
-    from .ai_models import GeneralExtractedBook
+    from .ai_models import GeneralExtractedBook, GeneralExtractedBookPage
 
     book = GeneralExtractedBook.objects.get(id=book_id)
     book.status = 'PROCESSING'
     book.save(update_fields=['status'])
 
     try:
-        import pdfplumber
-        import urllib.request
-
-        pdf_url = book.pdf_file.url
-
-        with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as tmp:
-            urllib.request.urlretrieve(pdf_url, tmp.name)
-            tmp_path = tmp.name
+        from sabr_questions.extraction_store import find_book, link_book, store_book
+        from sabr_questions.pdf_extraction import extract_book_pages
 
-        with pdfplumber.open(tmp_path) as pdf:
-            total_pages = len(pdf.pages)
-
-            if total_pages > MAX_PDF_PAGES:
-                raise ValueError(
-                    f"الملف يحتوي على {total_pages} صفحة. الحد الأقصى المسموح {MAX_PDF_PAGES} صفحة فقط."
-                )
+        # ✅ نفس الملف خلص استخراجه في رفع تاني (من أي track) وإحنا في الـ queue
+        entry = find_book(book.content_hash, book.extraction_mode)
+        if entry:
+            link_book(entry, book, GeneralExtractedBookPage)
+            logger.info(f"[General ExtractBook] Book #{book_id} linked to stored extraction")
+            return
 
-            extracted_pages = []
-            for page in pdf.pages:
-                text = page.extract_text()
-                if text:
-                    extracted_pages.append(text.strip())
+        # ✅ الصفحات بتتحفظ في GeneralExtractedBookPage أول ما تخلص
+        total_pages = extract_book_pages(book, GeneralExtractedBookPage)
 
-            full_text = "\n\n".join(extracted_pages)
-
-        os.unlink(tmp_path)
-
-        book.extracted_text = full_text
         book.page_count = total_pages
         book.status = 'DONE'
         book.error_message = None
-        book.save(update_fields=['extracted_text', 'page_count', 'status', 'error_message'])
+        book.save(update_fields=['page_count', 'status', 'error_message'])
+        store_book(book)
 
         logger.info(f"[General ExtractBook] Book #{book_id} extracted. Pages: {total_pages}")
 
@@ -73,7 +55,7 @@ def general_extract_book_task(self, book_id: int):
 # TASK 2 — Media Transcription
 # ============================================================
 
-@shared_task(bind=True, max_retries=2)
+@shared_task(bind=True, max_retries=2, acks_late=True)
 def general_extract_media_task(self, media_id: int):
     from .ai_models import GeneralExtractedMedia
 
@@ -82,41 +64,34 @@ def general_extract_media_task(self, media_id: int):
     media.save(update_fields=['status'])
 
     tmp_media_path = None
-    tmp_audio_path = None
 
     try:
-        import whisper
-        import urllib.request
+        from sabr_questions.extraction_store import find_media, link_media, store_media
+        from sabr_questions.transcription import download_media, transcribe_file
+
+        entry = find_media(media.content_hash)
+        if entry:
+            link_media(entry, media)
+            logger.info(f"[General ExtractMedia] Media #{media_id} linked to stored transcript")
+            return
 
         media_url = media.media_file.url if hasattr(media.media_file, 'url') else str(media.media_file)
 
         suffix = '.mp4' if media.media_type == 'VIDEO' else '.mp3'
-        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
-            urllib.request.urlretrieve(media_url, tmp.name)
-            tmp_media_path = tmp.name
-
-        audio_path = tmp_media_path
+        tmp_media_path = download_media(media_url, suffix)
 
-        if media.media_type == 'VIDEO':
-            tmp_audio = tempfile.NamedTemporaryFile(suffix='.mp3', delete=False)
-            tmp_audio_path = tmp_audio.name
-            tmp_audio.close()
-
-            ret = os.system(f'ffmpeg -i "{tmp_media_path}" -q:a 0 -map a "{tmp_audio_path}" -y -loglevel quiet')
-            if ret != 0:
-                raise RuntimeError("ffmpeg فشل في استخراج الأوديو من الفيديو")
-            audio_path = tmp_audio_path
-
-        whisper_model = whisper.load_model("tiny")
-        result = whisper_model.transcribe(audio_path)
-        transcript = result.get("text", "").strip()
-        duration = int(result.get("duration", 0))
+        # ✅ ffmpeg → PCM مباشرة + أجزاء على السكوت بتتفرغ بالتوازي
+        result = transcribe_file(tmp_media_path, queue=(self.request.delivery_info or {}).get('routing_key'))
+        transcript = result['text']
+        duration = result['duration']
 
         media.transcript = transcript
+        media.transcript_segments = result['segments']
         media.duration_seconds = duration
         media.status = 'DONE'
         media.error_message = None
-        media.save(update_fields=['transcript', 'duration_seconds', 'status', 'error_message'])
+        media.save(update_fields=['transcript', 'transcript_segments', 'duration_seconds', 'status', 'error_message'])
+        store_media(media)
 
         logger.info(f"[General ExtractMedia] Media #{media_id} transcribed. Duration: {duration}s")
 
@@ -128,9 +103,8 @@ def general_extract_media_task(self, media_id: int):
         raise self.retry(exc=exc, countdown=15)
 
     finally:
-        for path in [tmp_media_path, tmp_audio_path]:
-            if path and os.path.exists(path):
-                os.unlink(path)
+        if tmp_media_path and os.path.exists(tmp_media_path):
+            os.unlink(tmp_media_path)
 
 
 # ============================================================
@@ -138,80 +112,80 @@ def general_extract_media_task(self, media_id: int):
 # الفرق عن IELTS: بنعمل GeneralSkill جوه GeneralCategory
 # ============================================================
 
-@shared_task(bind=True, max_retries=1)
+@shared_task(bind=True, max_retries=1, acks_late=True)
 def general_generate_skill_task(self, job_id: int):
     from .ai_models import GeneralAIGenerationJob
+    from sabr_questions.ai_generation import partial_result_message
     from .models import GeneralSkill
 
     job = GeneralAIGenerationJob.objects.get(id=job_id)
     job.status = 'PROCESSING'
     job.save(update_fields=['status'])
 
-    skill = None
+    # ✅ retry: بنكمل على الـ skill اللي اتعملت في المحاولة اللي فاتت
+    skill = job.skill
 
     try:
-        # ① جمع كل الـ content
-        content_parts = []
-
-        for book in job.books.filter(status='DONE'):
-            content_parts.append(
-                f"=== كتاب: {book.name} ===\n{book.extracted_text}"
-            )
+        # ① جمع الـ content (لو كبير: الأجزاء الأقرب لنوع المهارة بس)
+        from sabr_questions.relevance import build_generation_content
 
-        for m in job.media.filter(status='DONE'):
-            content_parts.append(
-                f"=== ترانسكريبت: {m.name} ===\n{m.transcript}"
-            )
-
-        if not content_parts:
+        combined_content = build_generation_content(
+            books=job.books.filter(status='DONE'),
+            media=job.media.filter(status='DONE'),
+            skill_type=job.skill_type,
+            query_text=' '.join(filter(None, [job.skill_title, job.skill_description, job.additional_notes])),
+        )
+        if not combined_content:
             raise ValueError("لا يوجد محتوى جاهز (كتب أو ميديا) لإنشاء الأسئلة منه")
 
-        combined_content = "\n\n".join(content_parts)
-
         # ② إنشاء الـ GeneralSkill جوه الكاتيجوري المحددة
-        with transaction.atomic():
-            skill = GeneralSkill.objects.create(
-                category=job.category,
-                skill_type=job.skill_type,
-                title=job.skill_title,
-                description=job.skill_description or '',
-                is_active=True,
-                order=0,
-            )
-            job.skill = skill
-            job.save(update_fields=['skill'])
+        if skill is None:
+            with transaction.atomic():
+                skill = GeneralSkill.objects.create(
+                    category=job.category,
+                    skill_type=job.skill_type,
+                    title=job.skill_title,
+                    description=job.skill_description or '',
+                    is_active=True,
+                    order=0,
+                )
+                job.skill = skill
+                job.save(update_fields=['skill'])
 
         # ③ توليد وحفظ الأسئلة
-        questions_created = _generate_and_save_questions(
+        result = _generate_and_save_questions(
+            job=job,
             skill=skill,
             skill_type=job.skill_type,
             content=combined_content,
-            no_easy=job.no_easy,
-            no_medium=job.no_medium,
-            no_hard=job.no_hard,
-            additional_notes=job.additional_notes or '',
         )
 
+        # أجزاء فشلت → retry (الأجزاء اللي اتحفظت مش بتتطلب تاني)
+        if result['failed_parts'] and self.request.retries < self.max_retries:
+            raise ValueError(f"فشل {len(result['failed_parts'])} من {result['parts']} أجزاء")
+
+        questions_created = result['questions_created']
         job.status = 'DONE'
-        job.questions_created = questions_created
-        job.error_message = None
-        job.save(update_fields=['status', 'questions_created', 'error_message'])
+        job.error_message = partial_result_message(result)
+        job.save(update_fields=['status', 'error_message'])
 
         logger.info(f"[General GenerateSkill] Job #{job_id} done. Questions: {questions_created}")
 
     except Exception as exc:
         logger.error(f"[General GenerateSkill] Job #{job_id} failed: {str(exc)}")
 
-        if skill and skill.pk:
+        # ✅ الأسئلة اللي اتحفظت بتفضل ظاهرة - الـ skill بتتمسح بس لو فاضية
+        if skill and skill.pk and not job.questions_created:
             try:
                 skill.delete()
             except Exception:
                 pass
+            job.skill = None
+            job.chunk_checkpoints = {}
 
         job.status = 'FAILED'
-        job.skill = None
         job.error_message = str(exc)
-        job.save(update_fields=['status', 'skill', 'error_message'])
+        job.save(update_fields=['status', 'skill', 'chunk_checkpoints', 'error_message'])
         raise self.retry(exc=exc, countdown=5)
 
 
@@ -219,41 +193,20 @@ def general_generate_skill_task(self, job_id: int):
 # Helper — يطلب من الـ AI ويولد الأسئلة
 # ============================================================
 
-def _generate_and_save_questions(skill, skill_type, content, no_easy, no_medium, no_hard, additional_notes):
-    from openai import OpenAI
-
-    client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
+def _generate_and_save_questions(job, skill, skill_type, content):
+    from sabr_questions.ai_generation import generate_questions_for_job
 
-    schema = _get_schema_for_skill_type(skill_type)
-    prompt = _build_prompt(
+    # ✅ المحتوى بيتقسم لأجزاء والطلبات بتتبعت بالتوازي (sabr_questions/ai_generation.py)
+    # ✅ كل جزء بيتحفظ مع checkpoint على الـ job - الـ retry بيكمل الأجزاء الفاشلة بس
+    return generate_questions_for_job(
+        job=job,
+        build_prompt=_build_prompt,
+        schema=_get_schema_for_skill_type(skill_type),
         skill_type=skill_type,
         content=content,
-        no_easy=no_easy,
-        no_medium=no_medium,
-        no_hard=no_hard,
-        additional_notes=additional_notes,
-        schema=schema,
-    )
-
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        max_tokens=8000,
-        messages=[{"role": "user", "content": prompt}],
+        save_questions=lambda data: _save_questions(skill=skill, skill_type=skill_type, data=data),
     )
 
-    raw_text = response.choices[0].message.content.strip()
-
-    # نظف الـ JSON لو فيه backticks
-    if raw_text.startswith("```"):
-        raw_text = raw_text.split("```")[1]
-        if raw_text.startswith("json"):
-            raw_text = raw_text[4:]
-    raw_text = raw_text.strip()
-
-    data = json.loads(raw_text)
-
-    return _save_questions(skill=skill, skill_type=skill_type, data=data)
-
 def _build_prompt(skill_type, content, no_easy, no_medium, no_hard, additional_notes, schema):
     total = no_easy + no_medium + no_hard
     notes_section = f"\nملاحظات إضافية يجب مراعاتها:\n{additional_notes}" if additional_notes else ""
@@ -492,387 +445,29 @@ def _save_questions(skill, skill_type, data):
     نفس منطق IELTS لكن:
     - usage_type='GENERAL'
     - general_skill=skill  (بدل ielts_skill)
+    - من غير english_explanation
     """
-    count = 0
+    from sabr_questions.bulk_save import bulk_save_generated_questions
 
-    if skill_type in ('VOCABULARY', 'GRAMMAR'):
-        from sabr_questions.models import (
-            VocabularyQuestion, VocabularyQuestionSet,
-            GrammarQuestion, GrammarQuestionSet,
-        )
-        questions = data.get('questions', [])
-
-        if skill_type == 'VOCABULARY':
-            q_set, _ = VocabularyQuestionSet.objects.get_or_create(
-                title='General Vocabulary Questions',
-                usage_type='GENERAL',
-                defaults={'description': 'Auto-generated set for General'}
-            )
-        else:
-            q_set, _ = GrammarQuestionSet.objects.get_or_create(
-                title='General Grammar Questions',
-                usage_type='GENERAL',
-                defaults={'description': 'Auto-generated set for General'}
-            )
-
-        for q in questions:
-            options = q.get('options', [])
-            correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-            if not correct_letter:
-                continue
-
-            kwargs = dict(
-                question_set=q_set,
-                question_text=q.get('question_text', ''),
-                choice_a=options[0] if len(options) > 0 else '',
-                choice_b=options[1] if len(options) > 1 else '',
-                choice_c=options[2] if len(options) > 2 else '',
-                choice_d=options[3] if len(options) > 3 else '',
-                correct_answer=correct_letter,
-                explanation=q.get('explanation', ''),
-                points=1,
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=q.get('difficulty', 'MEDIUM'),
-            )
-
-            if skill_type == 'VOCABULARY':
-                VocabularyQuestion.objects.create(**kwargs)
-            else:
-                GrammarQuestion.objects.create(**kwargs)
-            count += 1
-
-    elif skill_type == 'READING':
-        from sabr_questions.models import ReadingPassage, ReadingQuestion
-
-        for passage_data in data.get('passages', []):
-            passage = ReadingPassage.objects.create(
-                title=passage_data.get('title', 'AI Generated Passage'),
-                passage_text=passage_data.get('passage_text', ''),
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=passage_data.get('difficulty', 'MEDIUM'),
-            )
-
-            for q in passage_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                ReadingQuestion.objects.create(
-                    passage=passage,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                    difficulty=q.get('difficulty', 'MEDIUM'),
-                )
-                count += 1
-
-    elif skill_type == 'LISTENING':
-        from sabr_questions.models import ListeningAudio, ListeningQuestion
-
-        for audio_data in data.get('audios', []):
-            audio = ListeningAudio.objects.create(
-                title=audio_data.get('title', 'AI Generated Audio'),
-                audio_file='',
-                transcript=audio_data.get('transcript', ''),
-                duration=0,
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=audio_data.get('difficulty', 'MEDIUM'),
-            )
-
-            for q in audio_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                ListeningQuestion.objects.create(
-                    audio=audio,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                )
-                count += 1
-
-    elif skill_type == 'SPEAKING':
-        from sabr_questions.models import SpeakingVideo, SpeakingQuestion
-
-        for video_data in data.get('videos', []):
-            video = SpeakingVideo.objects.create(
-                title=video_data.get('title', 'AI Generated Video'),
-                video_file='',
-                description=video_data.get('transcript', ''),
-                duration=0,
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=video_data.get('difficulty', 'MEDIUM'),
-            )
-
-            for q in video_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                SpeakingQuestion.objects.create(
-                    video=video,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                )
-                count += 1
-
-    elif skill_type == 'WRITING':
-        from sabr_questions.models import WritingQuestion
-
-        for q in data.get('questions', []):
-            WritingQuestion.objects.create(
-                title=q.get('title', 'AI Generated Question'),
-                question_text=q.get('question_text', ''),
-                sample_answer=q.get('sample_answer', ''),
-                rubric=q.get('rubric', ''),
-                min_words=q.get('min_words', 150),
-                max_words=q.get('max_words', 400),
-                usage_type='GENERAL',
-                general_skill=skill,
-                points=10,
-                is_active=True,
-                order=0,
-                difficulty=q.get('difficulty', 'MEDIUM'),
-            )
-            count += 1
-
-    elif skill_type == 'GENERAL_PATH':
-        from sabr_questions.models import (
-            VocabularyQuestion, VocabularyQuestionSet,
-            GrammarQuestion, GrammarQuestionSet,
-            ReadingPassage, ReadingQuestion,
-            ListeningAudio, ListeningQuestion,
-            WritingQuestion,
-            SpeakingVideo, SpeakingQuestion,
-        )
+    # ✅ bulk_create لكل نوع في transaction واحدة (بدل create لكل سؤال)
+    return bulk_save_generated_questions(
+        skill=skill,
+        skill_type=skill_type,
+        data=data,
+        usage_type='GENERAL',
+        skill_field='general_skill',
+        set_label='General',
+        english_explanation=False,
+    )
 
-        # ── Vocabulary ──
-        if data.get('vocabulary_questions'):
-            q_set, _ = VocabularyQuestionSet.objects.get_or_create(
-                title='General Vocabulary Questions',
-                usage_type='GENERAL',
-                defaults={'description': 'Auto-generated set for General'}
-            )
-            for q in data['vocabulary_questions']:
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                VocabularyQuestion.objects.create(
-                    question_set=q_set,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    usage_type='GENERAL',
-                    general_skill=skill,
-                    is_active=True,
-                    order=0,
-                    difficulty=q.get('difficulty', 'MEDIUM'),
-                )
-                count += 1
-
-        # ── Grammar ──
-        if data.get('grammar_questions'):
-            q_set, _ = GrammarQuestionSet.objects.get_or_create(
-                title='General Grammar Questions',
-                usage_type='GENERAL',
-                defaults={'description': 'Auto-generated set for General'}
-            )
-            for q in data['grammar_questions']:
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                GrammarQuestion.objects.create(
-                    question_set=q_set,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    usage_type='GENERAL',
-                    general_skill=skill,
-                    is_active=True,
-                    order=0,
-                    difficulty=q.get('difficulty', 'MEDIUM'),
-                )
-                count += 1
-
-        # ── Reading ──
-        for passage_data in data.get('passages', []):
-            passage = ReadingPassage.objects.create(
-                title=passage_data.get('title', 'AI Generated Passage'),
-                passage_text=passage_data.get('passage_text', ''),
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=passage_data.get('difficulty', 'MEDIUM'),
-            )
-            for q in passage_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                ReadingQuestion.objects.create(
-                    passage=passage,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                    difficulty=q.get('difficulty', 'MEDIUM'),
-                )
-                count += 1
-
-        # ── Listening ──
-        for audio_data in data.get('audios', []):
-            audio = ListeningAudio.objects.create(
-                title=audio_data.get('title', 'AI Generated Audio'),
-                audio_file='',
-                transcript=audio_data.get('transcript', ''),
-                duration=0,
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=audio_data.get('difficulty', 'MEDIUM'),
-            )
-            for q in audio_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                ListeningQuestion.objects.create(
-                    audio=audio,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                )
-                count += 1
-
-        # ── Speaking ──
-        for video_data in data.get('videos', []):
-            video = SpeakingVideo.objects.create(
-                title=video_data.get('title', 'AI Generated Video'),
-                video_file='',
-                description=video_data.get('transcript', ''),
-                duration=0,
-                usage_type='GENERAL',
-                general_skill=skill,
-                is_active=True,
-                order=0,
-                difficulty=video_data.get('difficulty', 'MEDIUM'),
-            )
-            for q in video_data.get('questions', []):
-                options = q.get('options', [])
-                correct_letter = _text_to_letter(options, q.get('correct_answer', ''))
-                if not correct_letter:
-                    continue
-                SpeakingQuestion.objects.create(
-                    video=video,
-                    question_text=q.get('question_text', ''),
-                    choice_a=options[0] if len(options) > 0 else '',
-                    choice_b=options[1] if len(options) > 1 else '',
-                    choice_c=options[2] if len(options) > 2 else '',
-                    choice_d=options[3] if len(options) > 3 else '',
-                    correct_answer=correct_letter,
-                    explanation=q.get('explanation', ''),
-                    points=1,
-                    is_active=True,
-                    order=0,
-                )
-                count += 1
-
-        # ── Writing ──
-        for q in data.get('writing_questions', []):
-            WritingQuestion.objects.create(
-                title=q.get('title', 'AI Generated Question'),
-                question_text=q.get('question_text', ''),
-                sample_answer=q.get('sample_answer', ''),
-                rubric=q.get('rubric', ''),
-                min_words=q.get('min_words', 150),
-                max_words=q.get('max_words', 400),
-                usage_type='GENERAL',
-                general_skill=skill,
-                points=10,
-                is_active=True,
-                order=0,
-                difficulty=q.get('difficulty', 'MEDIUM'),
-            )
-            count += 1
-
-    return count
-
-
-def _text_to_letter(options, correct_text):
-    for idx, option in enumerate(options):
-        if option == correct_text:
-            return chr(65 + idx)
-    return None
-
-
-@shared_task(bind=True, max_retries=1)
+
+@shared_task(bind=True, max_retries=1, acks_late=True)
 def general_add_questions_to_skill_task(self, job_id: int):
     """
     يضيف أسئلة على GeneralSkill موجودة بدون ما يمسح أي حاجة.
     """
     from .ai_models import GeneralAIGenerationJob
+    from sabr_questions.ai_generation import partial_result_message
 
     job = GeneralAIGenerationJob.objects.get(id=job_id)
     job.status = 'PROCESSING'
@@ -886,37 +481,33 @@ def general_add_questions_to_skill_task(self, job_id: int):
         return
 
     try:
-        content_parts = []
-
-        for book in job.books.filter(status='DONE'):
-            content_parts.append(
-                f"=== كتاب: {book.name} ===\n{book.extracted_text}"
-            )
+        # ① جمع الـ content (لو كبير: الأجزاء الأقرب لنوع المهارة بس)
+        from sabr_questions.relevance import build_generation_content
 
-        for m in job.media.filter(status='DONE'):
-            content_parts.append(
-                f"=== ترانسكريبت: {m.name} ===\n{m.transcript}"
-            )
-
-        if not content_parts:
+        combined_content = build_generation_content(
+            books=job.books.filter(status='DONE'),
+            media=job.media.filter(status='DONE'),
+            skill_type=job.skill_type,
+            query_text=' '.join(filter(None, [job.skill_title, job.skill_description, job.additional_notes])),
+        )
+        if not combined_content:
             raise ValueError("لا يوجد محتوى جاهز (كتب أو ميديا) لإنشاء الأسئلة منه")
 
-        combined_content = "\n\n".join(content_parts)
-
-        questions_created = _generate_and_save_questions(
+        result = _generate_and_save_questions(
+            job=job,
             skill=skill,
             skill_type=skill.skill_type,
             content=combined_content,
-            no_easy=job.no_easy,
-            no_medium=job.no_medium,
-            no_hard=job.no_hard,
-            additional_notes=job.additional_notes or '',
         )
 
+        # أجزاء فشلت → retry (الأجزاء اللي اتحفظت مش بتتطلب تاني)
+        if result['failed_parts'] and self.request.retries < self.max_retries:
+            raise ValueError(f"فشل {len(result['failed_parts'])} من {result['parts']} أجزاء")
+
+        questions_created = result['questions_created']
         job.status = 'DONE'
-        job.questions_created = questions_created
-        job.error_message = None
-        job.save(update_fields=['status', 'questions_created', 'error_message'])
+        job.error_message = partial_result_message(result)
+        job.save(update_fields=['status', 'error_message'])
 
         logger.info(
             f"[General AddQuestions] Job #{job_id} done. "
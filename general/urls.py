@@ -100,12 +100,14 @@ urlpatterns = [
     path('ai/extract-book/', ai_views.list_extracted_books, name='list-extracted-books'),
     path('ai/extract-book/upload/', ai_views.extract_book, name='extract-book'),
     path('ai/extract-book/<int:book_id>/status/', ai_views.extract_book_status, name='extract-book-status'),
+    path('ai/extract-book/<int:book_id>/pages/', ai_views.extracted_book_pages, name='extracted-book-pages'),
     path('ai/extract-media/', ai_views.list_extracted_media, name='list-extracted-media'),
     path('ai/extract-media/upload/', ai_views.extract_media, name='extract-media'),
     path('ai/extract-media/<int:media_id>/status/', ai_views.extract_media_status, name='extract-media-status'),
     path('ai/generate-skill/', ai_views.generate_skill, name='generate-skill'),
     path('ai/jobs/', ai_views.list_generation_jobs, name='list-generation-jobs'),
     path('ai/jobs/<int:job_id>/status/', ai_views.generation_job_status, name='generation-job-status'),
+    path('ai/events/', ai_views.ai_events, name='ai-events'),
 
     path('categories/<int:category_id>/favorite/', views.toggle_favorite_category, name='toggle-favorite'),
     path('categories/<int:category_id>/favorite/status/', views.check_favorite_status, name='favorite-status'),
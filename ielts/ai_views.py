@@ -1,10 +1,16 @@
 import logging
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 
+from sabr_questions.extraction_store import find_book, find_media, hash_upload, link_book, link_media
+from sabr_questions.job_events import EventStreamRenderer, event_stream_response
+from sabr_questions.pdf_extraction import MAX_PAGES_PER_REQUEST, MODE_LAYOUT, MODE_TEXT, book_has_text
+
 logger = logging.getLogger(__name__)
 
 # ✅ أضفنا GENERAL_PATH
@@ -16,13 +22,15 @@ VALID_SKILL_TYPES = ['VOCABULARY', 'GRAMMAR', 'READING', 'LISTENING', 'SPEAKING'
 def extract_book(request):
     """
     POST /api/ielts/ai/extract-book/
-    Body (multipart): { name, pdf_file }
+    Body (multipart): { name, pdf_file, extraction_mode? }
+    extraction_mode: LAYOUT (default) | TEXT ← أسرع للكتب اللي مفيهاش جداول/أعمدة
     """
-    from .ai_models import ExtractedBook
+    from .ai_models import ExtractedBook, ExtractedBookPage
     from .tasks import extract_book_task
 
     name = request.data.get('name', '').strip()
     pdf_file = request.FILES.get('pdf_file')
+    extraction_mode = request.data.get('extraction_mode', MODE_LAYOUT).upper()
 
     if not name:
         return Response({'error': 'اسم الكتاب مطلوب'}, status=status.HTTP_400_BAD_REQUEST)
@@ -30,8 +38,34 @@ def extract_book(request):
         return Response({'error': 'ملف PDF مطلوب'}, status=status.HTTP_400_BAD_REQUEST)
     if not pdf_file.name.lower().endswith('.pdf'):
         return Response({'error': 'الملف يجب أن يكون بصيغة PDF'}, status=status.HTTP_400_BAD_REQUEST)
+    if extraction_mode not in (MODE_LAYOUT, MODE_TEXT):
+        return Response({'error': 'طريقة الاستخراج يجب أن تكون LAYOUT أو TEXT'}, status=status.HTTP_400_BAD_REQUEST)
 
     try:
+        # ✅ نفس الملف اتستخرج قبل كده (من أي track) → ربط على طول من غير رفع ولا task
+        content_hash = hash_upload(pdf_file)
+        entry = find_book(content_hash, extraction_mode)
+
+        if entry:
+            # ✅ الإنشاء والربط في transaction واحدة - ما يفضلش row PENDING من غير task
+            with transaction.atomic():
+                book = ExtractedBook.objects.create(
+                    name=name,
+                    pdf_file=entry.file_public_id,
+                    status='PENDING',
+                    extraction_mode=extraction_mode,
+                    content_hash=content_hash,
+                    uploaded_by=request.user,
+                )
+                link_book(entry, book, ExtractedBookPage)
+
+            return Response({
+                'message': 'الكتاب ده اتستخرج قبل كده - تم ربطه بالنص الموجود',
+                'book_id': book.id,
+                'status': book.status,
+                'reused': True,
+            }, status=status.HTTP_201_CREATED)
+
         import cloudinary.uploader
         upload_result = cloudinary.uploader.upload(
             pdf_file,
@@ -43,6 +77,8 @@ def extract_book(request):
             name=name,
             pdf_file=upload_result['public_id'],
             status='PENDING',
+            extraction_mode=extraction_mode,
+            content_hash=content_hash,
             uploaded_by=request.user,
         )
 
@@ -74,11 +110,63 @@ def extract_book_status(request, book_id):
         'status': book.status,
         'page_count': book.page_count,
         'error_message': book.error_message,
-        'has_text': bool(book.extracted_text),
+        'has_text': book_has_text(book),
         'created_at': book.created_at,
     })
 
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def extracted_book_pages(request, book_id):
+    """
+    GET /api/ielts/ai/extract-book/{book_id}/pages/?start=1&end=20
+    صفحات الكتاب المستخرجة (range - MAX_PAGES_PER_REQUEST بالكتير) مع مكانها في النص وعدد الـ tokens
+    """
+    from .ai_models import ExtractedBook
+
+    book = get_object_or_404(ExtractedBook, id=book_id)
+
+    if not book.pages.exists():
+        # لسه بيتستخرج، أو كتاب قديم (قبل التخزين بالصفحة) نصه كله في extracted_text
+        return Response({
+            'error': 'الكتاب ده ما لوش صفحات مخزنة',
+            'status': book.status,
+            'has_legacy_text': bool(book.extracted_text),
+        }, status=status.HTTP_409_CONFLICT)
+
+    try:
+        start = int(request.query_params.get('start', 1))
+        end = int(request.query_params.get('end', start + MAX_PAGES_PER_REQUEST - 1))
+    except ValueError:
+        return Response({'error': 'start و end لازم يكونوا أرقام'}, status=status.HTTP_400_BAD_REQUEST)
+    if start < 1 or end < start:
+        return Response({'error': 'range الصفحات غير صحيح'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # ✅ MAX_PAGES_PER_REQUEST صفحة بالكتير - الباقي بـ next_start
+    end = min(end, start + MAX_PAGES_PER_REQUEST - 1)
+    if book.page_count:
+        end = min(end, book.page_count)
+
+    pages = book.pages.filter(page_number__gte=start, page_number__lte=end)
+    return Response({
+        'book_id': book.id,
+        'page_count': book.page_count,
+        'start': start,
+        'end': end,
+        'next_start': end + 1 if book.page_count and end < book.page_count else None,
+        'pages': [
+            {
+                'page_number': p.page_number,
+                'text': p.text,
+                'char_offset': p.char_offset,
+                'char_count': p.char_count,
+                'token_count': p.token_count,
+            }
+            for p in pages
+        ],
+    })
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def list_extracted_books(request):
@@ -135,6 +223,31 @@ def extract_media(request):
         )
 
     try:
+        # ✅ نفس الملف اتفرغ قبل كده (من أي track) → ربط على طول من غير رفع ولا task
+        content_hash = hash_upload(media_file)
+        entry = find_media(content_hash)
+
+        if entry:
+            # ✅ الإنشاء والربط في transaction واحدة - ما يفضلش row PENDING من غير task
+            with transaction.atomic():
+                media = ExtractedMedia.objects.create(
+                    name=name,
+                    media_file=entry.file_public_id,
+                    media_type=media_type,
+                    status='PENDING',
+                    content_hash=content_hash,
+                    uploaded_by=request.user,
+                )
+                link_media(entry, media)
+
+            return Response({
+                'message': 'الميديا دي اتفرغت قبل كده - تم ربطها بالترانسكريبت الموجود',
+                'media_id': media.id,
+                'media_type': media_type,
+                'status': media.status,
+                'reused': True,
+            }, status=status.HTTP_201_CREATED)
+
         import cloudinary.uploader
         upload_result = cloudinary.uploader.upload(
             media_file,
@@ -146,6 +259,7 @@ def extract_media(request):
             media_file=upload_result['public_id'],
             media_type=media_type,
             status='PENDING',
+            content_hash=content_hash,
             uploaded_by=request.user,
         )
 
@@ -313,6 +427,7 @@ def generation_job_status(request, job_id):
     GET /api/ielts/ai/jobs/{job_id}/status/
     """
     from .ai_models import AIGenerationJob
+    from sabr_questions.ai_generation import checkpoint_progress
 
     job = get_object_or_404(AIGenerationJob, id=job_id)
     response_data = {
@@ -322,6 +437,7 @@ def generation_job_status(request, job_id):
         'skill_title': job.skill_title,
         'total_questions_requested': job.total_questions_requested,
         'questions_created': job.questions_created,
+        'progress': checkpoint_progress(job),
         'error_message': job.error_message,
         'created_at': job.created_at,
         'updated_at': job.updated_at,
@@ -332,6 +448,30 @@ def generation_job_status(request, job_id):
 
     return Response(response_data)
 
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def ai_events(request):
+    """
+    GET /api/ielts/ai/events/  (text/event-stream)
+
+    بدل polling الـ status لكل كتاب/ميديا/job:
+    أول حاجة snapshot للشغال دلوقتي (PENDING/PROCESSING) وبعدها كل تغيير أول ما يحصل
+        event: book  | media | job
+        data: {"type": "job", "id": 5, "status": "PROCESSING", "questions_created": 12, ...}
+    """
+    from .ai_models import AIGenerationJob, ExtractedBook, ExtractedMedia
+
+    response = event_stream_response('ielts', ExtractedBook, ExtractedMedia, AIGenerationJob)
+    if response is None:
+        return Response(
+            {'error': 'التحديثات المباشرة غير متاحة - استخدم status'},
+            status=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+    return response
+
+
 # ============================================================
 # VIEW — Add Questions to Existing Skill
 # أضف ده في ai_views.py
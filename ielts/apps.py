@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class IeltsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ielts'
+
+    def ready(self):
+        # ✅ نشر تحديثات الـ AI jobs للـ dashboard
+        from ielts import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 23:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ielts', '0008_extractedbookpage_term_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedmedia',
+            name='transcript_segments',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -332,4 +332,4 @@ class IELTSSubscription(TimeStampedModel):
         )
     
 # Import AI models عشان يتعمل migrate معاهم
-from .ai_models import ExtractedBook, ExtractedMedia, AIGenerationJob
\ No newline at end of file
+from .ai_models import ExtractedBook, ExtractedBookPage, ExtractedMedia, AIGenerationJob
\ No newline at end of file
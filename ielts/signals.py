@@ -0,0 +1,16 @@
+# ielts/signals.py
+
+from ielts.ai_models import AIGenerationJob, ExtractedBook, ExtractedMedia
+from sabr_questions.job_events import connect_job_events
+
+
+# ============================================
+# تحديثات الكتب/الميديا/الـ jobs → ai/events/ (sabr_questions/job_events.py)
+# ============================================
+
+connect_job_events(
+    'ielts',
+    book_model=ExtractedBook,
+    media_model=ExtractedMedia,
+    job_model=AIGenerationJob,
+)
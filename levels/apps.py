@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class LevelsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'levels'
+
+    def ready(self):
+        # ✅ إلغاء كاش شجرة الكورس مع أي تعديل في المحتوى
+        from levels import signals  # noqa: F401
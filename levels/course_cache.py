@@ -0,0 +1,282 @@
+# levels/course_cache.py
+
+import logging
+from typing import Dict, Any
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Prefetch
+
+from levels.models import Level, Unit, Lesson
+from levels.serializers import LessonDetailSerializer
+from placement_test.serializers import (
+    ReadingQuestionSerializer,
+    ListeningQuestionSerializer,
+    SpeakingQuestionSerializer,
+)
+from sabr_questions.models import ReadingQuestion, ListeningQuestion, SpeakingQuestion
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# Versioned cache keys
+# ✅ أي تعديل في المحتوى بيزود الـ version (levels/signals.py)
+#    فكل الـ keys القديمة بتبقى مهملة وبتنتهي لوحدها
+# ============================================
+
+VERSION_KEY = 'levels:course_version'
+
+
+def _config():
+    return getattr(settings, 'COURSE_CACHE_CONFIG', {'enabled': True, 'timeout': 60 * 60 * 24})
+
+
+def get_course_version() -> int:
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, 1, None)
+        version = cache.get(VERSION_KEY, 1)
+    return version
+
+
+def bump_course_version() -> None:
+    """
+    إلغاء كل كاش المحتوى (شجرة الكورس + الوحدات + الدروس)
+    """
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, 2, None)
+
+
+def _cached(key: str, builder):
+    config = _config()
+    if not config['enabled']:
+        return builder()
+
+    versioned_key = f'{key}:v{get_course_version()}'
+    payload = cache.get(versioned_key)
+    if payload is None:
+        payload = builder()
+        cache.set(versioned_key, payload, config['timeout'])
+    return payload
+
+
+# ============================================
+# Lesson (Lesson + Content + Questions)
+# ============================================
+
+def _reading_content_payload(lesson):
+    reading_content = getattr(lesson, 'reading_content', None)
+    if not reading_content:
+        return None, None
+
+    content_data = {
+        'explanation': reading_content.explanation,
+        'vocabulary_words': reading_content.vocabulary_words,
+        'passage': {
+            'id': reading_content.passage.id,
+            'title': reading_content.passage.title,
+            'passage_text': reading_content.passage.passage_text,
+            'passage_image': reading_content.passage.passage_image.url if reading_content.passage.passage_image else None,
+            'source': reading_content.passage.source,
+        }
+    }
+    questions = ReadingQuestion.objects.filter(
+        passage=reading_content.passage,
+        is_active=True
+    ).order_by('order', 'id')
+    return content_data, ReadingQuestionSerializer(questions, many=True).data
+
+
+def _listening_content_payload(lesson):
+    listening_content = getattr(lesson, 'listening_content', None)
+    if not listening_content:
+        return None, None
+
+    content_data = {
+        'explanation': listening_content.explanation,
+        'audio': {
+            'id': listening_content.audio.id,
+            'title': listening_content.audio.title,
+            'audio_file': listening_content.audio.audio_file.url if listening_content.audio.audio_file else None,
+            'transcript': listening_content.audio.transcript,
+            'duration': listening_content.audio.duration,
+        }
+    }
+    questions = ListeningQuestion.objects.filter(
+        audio=listening_content.audio,
+        is_active=True
+    ).order_by('order', 'id')
+    return content_data, ListeningQuestionSerializer(questions, many=True).data
+
+
+def _speaking_content_payload(lesson):
+    speaking_content = getattr(lesson, 'speaking_content', None)
+    if not speaking_content:
+        return None, None
+
+    content_data = {
+        'explanation': speaking_content.explanation,
+        'video': {
+            'id': speaking_content.video.id,
+            'title': speaking_content.video.title,
+            'video_file': speaking_content.video.video_file.url if speaking_content.video.video_file else None,
+            'thumbnail': speaking_content.video.thumbnail.url if speaking_content.video.thumbnail else None,
+            'description': speaking_content.video.description,
+            'duration': speaking_content.video.duration,
+        }
+    }
+    questions = SpeakingQuestion.objects.filter(
+        video=speaking_content.video,
+        is_active=True
+    ).order_by('order', 'id')
+    return content_data, SpeakingQuestionSerializer(questions, many=True).data
+
+
+CONTENT_BUILDERS = {
+    'READING': _reading_content_payload,
+    'LISTENING': _listening_content_payload,
+    'SPEAKING': _speaking_content_payload,
+}
+
+
+def build_lesson_full_payload(lesson: Lesson) -> Dict[str, Any]:
+    """
+    الدرس + المحتوى + الأسئلة (نفس شكل get_*_lesson_full)
+    """
+    lesson_data = LessonDetailSerializer(lesson).data
+
+    # Writing: محتوى بس (لا يوجد أسئلة MCQ)
+    if lesson.lesson_type == 'WRITING':
+        writing_content = getattr(lesson, 'writing_content', None)
+        return {
+            'lesson': lesson_data,
+            'content': {
+                'title': writing_content.title,
+                'writing_passage': writing_content.writing_passage,
+                'instructions': writing_content.instructions,
+                'sample_answer': writing_content.sample_answer,
+            } if writing_content else None,
+        }
+
+    content_data, questions_data = CONTENT_BUILDERS[lesson.lesson_type](lesson)
+    questions_data = questions_data or []
+    return {
+        'lesson': lesson_data,
+        'content': content_data,
+        'questions': questions_data,
+        'questions_count': len(questions_data)
+    }
+
+
+def get_lesson_full_payload(lesson: Lesson) -> Dict[str, Any]:
+    return _cached(
+        f'levels:lesson_full:{lesson.id}',
+        lambda: build_lesson_full_payload(lesson)
+    )
+
+
+# ============================================
+# Unit bundle (كل دروس الوحدة في response واحد)
+# ============================================
+
+def build_unit_bundle(unit: Unit) -> Dict[str, Any]:
+    lessons = unit.lessons.filter(is_active=True).select_related(
+        'unit', 'unit__level',
+        'reading_content__passage',
+        'listening_content__audio',
+        'speaking_content__video',
+        'writing_content',
+    ).order_by('order')
+
+    lessons_data = [get_lesson_full_payload(lesson) for lesson in lessons]
+
+    return {
+        'unit': {
+            'id': unit.id,
+            'title': unit.title,
+            'description': unit.description,
+            'order': unit.order,
+            'level': {
+                'id': unit.level.id,
+                'code': unit.level.code,
+                'title': unit.level.title
+            },
+            'has_exam': hasattr(unit, 'exam'),
+        },
+        'lessons': lessons_data,
+        'lessons_count': len(lessons_data)
+    }
+
+
+def get_unit_bundle(unit: Unit) -> Dict[str, Any]:
+    return _cached(
+        f'levels:unit_bundle:{unit.id}',
+        lambda: build_unit_bundle(unit)
+    )
+
+
+# ============================================
+# Course tree (Levels → Units → Lessons)
+# ============================================
+
+def build_course_tree() -> Dict[str, Any]:
+    """
+    شجرة المستويات والوحدات والدروس النشطة (3 queries بدل count لكل صف)
+    """
+    active_lessons = Lesson.objects.filter(is_active=True).only(
+        'id', 'unit_id', 'title', 'lesson_type', 'order'
+    ).order_by('order')
+    active_units = Unit.objects.filter(is_active=True).select_related('exam').annotate(
+        active_lessons_count=Count('lessons', filter=Q(lessons__is_active=True))
+    ).prefetch_related(
+        Prefetch('lessons', queryset=active_lessons, to_attr='active_lessons')
+    ).order_by('order')
+    levels = Level.objects.filter(is_active=True).select_related('exam').prefetch_related(
+        Prefetch('units', queryset=active_units, to_attr='active_units')
+    ).order_by('order')
+
+    levels_data = []
+    for level in levels:
+        units_data = [
+            {
+                'id': unit.id,
+                'title': unit.title,
+                'description': unit.description,
+                'order': unit.order,
+                'lessons_count': unit.active_lessons_count,
+                'has_exam': hasattr(unit, 'exam'),
+                'lessons': [
+                    {
+                        'id': lesson.id,
+                        'title': lesson.title,
+                        'lesson_type': lesson.lesson_type,
+                        'order': lesson.order
+                    }
+                    for lesson in unit.active_lessons
+                ]
+            }
+            for unit in level.active_units
+        ]
+        levels_data.append({
+            'id': level.id,
+            'code': level.code,
+            'title': level.title,
+            'description': level.description,
+            'order': level.order,
+            'units_count': len(units_data),
+            'total_lessons': sum(unit['lessons_count'] for unit in units_data),
+            'has_exam': hasattr(level, 'exam'),
+            'units': units_data
+        })
+
+    return {
+        'version': get_course_version(),
+        'levels': levels_data
+    }
+
+
+def get_course_tree() -> Dict[str, Any]:
+    return _cached('levels:course_tree', build_course_tree)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 23:19
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levels', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentlevelexamattempt',
+            name='result_snapshot',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='نسخة النتيجة'),
+        ),
+        migrations.AddField(
+            model_name='studentunitexamattempt',
+            name='result_snapshot',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='نسخة النتيجة'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2 on 2026-10-18 23:26
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_expires_at(apps, schema_editor):
+    # المحاولات اللي لسه ما اتسلمتش بس - عشان الـ sweeper يقدر يسلّمها
+    for model_name, exam_field in [('StudentUnitExamAttempt', 'unit_exam'), ('StudentLevelExamAttempt', 'level_exam')]:
+        Attempt = apps.get_model('levels', model_name)
+        attempts = Attempt.objects.filter(
+            submitted_at__isnull=True, expires_at__isnull=True
+        ).select_related(exam_field)
+        for attempt in attempts:
+            time_limit = getattr(attempt, exam_field).time_limit
+            attempt.expires_at = attempt.started_at + timedelta(minutes=time_limit)
+            attempt.save(update_fields=['expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('levels', '0003_studentlevelexamattempt_result_snapshot_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentlevelexamattempt',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='ينتهي في'),
+        ),
+        migrations.AddField(
+            model_name='studentunitexamattempt',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='ينتهي في'),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,12 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.cache import cache
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 from cloudinary.models import CloudinaryField
 
 User = get_user_model()
@@ -121,9 +127,18 @@ class Unit(TimeStampedModel, OrderedModel):
         """جميع الدروس النشطة"""
         return self.lessons.filter(is_active=True)
     
+    @staticmethod
+    def lessons_count_cache_key(unit_id):
+        return f'levels:unit_lessons_count:{unit_id}'
+    
     def get_lessons_count(self):
-        """عدد الدروس"""
-        return self.lessons.filter(is_active=True).count()
+        """عدد الدروس النشطة (cached - بيتلغي مع إضافة/حذف/تفعيل أي درس في الوحدة)"""
+        key = self.lessons_count_cache_key(self.pk)
+        count = cache.get(key)
+        if count is None:
+            count = self.lessons.filter(is_active=True).count()
+            cache.set(key, count, getattr(settings, 'COURSE_CACHE_CONFIG', {}).get('counts_timeout', 300))
+        return count
     
     def save(self, *args, **kwargs):
         """عند إنشاء Unit جديد، ننشئ UnitExam تلقائياً"""
@@ -774,6 +789,22 @@ class StudentUnitExamAttempt(TimeStampedModel):
         verbose_name="تاريخ التسليم"
     )
     
+    # ✅ النتيجة كاملة بتتحفظ مرة واحدة وقت التسليم
+    result_snapshot = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="نسخة النتيجة"
+    )
+    
+    # ✅ نهاية الوقت على السيرفر (الـ sweeper بيسلّم المحاولات اللي عدّت الوقت ده)
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="ينتهي في"
+    )
+    
     class Meta:
         verbose_name = "محاولة امتحان وحدة"
         verbose_name_plural = "محاولات امتحانات الوحدات"
@@ -783,6 +814,12 @@ class StudentUnitExamAttempt(TimeStampedModel):
     def __str__(self):
         status = "✓ Passed" if self.passed else "✗ Failed" if self.score is not None else "In Progress"
         return f"{self.student.email} - {self.unit_exam.unit.title} - Attempt #{self.attempt_number} ({status})"
+    
+    def save(self, *args, **kwargs):
+        # ✅ حساب نهاية الوقت مرة واحدة عند بدء المحاولة
+        if self._state.adding and self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(minutes=self.unit_exam.time_limit)
+        super().save(*args, **kwargs)
 
 
 class StudentLevelExamAttempt(TimeStampedModel):
@@ -849,6 +886,22 @@ class StudentLevelExamAttempt(TimeStampedModel):
         verbose_name="تاريخ التسليم"
     )
     
+    # ✅ النتيجة كاملة بتتحفظ مرة واحدة وقت التسليم
+    result_snapshot = models.JSONField(
+        null=True,
+        blank=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="نسخة النتيجة"
+    )
+    
+    # ✅ نهاية الوقت على السيرفر (الـ sweeper بيسلّم المحاولات اللي عدّت الوقت ده)
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="ينتهي في"
+    )
+    
     class Meta:
         verbose_name = "محاولة امتحان مستوى"
         verbose_name_plural = "محاولات امتحانات المستويات"
@@ -859,6 +912,12 @@ class StudentLevelExamAttempt(TimeStampedModel):
         status = "✓ Passed" if self.passed else "✗ Failed" if self.score is not None else "In Progress"
         return f"{self.student.email} - {self.level_exam.level.code} Exam - Attempt #{self.attempt_number} ({status})"
     
+    def save(self, *args, **kwargs):
+        # ✅ حساب نهاية الوقت مرة واحدة عند بدء المحاولة
+        if self._state.adding and self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(minutes=self.level_exam.time_limit)
+        super().save(*args, **kwargs)
+    
 # ============================================
 # ADD THIS TO THE END OF levels/models.py
 # ============================================
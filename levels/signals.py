@@ -0,0 +1,57 @@
+# levels/signals.py
+
+from django.core.cache import cache
+from django.db.models.signals import post_init, post_save, post_delete
+
+from levels.models import (
+    Level, Unit, Lesson,
+    ReadingLessonContent, ListeningLessonContent,
+    SpeakingLessonContent, WritingLessonContent,
+    UnitExam, LevelExam
+)
+from levels.course_cache import bump_course_version
+from sabr_questions.models import (
+    ReadingPassage, ReadingQuestion,
+    ListeningAudio, ListeningQuestion,
+    SpeakingVideo, SpeakingQuestion
+)
+
+
+# أي model بيظهر في شجرة الكورس أو في محتوى الدروس
+COURSE_CONTENT_MODELS = [
+    Level, Unit, Lesson,
+    ReadingLessonContent, ListeningLessonContent,
+    SpeakingLessonContent, WritingLessonContent,
+    UnitExam, LevelExam,
+    ReadingPassage, ReadingQuestion,
+    ListeningAudio, ListeningQuestion,
+    SpeakingVideo, SpeakingQuestion,
+]
+
+
+def invalidate_course_cache(sender, **kwargs):
+    bump_course_version()
+
+
+for model in COURSE_CONTENT_MODELS:
+    post_save.connect(invalidate_course_cache, sender=model, dispatch_uid=f'course_cache_save_{model.__name__}')
+    post_delete.connect(invalidate_course_cache, sender=model, dispatch_uid=f'course_cache_delete_{model.__name__}')
+
+
+# ============================================
+# عدد الدروس النشطة في الوحدة (Unit.get_lessons_count)
+# ============================================
+
+def remember_lesson_unit(sender, instance, **kwargs):
+    instance._loaded_unit_id = instance.unit_id
+
+
+def invalidate_unit_lessons_count(sender, instance, **kwargs):
+    unit_ids = {instance.unit_id, getattr(instance, '_loaded_unit_id', None)} - {None}
+    cache.delete_many([Unit.lessons_count_cache_key(unit_id) for unit_id in unit_ids])
+    instance._loaded_unit_id = instance.unit_id
+
+
+post_init.connect(remember_lesson_unit, sender=Lesson, dispatch_uid='lesson_remember_unit')
+post_save.connect(invalidate_unit_lessons_count, sender=Lesson, dispatch_uid='lesson_count_save')
+post_delete.connect(invalidate_unit_lessons_count, sender=Lesson, dispatch_uid='lesson_count_delete')
@@ -0,0 +1,86 @@
+import logging
+from celery import shared_task
+from django.core.cache import cache
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+SWEEP_LOCK_KEY = 'sweep:levels'
+
+
+# ============================================================
+# TASK — Sweep expired unit/level exam attempts
+# ============================================================
+
+def _finalize_expired(kind: str, attempt_id: int) -> bool:
+    from placement_test.services.autosave_service import merge_answer_deltas
+    from placement_test.services.exam_timer import get_attempt_model, clear_timer, is_past_grace
+    from .views import finalize_unit_exam_attempt, finalize_level_exam_attempt, pregrade_exam_attempt
+
+    finalize = finalize_unit_exam_attempt if kind == 'unit' else finalize_level_exam_attempt
+    model = get_attempt_model(kind)
+
+    # ✅ التصحيح (الكتابة بالـ AI) قبل الـ lock
+    pregraded = pregrade_exam_attempt(
+        model.objects.filter(id=attempt_id).first(), None,
+        'Unit Exam' if kind == 'unit' else 'Level Exam'
+    )
+
+    with transaction.atomic():
+        attempt = model.objects.select_for_update().filter(id=attempt_id).first()
+        # ممكن الطالب يكون سلّم بين الـ query والـ lock
+        if attempt is None or attempt.submitted_at or not is_past_grace(attempt.expires_at):
+            return False
+
+        # ✅ التسليم بالإجابات المحفوظة بالـ autosave (أو صفر لو مفيش)
+        finalize(attempt, merge_answer_deltas(attempt.answers, {}), pregraded)
+
+    clear_timer(kind, attempt_id)
+    return True
+
+
+@shared_task(bind=True, max_retries=0)
+def sweep_expired_levels_attempts(self):
+    """
+    تسليم محاولات امتحانات الوحدات/المستويات اللي وقتها خلص (+ المهلة)
+    - run واحد بس في نفس الوقت (lock في الكاش) - لو فيه run شغال بنسيب الدور ده
+    - عدد محدود من المحاولات في الـ run، والباقي بيتسلم في الـ run الجاي
+    """
+    from placement_test.services.exam_timer import expired_attempt_ids, get_sweep_limits
+
+    max_attempts, lock_timeout = get_sweep_limits()
+    # ✅ cache.add مش بيستنى: لو المفتاح موجود يبقى فيه run تاني شغال
+    if not cache.add(SWEEP_LOCK_KEY, 1, lock_timeout):
+        logger.info("Levels sweep already running - skipping this run")
+        return None
+
+    try:
+        totals = {}
+        remaining = max_attempts
+        for kind in ('unit', 'level'):
+            finalized = 0
+            failed = set()
+            while remaining > 0:
+                attempt_ids = expired_attempt_ids(kind, exclude_ids=failed)[:remaining]
+                if not attempt_ids:
+                    break
+
+                for attempt_id in attempt_ids:
+                    remaining -= 1
+                    try:
+                        if _finalize_expired(kind, attempt_id):
+                            finalized += 1
+                    except Exception as e:
+                        # محاولة واحدة بايظة ما توقفش الباقي
+                        failed.add(attempt_id)
+                        logger.error(f"Failed to finalize expired {kind} attempt {attempt_id}: {str(e)}")
+
+            totals[kind] = finalized
+            if finalized:
+                logger.info(f"Finalized {finalized} expired {kind} exam attempts")
+
+        if remaining <= 0:
+            logger.warning(f"Levels sweep hit its limit of {max_attempts} attempts - the rest wait for the next run")
+        return totals
+    finally:
+        cache.delete(SWEEP_LOCK_KEY)
@@ -74,6 +74,10 @@ urlpatterns = [
     path('lesson-detail/listening/<int:lesson_id>/', views.get_listening_lesson_full, name='get_listening_lesson_full'),
     path('lesson-detail/speaking/<int:lesson_id>/',  views.get_speaking_lesson_full,  name='get_speaking_lesson_full'),
     path('lesson-detail/writing/<int:lesson_id>/',   views.get_writing_lesson_full,   name='get_writing_lesson_full'),
+
+# Cached Course Tree & Unit Bundle (كل دروس الوحدة في request واحد)
+    path('course-tree/', views.get_course_tree_view, name='get_course_tree'),
+    path('units/<int:unit_id>/bundle/', views.get_unit_bundle_view, name='get_unit_bundle'),
     # ============================================
     # 6. QUESTION BANK URLS
     # ============================================
@@ -122,10 +126,14 @@ urlpatterns = [
     # Unit Exam
     path('student/exams/unit/start/<int:unit_id>/', views.start_unit_exam, name='start_unit_exam'),
     path('student/exams/unit/submit/<int:attempt_id>/', views.submit_unit_exam, name='submit_unit_exam'),
+    path('student/exams/unit/autosave/<int:attempt_id>/', views.autosave_unit_exam, name='autosave_unit_exam'),
+    path('student/exams/unit/timer/<int:attempt_id>/', views.get_unit_exam_timer, name='get_unit_exam_timer'),
     path('student/exams/unit/my-attempts/', views.my_unit_exam_attempts, name='my_unit_exam_attempts'),
     
     # Level Exam
     path('student/exams/level/start/<int:level_id>/', views.start_level_exam, name='start_level_exam'),
     path('student/exams/level/submit/<int:attempt_id>/', views.submit_level_exam, name='submit_level_exam'),
+    path('student/exams/level/autosave/<int:attempt_id>/', views.autosave_level_exam, name='autosave_level_exam'),
+    path('student/exams/level/timer/<int:attempt_id>/', views.get_level_exam_timer, name='get_level_exam_timer'),
     path('student/exams/level/my-attempts/', views.my_level_exam_attempts, name='my_level_exam_attempts'),
 ]
\ No newline at end of file
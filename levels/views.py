@@ -1,15 +1,27 @@
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Count, Q, F
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-import random
 import json
 from cloudinary.models import CloudinaryResource
 from placement_test.services.exam_service import exam_service
 from placement_test.services.ai_grading import ai_grading_service
+from placement_test.services.question_pools import sample_question_ids
+from placement_test.services.autosave_service import (
+    merge_answer_deltas,
+    filter_allowed_deltas,
+    count_answers
+)
+from placement_test.services.exam_timer import (
+    start_timer,
+    clear_timer,
+    is_past_grace,
+    get_remaining_time
+)
 from levels.models import (
     Level, Unit, Lesson,
     ReadingLessonContent, ListeningLessonContent,
@@ -2136,7 +2148,7 @@ def complete_lesson(request, lesson_id):
     ✅ Updates StudentUnit.lessons_completed
     ✅ Checks if unit is completed (all lessons done)
     """
-    lesson = get_object_or_404(Lesson, id=lesson_id, is_active=True)
+    lesson = get_object_or_404(Lesson.objects.select_related('unit'), id=lesson_id, is_active=True)
     
     # التحقق من أن الطالب في الوحدة الصحيحة
     student_unit = StudentUnit.objects.filter(
@@ -2151,37 +2163,37 @@ def complete_lesson(request, lesson_id):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     with transaction.atomic():
+        now = timezone.now()
+        
         # إنشاء أو تحديث StudentLesson
         student_lesson, created = StudentLesson.objects.get_or_create(
             student=request.user,
             lesson=lesson,
             defaults={
                 'is_completed': True,
-                'completed_at': timezone.now()
+                'completed_at': now
             }
         )
         
+        newly_completed = created
         if not created and not student_lesson.is_completed:
-            student_lesson.is_completed = True
-            student_lesson.completed_at = timezone.now()
-            student_lesson.save()
-        
-        # تحديث عدد الدروس المكتملة في الوحدة
-        completed_lessons = StudentLesson.objects.filter(
-            student=request.user,
-            lesson__unit=lesson.unit,
-            is_completed=True
-        ).count()
-        
-        student_unit.lessons_completed = completed_lessons
+            # ✅ update مشروط عشان طلبين في نفس الوقت ما يزودوش العداد مرتين
+            newly_completed = StudentLesson.objects.filter(
+                id=student_lesson.id,
+                is_completed=False
+            ).update(is_completed=True, completed_at=now, updated_at=now) == 1
+            student_lesson.refresh_from_db()
+        
+        # ✅ تحديث عدد الدروس المكتملة incrementally (أول إكمال بس)
+        if newly_completed:
+            StudentUnit.objects.filter(id=student_unit.id).update(
+                lessons_completed=F('lessons_completed') + 1,
+                updated_at=now
+            )
+            student_unit.refresh_from_db(fields=['lessons_completed'])
         
-        # التحقق من إكمال جميع دروس الوحدة
+        completed_lessons = student_unit.lessons_completed
         total_lessons = lesson.unit.get_lessons_count()
-        if completed_lessons >= total_lessons and not student_unit.exam_passed:
-            # الوحدة مكتملة (الدروس فقط) - يحتاج لاجتياز الامتحان
-            pass
-        
-        student_unit.save()
     
     serializer = StudentLessonSerializer(student_lesson)
     
@@ -2212,37 +2224,53 @@ def my_progress(request):
     if level_id:
         student_levels = student_levels.filter(level_id=level_id)
 
-    levels_data = []
-    for sl in student_levels:
-        student_units = StudentUnit.objects.filter(
+    student_levels = list(student_levels)
+    level_ids = [sl.level_id for sl in student_levels]
+
+    # ✅ كل الوحدات في query واحدة (بدل query لكل مستوى)
+    student_units = StudentUnit.objects.filter(
+        student=request.user,
+        unit__level_id__in=level_ids
+    ).select_related('unit').order_by('unit__order')
+    unit_ids = [su.unit_id for su in student_units]
+
+    # ✅ عدد الدروس المكتملة والإجمالي لكل وحدة (grouped queries بدل COUNT لكل وحدة)
+    completed_by_unit = dict(
+        StudentLesson.objects.filter(
             student=request.user,
-            unit__level=sl.level
-        ).select_related('unit').order_by('unit__order')
+            lesson__unit_id__in=unit_ids,
+            is_completed=True
+        ).values('lesson__unit_id').annotate(
+            count=Count('id')
+        ).values_list('lesson__unit_id', 'count')
+    )
+    total_by_unit = dict(
+        Lesson.objects.filter(
+            unit_id__in=unit_ids,
+            is_active=True
+        ).values('unit_id').annotate(
+            count=Count('id')
+        ).values_list('unit_id', 'count')
+    )
 
-        units_data = []
-        for su in student_units:
-            completed_lessons = StudentLesson.objects.filter(
-                student=request.user,
-                lesson__unit=su.unit,
-                is_completed=True
-            ).count()
-
-            total_lessons = su.unit.get_lessons_count()
-
-            units_data.append({
-                'id': su.id,
-                'unit': {
-                    'id': su.unit.id,
-                    'title': su.unit.title
-                },
-                'status': su.status,
-                'lessons_completed': completed_lessons,
-                'total_lessons': total_lessons,
-                'exam_passed': su.exam_passed,
-                'started_at': su.started_at,
-                'completed_at': su.completed_at
-            })
+    units_by_level = {}
+    for su in student_units:
+        units_by_level.setdefault(su.unit.level_id, []).append({
+            'id': su.id,
+            'unit': {
+                'id': su.unit.id,
+                'title': su.unit.title
+            },
+            'status': su.status,
+            'lessons_completed': completed_by_unit.get(su.unit_id, 0),
+            'total_lessons': total_by_unit.get(su.unit_id, 0),
+            'exam_passed': su.exam_passed,
+            'started_at': su.started_at,
+            'completed_at': su.completed_at
+        })
 
+    levels_data = []
+    for sl in student_levels:
         levels_data.append({
             'id': sl.id,
             'level': {
@@ -2257,43 +2285,41 @@ def my_progress(request):
             } if sl.current_unit else None,
             'started_at': sl.started_at,
             'completed_at': sl.completed_at,
-            'units': units_data
+            'units': units_by_level.get(sl.level_id, [])
         })
 
     # ============================================
-    # إحصائيات عامة
+    # إحصائيات عامة (conditional aggregates - query واحدة لكل جدول)
     # ============================================
-    total_levels = StudentLevel.objects.filter(student=request.user).count()
-    completed_levels = StudentLevel.objects.filter(
-        student=request.user, status='COMPLETED'
-    ).count()
-
-    total_units = StudentUnit.objects.filter(student=request.user).count()
-    completed_units = StudentUnit.objects.filter(
-        student=request.user, status='COMPLETED'
-    ).count()
-
-    # ✅ الوحدات المُجتازة (اللي عدت الامتحان)
-    passed_units = StudentUnit.objects.filter(
-        student=request.user,
-        status='COMPLETED',
-        exam_passed=True
-    ).count()
+    level_stats = StudentLevel.objects.filter(student=request.user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='COMPLETED'))
+    )
+    total_levels = level_stats['total']
+    completed_levels = level_stats['completed']
+
+    unit_stats = StudentUnit.objects.filter(student=request.user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+        # ✅ الوحدات المُجتازة (اللي عدت الامتحان)
+        passed=Count('id', filter=Q(status='COMPLETED', exam_passed=True))
+    )
+    total_units = unit_stats['total']
+    completed_units = unit_stats['completed']
+    passed_units = unit_stats['passed']
 
     # ✅ إجمالي الوحدات في كل المستويات اللي الطالب مسجل فيها
-    enrolled_level_ids = StudentLevel.objects.filter(
-        student=request.user
-    ).values_list('level_id', flat=True)
-
     total_units_in_enrolled_levels = Unit.objects.filter(
-        level__in=enrolled_level_ids,
+        level__student_progress__student=request.user,
         is_active=True
     ).count()
 
-    total_lessons = StudentLesson.objects.filter(student=request.user).count()
-    completed_lessons = StudentLesson.objects.filter(
-        student=request.user, is_completed=True
-    ).count()
+    lesson_stats = StudentLesson.objects.filter(student=request.user).aggregate(
+        total=Count('id'),
+        completed=Count('id', filter=Q(is_completed=True))
+    )
+    total_lessons = lesson_stats['total']
+    completed_lessons = lesson_stats['completed']
 
     return Response({
         'summary': {
@@ -2379,91 +2405,15 @@ def select_random_questions_for_unit_exam(question_bank, unit_exam):
             'writing': [list of question IDs]
         }
     """
-    selected_questions = {
-        'vocabulary': [],
-        'grammar': [],
-        'reading': [],
-        'listening': [],
-        'speaking': [],
-        'writing': []
-    }
-    
-    # Vocabulary
-    vocab_ids = list(
-        VocabularyQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['vocabulary'] = random.sample(
-        vocab_ids,
-        min(unit_exam.vocabulary_count, len(vocab_ids))
-    )
-    
-    # Grammar
-    grammar_ids = list(
-        GrammarQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['grammar'] = random.sample(
-        grammar_ids,
-        min(unit_exam.grammar_count, len(grammar_ids))
-    )
-    
-    # Reading - نختار questions عشوائية
-    reading_ids = list(
-        ReadingQuestion.objects.filter(
-            passage__levels_units_question_bank=question_bank,
-            passage__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['reading'] = random.sample(
-        reading_ids,
-        min(unit_exam.reading_questions_count, len(reading_ids))
-    )
-    
-    # Listening
-    listening_ids = list(
-        ListeningQuestion.objects.filter(
-            audio__levels_units_question_bank=question_bank,
-            audio__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['listening'] = random.sample(
-        listening_ids,
-        min(unit_exam.listening_questions_count, len(listening_ids))
-    )
-    
-    # Speaking
-    speaking_ids = list(
-        SpeakingQuestion.objects.filter(
-            video__levels_units_question_bank=question_bank,
-            video__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['speaking'] = random.sample(
-        speaking_ids,
-        min(unit_exam.speaking_questions_count, len(speaking_ids))
-    )
-    
-    # Writing
-    writing_ids = list(
-        WritingQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['writing'] = random.sample(
-        writing_ids,
-        min(unit_exam.writing_questions_count, len(writing_ids))
-    )
-    
-    return selected_questions
+    # ✅ الاختيار من pools في Redis (SRANDMEMBER) بدل تحميل كل الـ IDs من الـ DB
+    return sample_question_ids('levels', question_bank.id, {
+        'vocabulary': unit_exam.vocabulary_count,
+        'grammar': unit_exam.grammar_count,
+        'reading': unit_exam.reading_questions_count,
+        'listening': unit_exam.listening_questions_count,
+        'speaking': unit_exam.speaking_questions_count,
+        'writing': unit_exam.writing_questions_count,
+    })
 
 
 def select_random_questions_for_level_exam(question_bank, level_exam):
@@ -2472,91 +2422,15 @@ def select_random_questions_for_level_exam(question_bank, level_exam):
     
     نفس المنطق لكن مع أعداد مختلفة
     """
-    selected_questions = {
-        'vocabulary': [],
-        'grammar': [],
-        'reading': [],
-        'listening': [],
-        'speaking': [],
-        'writing': []
-    }
-    
-    # Vocabulary
-    vocab_ids = list(
-        VocabularyQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['vocabulary'] = random.sample(
-        vocab_ids,
-        min(level_exam.vocabulary_count, len(vocab_ids))
-    )
-    
-    # Grammar
-    grammar_ids = list(
-        GrammarQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['grammar'] = random.sample(
-        grammar_ids,
-        min(level_exam.grammar_count, len(grammar_ids))
-    )
-    
-    # Reading
-    reading_ids = list(
-        ReadingQuestion.objects.filter(
-            passage__levels_units_question_bank=question_bank,
-            passage__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['reading'] = random.sample(
-        reading_ids,
-        min(level_exam.reading_questions_count, len(reading_ids))
-    )
-    
-    # Listening
-    listening_ids = list(
-        ListeningQuestion.objects.filter(
-            audio__levels_units_question_bank=question_bank,
-            audio__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['listening'] = random.sample(
-        listening_ids,
-        min(level_exam.listening_questions_count, len(listening_ids))
-    )
-    
-    # Speaking
-    speaking_ids = list(
-        SpeakingQuestion.objects.filter(
-            video__levels_units_question_bank=question_bank,
-            video__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['speaking'] = random.sample(
-        speaking_ids,
-        min(level_exam.speaking_questions_count, len(speaking_ids))
-    )
-    
-    # Writing
-    writing_ids = list(
-        WritingQuestion.objects.filter(
-            levels_units_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['writing'] = random.sample(
-        writing_ids,
-        min(level_exam.writing_questions_count, len(writing_ids))
-    )
-    
-    return selected_questions
+    # ✅ الاختيار من pools في Redis (SRANDMEMBER) بدل تحميل كل الـ IDs من الـ DB
+    return sample_question_ids('levels', question_bank.id, {
+        'vocabulary': level_exam.vocabulary_count,
+        'grammar': level_exam.grammar_count,
+        'reading': level_exam.reading_questions_count,
+        'listening': level_exam.listening_questions_count,
+        'speaking': level_exam.speaking_questions_count,
+        'writing': level_exam.writing_questions_count,
+    })
 
 def fetch_selected_questions_data(selected_questions):
     from placement_test.serializers import (
@@ -2642,6 +2516,312 @@ def fetch_selected_questions_data(selected_questions):
     exam_questions['writing'] = WritingQuestionSerializer(writing_questions, many=True).data
 
     return exam_questions
+
+
+def grade_writing_answers(writing_questions, writing_answers, exam_label):
+    """
+    تصحيح أسئلة الكتابة في امتحان وحدة/مستوى بالتوازي
+
+    Args:
+        writing_questions: queryset من WritingQuestion
+        writing_answers: {"<question_id>": "text answer", ...}
+        exam_label: اسم الامتحان للـ logs ("Unit Exam" / "Level Exam")
+
+    Returns:
+        (total_score, max_score)
+    """
+    total_score = 0
+    max_score = 0
+
+    answered = []
+    grading_requests = []
+    for wq in writing_questions:
+        max_score += wq.points
+        student_answer = writing_answers.get(str(wq.id), '')
+
+        if student_answer:
+            answered.append(wq)
+            grading_requests.append({
+                'question_text': wq.question_text,
+                'student_answer': student_answer,
+                'sample_answer': wq.sample_answer or '',
+                'rubric': wq.rubric or '',
+                'max_points': wq.points,
+                'min_words': wq.min_words,
+                'max_words': wq.max_words,
+                'pass_threshold': wq.pass_threshold
+            })
+
+    logger.info(f"Grading {len(grading_requests)} writing questions for {exam_label}")
+
+    # ✅ كل الأسئلة بتتصحح في نفس الوقت - الأسئلة اللي تفشل بتاخد fallback grading
+    ai_results = ai_grading_service.grade_writing_batch(grading_requests)
+
+    for wq, ai_result in zip(answered, ai_results):
+        total_score += ai_result['score']
+
+        logger.info(
+            f"Writing Q{wq.id}: Raw={ai_result['raw_score']}/{wq.points}, "
+            f"Percentage={ai_result['percentage']:.1f}%, "
+            f"Binary Score={ai_result['score']}/1, "
+            f"Cost=${ai_result['cost']:.6f}"
+        )
+
+    return total_score, max_score
+
+
+def build_exam_result_snapshot(attempt, result_serializer_class, passing_score, sections=None, **extra):
+    """
+    نتيجة امتحان الوحدة/المستوى بتتبني مرة واحدة وقت التسليم وبتتحفظ في result_snapshot
+    (الـ submit والـ history بيرجعوها زي ما هي)
+    """
+    time_taken = attempt.time_taken or 0
+    result = {
+        'attempt': result_serializer_class(attempt).data,
+        'score': attempt.score,
+        'max_score': 100,
+        'passed': attempt.passed,
+        'passing_score': passing_score,
+        'time_taken_seconds': time_taken,
+        'time_taken_minutes': round(time_taken / 60, 2)
+    }
+    if sections is not None:
+        result['sections'] = sections
+    return {'result': result, **extra}
+
+
+def autosave_exam_attempt(request, attempt_model, attempt_id):
+    """
+    حفظ التغييرات في إجابات امتحان وحدة/مستوى داخل attempt.answers
+
+    GET  ← الإجابات المحفوظة (للاستكمال بعد انقطاع الاتصال)
+    POST ← {"answers": {"vocabulary": [{"question_id": 1, "selected_choice": "A"}], ...}}
+           الأسئلة اللي اتغيرت بس - null بيمسح الإجابة
+    """
+    with transaction.atomic():
+        attempt = get_object_or_404(
+            attempt_model.objects.select_for_update(),
+            id=attempt_id,
+            student=request.user
+        )
+        
+        if attempt.submitted_at:
+            return Response({
+                'error': 'تم تسليم هذا الامتحان مسبقاً'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.method == 'POST' and is_past_grace(attempt.expires_at):
+            return Response({
+                'error': 'انتهى وقت الامتحان'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if request.method == 'GET':
+            answers = merge_answer_deltas(attempt.answers, {})
+            return Response({
+                'attempt_id': attempt.id,
+                'answers': answers,
+                'answered_count': count_answers(answers)
+            }, status=status.HTTP_200_OK)
+        
+        deltas = request.data.get('answers')
+        if not isinstance(deltas, dict) or not all(
+            isinstance(value, list) for value in deltas.values()
+        ):
+            return Response({
+                'error': 'يجب إرسال الإجابات'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        deltas = filter_allowed_deltas(deltas, attempt.generated_questions)
+        attempt.answers = merge_answer_deltas(attempt.answers, deltas)
+        attempt.save(update_fields=['answers', 'updated_at'])
+    
+    return Response({
+        'message': 'تم حفظ الإجابات',
+        'saved_count': count_answers(deltas),
+        'answered_count': count_answers(attempt.answers),
+        'saved_at': timezone.now()
+    }, status=status.HTTP_200_OK)
+
+
+def grade_exam_answers(generated_questions, answers, exam_label):
+    """
+    تصحيح إجابات امتحان وحدة/مستوى (MCQ + Writing)
+
+    Returns:
+        (percentage, sections) - sections = {'vocabulary': {'score', 'max_score'}, ...}
+    """
+    total_score = 0
+    max_score = 0
+    sections = {}
+    
+    # ✅ تصحيح MCQ - النظام الجديد (arrays)
+    mcq_config = {
+        'vocabulary': VocabularyQuestion,
+        'grammar': GrammarQuestion,
+        'reading': ReadingQuestion,
+        'listening': ListeningQuestion,
+        'speaking': SpeakingQuestion,
+    }
+    
+    for q_type, QuestionModel in mcq_config.items():
+        question_ids = generated_questions.get(q_type, [])
+        questions = QuestionModel.objects.filter(id__in=question_ids)
+        
+        # ✅ تحويل الـ array لـ dict للبحث السريع
+        # answers[q_type] = [{"question_id": 1, "selected_choice": "A"}, ...]
+        type_answers = {
+            str(ans['question_id']): ans['selected_choice']
+            for ans in answers.get(q_type, [])
+            if 'question_id' in ans and 'selected_choice' in ans
+        }
+        
+        section_score = 0
+        section_max_score = 0
+        for q in questions:
+            section_max_score += q.points
+            student_answer = type_answers.get(str(q.id))
+            
+            if student_answer == q.correct_answer:
+                section_score += q.points
+        
+        sections[q_type] = {'score': section_score, 'max_score': section_max_score}
+        total_score += section_score
+        max_score += section_max_score
+    
+    # ✅ تصحيح Writing - النظام الجديد
+    writing_ids = generated_questions.get('writing', [])
+    writing_questions = WritingQuestion.objects.filter(id__in=writing_ids)
+    
+    # answers['writing'] = [{"question_id": 7, "text_answer": "My answer..."}]
+    writing_answers = {
+        str(ans['question_id']): ans.get('text_answer', '')
+        for ans in answers.get('writing', [])
+        if 'question_id' in ans
+    }
+    
+    writing_score, writing_max_score = grade_writing_answers(
+        writing_questions, writing_answers, exam_label
+    )
+    total_score += writing_score
+    max_score += writing_max_score
+    sections['writing'] = {'score': writing_score, 'max_score': writing_max_score}
+    
+    percentage = (total_score / max_score * 100) if max_score > 0 else 0
+    return percentage, sections
+
+
+def pregrade_exam_attempt(attempt, request_answers, exam_label):
+    """
+    تصحيح الإجابات (الكتابة بالـ AI) قبل الـ select_for_update - المحاولة ما تفضلش مقفولة طول التصحيح
+    
+    Returns:
+        (answers, (percentage, sections)) أو None لو مفيش حاجة تتصحح
+    """
+    if attempt is None or attempt.submitted_at:
+        return None
+    
+    if is_past_grace(attempt.expires_at):
+        answers = merge_answer_deltas(attempt.answers, {})
+    else:
+        answers = merge_answer_deltas(attempt.answers, request_answers or {})
+        if not count_answers(answers):
+            return None
+    
+    return answers, grade_exam_answers(attempt.generated_questions, answers, exam_label)
+
+
+def finalize_unit_exam_attempt(attempt, answers, pregraded=None):
+    """
+    تصحيح وتسليم محاولة امتحان وحدة (من submit_unit_exam أو من الـ sweeper بعد انتهاء الوقت)
+    لازم تتنادى جوه transaction والمحاولة مقفولة بـ select_for_update
+    pregraded: نتيجة pregrade_exam_attempt (التصحيح اللي اتعمل قبل الـ lock)
+    """
+    now = timezone.now()
+    attempt.answers = answers
+    attempt.time_taken = int((now - attempt.started_at).total_seconds())
+    
+    if pregraded and pregraded[0] == answers:
+        percentage, sections = pregraded[1]
+    else:
+        # الإجابات اتغيرت بين التصحيح والـ lock (autosave في نفس اللحظة)
+        percentage, sections = grade_exam_answers(attempt.generated_questions, answers, 'Unit Exam')
+    passed = percentage >= attempt.unit_exam.passing_score
+    
+    attempt.score = int(percentage)
+    attempt.passed = passed
+    attempt.submitted_at = now
+    attempt.result_snapshot = build_exam_result_snapshot(
+        attempt, StudentUnitExamAttemptResultSerializer,
+        attempt.unit_exam.passing_score, sections,
+        unit_status='COMPLETED' if passed else 'FAILED'
+    )
+    attempt.save()
+    
+    if passed:
+        student_unit = StudentUnit.objects.get(
+            student_id=attempt.student_id,
+            unit=attempt.unit_exam.unit
+        )
+        student_unit.exam_passed = True
+        student_unit.status = 'COMPLETED'
+        student_unit.completed_at = now
+        student_unit.save()
+    
+    return attempt
+
+
+def finalize_level_exam_attempt(attempt, answers, pregraded=None):
+    """
+    تصحيح وتسليم محاولة امتحان مستوى (من submit_level_exam أو من الـ sweeper بعد انتهاء الوقت)
+    لازم تتنادى جوه transaction والمحاولة مقفولة بـ select_for_update
+    pregraded: نتيجة pregrade_exam_attempt (التصحيح اللي اتعمل قبل الـ lock)
+    """
+    now = timezone.now()
+    attempt.answers = answers
+    attempt.time_taken = int((now - attempt.started_at).total_seconds())
+    
+    if pregraded and pregraded[0] == answers:
+        percentage, sections = pregraded[1]
+    else:
+        # الإجابات اتغيرت بين التصحيح والـ lock (autosave في نفس اللحظة)
+        percentage, sections = grade_exam_answers(attempt.generated_questions, answers, 'Level Exam')
+    passed = percentage >= attempt.level_exam.passing_score
+    
+    attempt.score = int(percentage)
+    attempt.passed = passed
+    attempt.submitted_at = now
+    attempt.result_snapshot = build_exam_result_snapshot(
+        attempt, StudentLevelExamAttemptResultSerializer,
+        attempt.level_exam.passing_score, sections,
+        level_status='COMPLETED' if passed else 'FAILED',
+        congratulations='🎉 تهانينا! لقد أكملت المستوى بنجاح!' if passed else None
+    )
+    attempt.save()
+    
+    if passed:
+        student_level = StudentLevel.objects.get(
+            student_id=attempt.student_id,
+            level=attempt.level_exam.level
+        )
+        student_level.status = 'COMPLETED'
+        student_level.completed_at = now
+        student_level.save()
+    
+    return attempt
+
+
+def get_exam_timer(request, kind, attempt_id):
+    """
+    الوقت المتبقي لمحاولة امتحان وحدة/مستوى (Redis أولاً - من غير ما نلمس الـ DB)
+    """
+    timer = get_remaining_time(kind, attempt_id, request.user.id)
+    if timer is None:
+        return Response({
+            'error': 'المحاولة غير موجودة'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(timer, status=status.HTTP_200_OK)
+
+
 # ============================================
 # 10. UNIT EXAM - START & SUBMIT
 # ============================================
@@ -2729,6 +2909,8 @@ def start_unit_exam(request, unit_id):
         )
         
         exam_questions = fetch_selected_questions_data(selected_questions)
+        
+        transaction.on_commit(lambda: start_timer('unit', attempt))
     
     return Response({
         'message': 'تم بدء الامتحان بنجاح',
@@ -2737,7 +2919,7 @@ def start_unit_exam(request, unit_id):
             'attempt_number': attempt.attempt_number,
             'started_at': attempt.started_at,
             'time_limit_minutes': unit_exam.time_limit,
-            'ends_at': attempt.started_at + timezone.timedelta(minutes=unit_exam.time_limit)
+            'ends_at': attempt.expires_at
         },
         'exam_info': {
             'id': unit_exam.id,
@@ -2760,162 +2942,77 @@ def start_unit_exam(request, unit_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_unit_exam(request, attempt_id):
-    attempt = get_object_or_404(
-        StudentUnitExamAttempt,
-        id=attempt_id,
-        student=request.user
+    pregraded = pregrade_exam_attempt(
+        StudentUnitExamAttempt.objects.filter(id=attempt_id, student=request.user).first(),
+        request.data.get('answers'),
+        'Unit Exam'
     )
     
-    if attempt.submitted_at:
-        serializer = StudentUnitExamAttemptResultSerializer(attempt)
-        return Response({
-            'message': 'تم تسليم هذا الامتحان مسبقاً',
-            'result': {
-                'attempt': serializer.data,
-                'score': attempt.score,
-                'max_score': 100,
-                'passed': attempt.passed,
-                'passing_score': attempt.unit_exam.passing_score,
-                'time_taken_seconds': attempt.time_taken,
-                'time_taken_minutes': round(attempt.time_taken / 60, 2)
-            },
-            'unit_status': 'COMPLETED' if attempt.passed else 'FAILED'
-        }, status=status.HTTP_200_OK)
-    
-    answers = request.data.get('answers', {})
-    
-    if not answers:
-        return Response({
-            'error': 'يجب إرسال الإجابات'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
     with transaction.atomic():
-        attempt.answers = answers
-        
-        time_taken = (timezone.now() - attempt.started_at).total_seconds()
-        attempt.time_taken = int(time_taken)
-        
-        total_score = 0
-        max_score = 0
-        
-        generated_questions = attempt.generated_questions
-        
-        # ✅ تصحيح MCQ - النظام الجديد (arrays)
-        mcq_config = {
-            'vocabulary': VocabularyQuestion,
-            'grammar': GrammarQuestion,
-            'reading': ReadingQuestion,
-            'listening': ListeningQuestion,
-            'speaking': SpeakingQuestion,
-        }
+        # ✅ select_for_update عشان الـ sweeper ما يسلّمش نفس المحاولة في نفس الوقت
+        attempt = get_object_or_404(
+            StudentUnitExamAttempt.objects.select_for_update(),
+            id=attempt_id,
+            student=request.user
+        )
         
-        for q_type, QuestionModel in mcq_config.items():
-            question_ids = generated_questions.get(q_type, [])
-            questions = QuestionModel.objects.filter(id__in=question_ids)
-            
-            # ✅ تحويل الـ array لـ dict للبحث السريع
-            # answers[q_type] = [{"question_id": 1, "selected_choice": "A"}, ...]
-            type_answers = {
-                str(ans['question_id']): ans['selected_choice']
-                for ans in answers.get(q_type, [])
-                if 'question_id' in ans and 'selected_choice' in ans
-            }
-            
-            for q in questions:
-                max_score += q.points
-                student_answer = type_answers.get(str(q.id))
-                
-                if student_answer == q.correct_answer:
-                    total_score += q.points
-        
-        # ✅ تصحيح Writing - النظام الجديد
-        writing_ids = generated_questions.get('writing', [])
-        writing_questions = WritingQuestion.objects.filter(id__in=writing_ids)
-        
-        # answers['writing'] = [{"question_id": 7, "text_answer": "My answer..."}]
-        writing_answers = {
-            str(ans['question_id']): ans.get('text_answer', '')
-            for ans in answers.get('writing', [])
-            if 'question_id' in ans
-        }
+        if attempt.submitted_at:
+            # ✅ النتيجة محفوظة وقت التسليم
+            if attempt.result_snapshot is None:
+                attempt.result_snapshot = build_exam_result_snapshot(
+                    attempt, StudentUnitExamAttemptResultSerializer,
+                    attempt.unit_exam.passing_score,
+                    unit_status='COMPLETED' if attempt.passed else 'FAILED'
+                )
+                attempt.save(update_fields=['result_snapshot', 'updated_at'])
+            return Response({
+                'message': 'تم تسليم هذا الامتحان مسبقاً',
+                **attempt.result_snapshot
+            }, status=status.HTTP_200_OK)
         
-        for wq in writing_questions:
-            max_score += wq.points
-            student_answer = writing_answers.get(str(wq.id), '')
+        if is_past_grace(attempt.expires_at):
+            # ✅ الوقت خلص: الإجابات المحفوظة بالـ autosave بس هي اللي بتتحسب
+            answers = merge_answer_deltas(attempt.answers, {})
+        else:
+            # ✅ دمج الإجابات المحفوظة بالـ autosave مع الإجابات المبعوتة
+            answers = merge_answer_deltas(attempt.answers, request.data.get('answers') or {})
             
-            if student_answer:
-                try:
-                    logger.info(f"Grading writing question {wq.id} for Unit Exam")
-                    
-                    ai_result = ai_grading_service.grade_writing_question(
-                        question_text=wq.question_text,
-                        student_answer=student_answer,
-                        sample_answer=wq.sample_answer or '',
-                        rubric=wq.rubric or '',
-                        max_points=wq.points,
-                        min_words=wq.min_words,
-                        max_words=wq.max_words,
-                        pass_threshold=wq.pass_threshold
-                    )
-                    
-                    total_score += ai_result['score']
-                    
-                    logger.info(
-                        f"Writing Q{wq.id}: Raw={ai_result['raw_score']}/{wq.points}, "
-                        f"Percentage={ai_result['percentage']:.1f}%, "
-                        f"Binary Score={ai_result['score']}/1, "
-                        f"Cost=${ai_result['cost']:.6f}"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"AI Grading Error for Writing Q{wq.id}: {str(e)}")
-                    word_count = len(student_answer.split())
-                    if wq.min_words <= word_count <= wq.max_words:
-                        total_score += 1
-                        logger.warning(f"Used fallback grading for Q{wq.id}: word_count={word_count}, score=1")
-                    else:
-                        logger.warning(f"Used fallback grading for Q{wq.id}: word_count={word_count}, score=0")
-        
-        percentage = (total_score / max_score * 100) if max_score > 0 else 0
-        passed = percentage >= attempt.unit_exam.passing_score
-        
-        attempt.score = int(percentage)
-        attempt.passed = passed
-        attempt.submitted_at = timezone.now()
-        attempt.save()
+            if not count_answers(answers):
+                return Response({
+                    'error': 'يجب إرسال الإجابات'
+                }, status=status.HTTP_400_BAD_REQUEST)
         
-        if passed:
-            student_unit = StudentUnit.objects.get(
-                student=request.user,
-                unit=attempt.unit_exam.unit
-            )
-            student_unit.exam_passed = True
-            student_unit.status = 'COMPLETED'
-            student_unit.completed_at = timezone.now()
-            student_unit.save()
-            
-            total_units = attempt.unit_exam.unit.level.get_units_count()
-            completed_units = StudentUnit.objects.filter(
-                student=request.user,
-                unit__level=attempt.unit_exam.unit.level,
-                status='COMPLETED'
-            ).count()
+        finalize_unit_exam_attempt(attempt, answers, pregraded)
     
-    serializer = StudentUnitExamAttemptResultSerializer(attempt)
+    clear_timer('unit', attempt.id)
     
     return Response({
         'message': 'تم تسليم الامتحان بنجاح',
-        'result': {
-            'attempt': serializer.data,
-            'score': attempt.score,
-            'max_score': 100,
-            'passed': attempt.passed,
-            'passing_score': attempt.unit_exam.passing_score,
-            'time_taken_seconds': attempt.time_taken,
-            'time_taken_minutes': round(attempt.time_taken / 60, 2)
-        },
-        'unit_status': 'COMPLETED' if passed else 'FAILED'
+        **attempt.result_snapshot
     }, status=status.HTTP_200_OK)
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def autosave_unit_exam(request, attempt_id):
+    """
+    حفظ إجابات امتحان الوحدة تلقائياً (التغييرات فقط)
+
+    GET/POST /api/levels/student/exams/unit/autosave/{attempt_id}/
+    """
+    return autosave_exam_attempt(request, StudentUnitExamAttempt, attempt_id)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_unit_exam_timer(request, attempt_id):
+    """
+    الوقت المتبقي لامتحان الوحدة (للـ polling من الـ frontend)
+
+    GET /api/levels/student/exams/unit/timer/{attempt_id}/
+    """
+    return get_exam_timer(request, 'unit', attempt_id)
+
+
 # ============================================
 # 11. LEVEL EXAM - START & SUBMIT
 # ============================================
@@ -3011,6 +3108,8 @@ def start_level_exam(request, level_id):
         )
         
         exam_questions = fetch_selected_questions_data(selected_questions)
+        
+        transaction.on_commit(lambda: start_timer('level', attempt))
     
     return Response({
         'message': 'تم بدء امتحان المستوى بنجاح',
@@ -3019,7 +3118,7 @@ def start_level_exam(request, level_id):
             'attempt_number': attempt.attempt_number,
             'started_at': attempt.started_at,
             'time_limit_minutes': level_exam.time_limit,
-            'ends_at': attempt.started_at + timezone.timedelta(minutes=level_exam.time_limit)
+            'ends_at': attempt.expires_at
         },
         'exam_info': {
             'id': level_exam.id,
@@ -3042,155 +3141,77 @@ def start_level_exam(request, level_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def submit_level_exam(request, attempt_id):
-    attempt = get_object_or_404(
-        StudentLevelExamAttempt,
-        id=attempt_id,
-        student=request.user
+    pregraded = pregrade_exam_attempt(
+        StudentLevelExamAttempt.objects.filter(id=attempt_id, student=request.user).first(),
+        request.data.get('answers'),
+        'Level Exam'
     )
     
-    if attempt.submitted_at:
-        serializer = StudentUnitExamAttemptResultSerializer(attempt)
-        return Response({
-            'message': 'تم تسليم هذا الامتحان مسبقاً',
-            'result': {
-                'attempt': serializer.data,
-                'score': attempt.score,
-                'max_score': 100,
-                'passed': attempt.passed,
-                'passing_score': attempt.unit_exam.passing_score,
-                'time_taken_seconds': attempt.time_taken,
-                'time_taken_minutes': round(attempt.time_taken / 60, 2)
-            },
-            'unit_status': 'COMPLETED' if attempt.passed else 'FAILED'
-        }, status=status.HTTP_200_OK)
-    
-    answers = request.data.get('answers', {})
-    
-    if not answers:
-        return Response({
-            'error': 'يجب إرسال الإجابات'
-        }, status=status.HTTP_400_BAD_REQUEST)
-    
     with transaction.atomic():
-        attempt.answers = answers
-        
-        time_taken = (timezone.now() - attempt.started_at).total_seconds()
-        attempt.time_taken = int(time_taken)
-        
-        total_score = 0
-        max_score = 0
-        
-        generated_questions = attempt.generated_questions
-        
-        # ✅ تصحيح MCQ - النظام الجديد (arrays)
-        mcq_config = {
-            'vocabulary': VocabularyQuestion,
-            'grammar': GrammarQuestion,
-            'reading': ReadingQuestion,
-            'listening': ListeningQuestion,
-            'speaking': SpeakingQuestion,
-        }
-        
-        for q_type, QuestionModel in mcq_config.items():
-            question_ids = generated_questions.get(q_type, [])
-            questions = QuestionModel.objects.filter(id__in=question_ids)
-            
-            # ✅ تحويل الـ array لـ dict للبحث السريع
-            type_answers = {
-                str(ans['question_id']): ans['selected_choice']
-                for ans in answers.get(q_type, [])
-                if 'question_id' in ans and 'selected_choice' in ans
-            }
-            
-            for q in questions:
-                max_score += q.points
-                student_answer = type_answers.get(str(q.id))
-                
-                if student_answer == q.correct_answer:
-                    total_score += q.points
-        
-        # ✅ تصحيح Writing - النظام الجديد
-        writing_ids = generated_questions.get('writing', [])
-        writing_questions = WritingQuestion.objects.filter(id__in=writing_ids)
+        # ✅ select_for_update عشان الـ sweeper ما يسلّمش نفس المحاولة في نفس الوقت
+        attempt = get_object_or_404(
+            StudentLevelExamAttempt.objects.select_for_update(),
+            id=attempt_id,
+            student=request.user
+        )
         
-        writing_answers = {
-            str(ans['question_id']): ans.get('text_answer', '')
-            for ans in answers.get('writing', [])
-            if 'question_id' in ans
-        }
+        if attempt.submitted_at:
+            # ✅ النتيجة محفوظة وقت التسليم
+            if attempt.result_snapshot is None:
+                attempt.result_snapshot = build_exam_result_snapshot(
+                    attempt, StudentLevelExamAttemptResultSerializer,
+                    attempt.level_exam.passing_score,
+                    level_status='COMPLETED' if attempt.passed else 'FAILED'
+                )
+                attempt.save(update_fields=['result_snapshot', 'updated_at'])
+            return Response({
+                'message': 'تم تسليم هذا الامتحان مسبقاً',
+                **attempt.result_snapshot
+            }, status=status.HTTP_200_OK)
         
-        for wq in writing_questions:
-            max_score += wq.points
-            student_answer = writing_answers.get(str(wq.id), '')
+        if is_past_grace(attempt.expires_at):
+            # ✅ الوقت خلص: الإجابات المحفوظة بالـ autosave بس هي اللي بتتحسب
+            answers = merge_answer_deltas(attempt.answers, {})
+        else:
+            # ✅ دمج الإجابات المحفوظة بالـ autosave مع الإجابات المبعوتة
+            answers = merge_answer_deltas(attempt.answers, request.data.get('answers') or {})
             
-            if student_answer:
-                try:
-                    logger.info(f"Grading writing question {wq.id} for Level Exam")
-                    
-                    ai_result = ai_grading_service.grade_writing_question(
-                        question_text=wq.question_text,
-                        student_answer=student_answer,
-                        sample_answer=wq.sample_answer or '',
-                        rubric=wq.rubric or '',
-                        max_points=wq.points,
-                        min_words=wq.min_words,
-                        max_words=wq.max_words,
-                        pass_threshold=wq.pass_threshold
-                    )
-                    
-                    total_score += ai_result['score']
-                    
-                    logger.info(
-                        f"Writing Q{wq.id}: Raw={ai_result['raw_score']}/{wq.points}, "
-                        f"Percentage={ai_result['percentage']:.1f}%, "
-                        f"Binary Score={ai_result['score']}/1, "
-                        f"Cost=${ai_result['cost']:.6f}"
-                    )
-                    
-                except Exception as e:
-                    logger.error(f"AI Grading Error for Writing Q{wq.id}: {str(e)}")
-                    word_count = len(student_answer.split())
-                    if wq.min_words <= word_count <= wq.max_words:
-                        total_score += 1
-                        logger.warning(f"Used fallback grading for Q{wq.id}: word_count={word_count}, score=1")
-                    else:
-                        logger.warning(f"Used fallback grading for Q{wq.id}: word_count={word_count}, score=0")
-        
-        percentage = (total_score / max_score * 100) if max_score > 0 else 0
-        passed = percentage >= attempt.level_exam.passing_score
-        
-        attempt.score = int(percentage)
-        attempt.passed = passed
-        attempt.submitted_at = timezone.now()
-        attempt.save()
+            if not count_answers(answers):
+                return Response({
+                    'error': 'يجب إرسال الإجابات'
+                }, status=status.HTTP_400_BAD_REQUEST)
         
-        if passed:
-            student_level = StudentLevel.objects.get(
-                student=request.user,
-                level=attempt.level_exam.level
-            )
-            student_level.status = 'COMPLETED'
-            student_level.completed_at = timezone.now()
-            student_level.save()
+        finalize_level_exam_attempt(attempt, answers, pregraded)
     
-    serializer = StudentLevelExamAttemptResultSerializer(attempt)
-
+    clear_timer('level', attempt.id)
     
     return Response({
         'message': 'تم تسليم امتحان المستوى بنجاح',
-        'result': {
-            'attempt': serializer.data,
-            'score': attempt.score,
-            'max_score': 100,
-            'passed': attempt.passed,
-            'passing_score': attempt.level_exam.passing_score,
-            'time_taken_seconds': attempt.time_taken,
-            'time_taken_minutes': round(attempt.time_taken / 60, 2)
-        },
-        'level_status': 'COMPLETED' if passed else 'FAILED',
-        'congratulations': '🎉 تهانينا! لقد أكملت المستوى بنجاح!' if passed else None
+        **attempt.result_snapshot
     }, status=status.HTTP_200_OK)
 
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def autosave_level_exam(request, attempt_id):
+    """
+    حفظ إجابات امتحان المستوى تلقائياً (التغييرات فقط)
+
+    GET/POST /api/levels/student/exams/level/autosave/{attempt_id}/
+    """
+    return autosave_exam_attempt(request, StudentLevelExamAttempt, attempt_id)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_level_exam_timer(request, attempt_id):
+    """
+    الوقت المتبقي لامتحان المستوى (للـ polling من الـ frontend)
+
+    GET /api/levels/student/exams/level/timer/{attempt_id}/
+    """
+    return get_exam_timer(request, 'level', attempt_id)
+
+
 # ============================================
 # 12. EXAM RESULTS & HISTORY
 # ============================================
@@ -3210,16 +3231,20 @@ def my_unit_exam_attempts(request):
     
     attempts = StudentUnitExamAttempt.objects.filter(
         student=request.user
-    ).select_related('unit_exam', 'unit_exam__unit').order_by('-started_at')
+    ).select_related('unit_exam', 'unit_exam__unit', 'unit_exam__unit__level').defer('result_snapshot').order_by('-started_at')
     
     if unit_id:
         attempts = attempts.filter(unit_exam__unit_id=unit_id)
     
     serializer = StudentUnitExamAttemptSerializer(attempts, many=True)
     
-    # إحصائيات
-    total_attempts = attempts.count()
-    passed_attempts = attempts.filter(passed=True).count()
+    # إحصائيات (query واحدة)
+    stats = attempts.aggregate(
+        total_attempts=Count('id'),
+        passed=Count('id', filter=Q(passed=True))
+    )
+    total_attempts = stats['total_attempts']
+    passed_attempts = stats['passed']
     
     return Response({
         'summary': {
@@ -3243,16 +3268,20 @@ def my_level_exam_attempts(request):
     
     attempts = StudentLevelExamAttempt.objects.filter(
         student=request.user
-    ).select_related('level_exam', 'level_exam__level').order_by('-started_at')
+    ).select_related('level_exam', 'level_exam__level').defer('result_snapshot').order_by('-started_at')
     
     if level_id:
         attempts = attempts.filter(level_exam__level_id=level_id)
     
     serializer = StudentLevelExamAttemptSerializer(attempts, many=True)
     
-    # إحصائيات
-    total_attempts = attempts.count()
-    passed_attempts = attempts.filter(passed=True).count()
+    # إحصائيات (query واحدة)
+    stats = attempts.aggregate(
+        total_attempts=Count('id'),
+        passed=Count('id', filter=Q(passed=True))
+    )
+    total_attempts = stats['total_attempts']
+    passed_attempts = stats['passed']
     
     return Response({
         'summary': {
@@ -3268,11 +3297,7 @@ def my_level_exam_attempts(request):
 # أضف الكود ده في نهاية views.py
 # ============================================
 
-from placement_test.serializers import (
-    ReadingQuestionSerializer,
-    ListeningQuestionSerializer,
-    SpeakingQuestionSerializer,
-)
+from levels.course_cache import get_lesson_full_payload, get_unit_bundle, get_course_tree
 
 # ============================================
 # READING - Lesson + Content + Questions
@@ -3314,44 +3339,8 @@ def get_reading_lesson_full(request, lesson_id):
             'error': 'هذا الدرس ليس من نوع READING'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    lesson_data = LessonDetailSerializer(lesson).data
-
-    # المحتوى
-    reading_content = getattr(lesson, 'reading_content', None)
-    if not reading_content:
-        return Response({
-            'lesson': lesson_data,
-            'content': None,
-            'questions': [],
-            'questions_count': 0
-        }, status=status.HTTP_200_OK)
-
-    content_data = {
-        'explanation': reading_content.explanation,
-        'vocabulary_words': reading_content.vocabulary_words,
-        'passage': {
-            'id': reading_content.passage.id,
-            'title': reading_content.passage.title,
-            'passage_text': reading_content.passage.passage_text,
-            'passage_image': reading_content.passage.passage_image.url if reading_content.passage.passage_image else None,
-            'source': reading_content.passage.source,
-        }
-    }
-
-    # الأسئلة
-    questions = ReadingQuestion.objects.filter(
-        passage=reading_content.passage,
-        is_active=True
-    ).order_by('order', 'id')
-
-    questions_data = ReadingQuestionSerializer(questions, many=True).data
-
-    return Response({
-        'lesson': lesson_data,
-        'content': content_data,
-        'questions': questions_data,
-        'questions_count': questions.count()
-    }, status=status.HTTP_200_OK)
+    # ✅ من الكاش (بيتلغي تلقائياً مع أي تعديل في المحتوى)
+    return Response(get_lesson_full_payload(lesson), status=status.HTTP_200_OK)
 
 
 # ============================================
@@ -3387,41 +3376,8 @@ def get_listening_lesson_full(request, lesson_id):
             'error': 'هذا الدرس ليس من نوع LISTENING'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    lesson_data = LessonDetailSerializer(lesson).data
-
-    listening_content = getattr(lesson, 'listening_content', None)
-    if not listening_content:
-        return Response({
-            'lesson': lesson_data,
-            'content': None,
-            'questions': [],
-            'questions_count': 0
-        }, status=status.HTTP_200_OK)
-
-    content_data = {
-        'explanation': listening_content.explanation,
-        'audio': {
-            'id': listening_content.audio.id,
-            'title': listening_content.audio.title,
-            'audio_file': listening_content.audio.audio_file.url if listening_content.audio.audio_file else None,
-            'transcript': listening_content.audio.transcript,
-            'duration': listening_content.audio.duration,
-        }
-    }
-
-    questions = ListeningQuestion.objects.filter(
-        audio=listening_content.audio,
-        is_active=True
-    ).order_by('order', 'id')
-
-    questions_data = ListeningQuestionSerializer(questions, many=True).data
-
-    return Response({
-        'lesson': lesson_data,
-        'content': content_data,
-        'questions': questions_data,
-        'questions_count': questions.count()
-    }, status=status.HTTP_200_OK)
+    # ✅ من الكاش (بيتلغي تلقائياً مع أي تعديل في المحتوى)
+    return Response(get_lesson_full_payload(lesson), status=status.HTTP_200_OK)
 
 
 # ============================================
@@ -3457,42 +3413,8 @@ def get_speaking_lesson_full(request, lesson_id):
             'error': 'هذا الدرس ليس من نوع SPEAKING'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    lesson_data = LessonDetailSerializer(lesson).data
-
-    speaking_content = getattr(lesson, 'speaking_content', None)
-    if not speaking_content:
-        return Response({
-            'lesson': lesson_data,
-            'content': None,
-            'questions': [],
-            'questions_count': 0
-        }, status=status.HTTP_200_OK)
-
-    content_data = {
-        'explanation': speaking_content.explanation,
-        'video': {
-            'id': speaking_content.video.id,
-            'title': speaking_content.video.title,
-            'video_file': speaking_content.video.video_file.url if speaking_content.video.video_file else None,
-            'thumbnail': speaking_content.video.thumbnail.url if speaking_content.video.thumbnail else None,
-            'description': speaking_content.video.description,
-            'duration': speaking_content.video.duration,
-        }
-    }
-
-    questions = SpeakingQuestion.objects.filter(
-        video=speaking_content.video,
-        is_active=True
-    ).order_by('order', 'id')
-
-    questions_data = SpeakingQuestionSerializer(questions, many=True).data
-
-    return Response({
-        'lesson': lesson_data,
-        'content': content_data,
-        'questions': questions_data,
-        'questions_count': questions.count()
-    }, status=status.HTTP_200_OK)
+    # ✅ من الكاش (بيتلغي تلقائياً مع أي تعديل في المحتوى)
+    return Response(get_lesson_full_payload(lesson), status=status.HTTP_200_OK)
 
 
 # ============================================
@@ -3526,23 +3448,52 @@ def get_writing_lesson_full(request, lesson_id):
             'error': 'هذا الدرس ليس من نوع WRITING'
         }, status=status.HTTP_400_BAD_REQUEST)
 
-    lesson_data = LessonDetailSerializer(lesson).data
+    # ✅ من الكاش (بيتلغي تلقائياً مع أي تعديل في المحتوى)
+    return Response(get_lesson_full_payload(lesson), status=status.HTTP_200_OK)
 
-    writing_content = getattr(lesson, 'writing_content', None)
-    if not writing_content:
-        return Response({
-            'lesson': lesson_data,
-            'content': None,
-        }, status=status.HTTP_200_OK)
 
-    content_data = {
-        'title': writing_content.title,
-        'writing_passage': writing_content.writing_passage,
-        'instructions': writing_content.instructions,
-        'sample_answer': writing_content.sample_answer,
+# ============================================
+# COURSE TREE & UNIT BUNDLE (cached)
+# ============================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_course_tree_view(request):
+    """
+    شجرة المستويات → الوحدات → الدروس النشطة (من الكاش)
+
+    GET /api/levels/course-tree/
+
+    Response:
+    {
+        "version": 12,
+        "levels": [
+            {
+                "id", "code", "title", "units_count", "total_lessons", "has_exam",
+                "units": [
+                    { "id", "title", "lessons_count", "has_exam", "lessons": [ { "id", "title", "lesson_type", "order" } ] }
+                ]
+            }
+        ]
     }
+    """
+    return Response(get_course_tree(), status=status.HTTP_200_OK)
 
-    return Response({
-        'lesson': lesson_data,
-        'content': content_data,
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_unit_bundle_view(request, unit_id):
+    """
+    كل دروس الوحدة (الدرس + المحتوى + الأسئلة) في response واحد (من الكاش)
+
+    GET /api/levels/units/{unit_id}/bundle/
+
+    Response:
+    {
+        "unit": { "id", "title", "description", "order", "level", "has_exam" },
+        "lessons": [ <نفس شكل lesson-detail/*> ],
+        "lessons_count": 4
+    }
+    """
+    unit = get_object_or_404(Unit.objects.select_related('level'), id=unit_id, is_active=True)
+    return Response(get_unit_bundle(unit), status=status.HTTP_200_OK)
@@ -6,7 +6,8 @@ from .models import (
     PlacementTest,
     PlacementTestQuestionBank,
     StudentPlacementTestAttempt,
-    StudentPlacementTestAnswer
+    StudentPlacementTestAnswer,
+    WritingGradeCache
 )
 
 
@@ -221,7 +222,7 @@ class StudentPlacementTestAttemptAdmin(admin.ModelAdmin):
         'started_at',
         'completed_at'
     ]
-    list_filter = ['status', 'level_achieved', 'placement_test', 'started_at']
+    list_filter = ['status', 'mode', 'level_achieved', 'placement_test', 'started_at']
     search_fields = ['student__username', 'student__email', 'placement_test__title']
     readonly_fields = [
         'started_at',
@@ -343,6 +344,44 @@ class StudentPlacementTestAnswerAdmin(admin.ModelAdmin):
     get_question_type.short_description = 'نوع السؤال'
 
 
+@admin.register(WritingGradeCache)
+class WritingGradeCacheAdmin(admin.ModelAdmin):
+    """
+    إدارة كاش تصحيح الكتابة
+    """
+    list_display = [
+        'get_short_key',
+        'model_name',
+        'pass_threshold',
+        'get_score',
+        'cost',
+        'hits',
+        'last_hit_at',
+        'expires_at',
+        'created_at'
+    ]
+    list_filter = ['model_name', 'pass_threshold', 'created_at']
+    search_fields = ['cache_key']
+    readonly_fields = ['cache_key', 'model_name', 'pass_threshold', 'result', 'cost', 'hits', 'last_hit_at', 'created_at', 'updated_at']
+    
+    def get_short_key(self, obj):
+        """
+        عرض أول 12 حرف من المفتاح
+        """
+        return obj.cache_key[:12]
+    get_short_key.short_description = 'المفتاح'
+    
+    def get_score(self, obj):
+        """
+        عرض النتيجة المحفوظة
+        """
+        return f"{obj.result.get('score', 0)}/1 ({obj.result.get('percentage', 0)}%)"
+    get_score.short_description = 'النتيجة'
+    
+    def has_add_permission(self, request):
+        return False
+
+
 # ============================================
 # Custom Admin Actions
 # ============================================
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PlacementTestConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'placement_test'
+
+    def ready(self):
+        # ✅ مسح pools الأسئلة العشوائية مع أي تعديل في الأسئلة
+        from placement_test import signals  # noqa: F401
@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 23:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placement_test', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WritingGradeCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('cache_key', models.CharField(max_length=64, unique=True, verbose_name='مفتاح الكاش (SHA-256)')),
+                ('model_name', models.CharField(max_length=50, verbose_name='Model المستخدم')),
+                ('pass_threshold', models.PositiveIntegerField(default=60, verbose_name='نسبة النجاح')),
+                ('result', models.JSONField(verbose_name='نتيجة التصحيح')),
+                ('cost', models.DecimalField(decimal_places=6, default=0, max_digits=10, verbose_name='تكلفة التصحيح الأصلية ($)')),
+                ('hits', models.PositiveIntegerField(default=0, verbose_name='عدد مرات الاستخدام')),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True, verbose_name='آخر استخدام')),
+                ('expires_at', models.DateTimeField(blank=True, db_index=True, help_text='فارغ = لا ينتهي', null=True, verbose_name='ينتهي في')),
+            ],
+            options={
+                'verbose_name': 'كاش تصحيح كتابة',
+                'verbose_name_plural': 'كاش تصحيح الكتابة',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
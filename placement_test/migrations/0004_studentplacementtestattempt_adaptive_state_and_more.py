@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placement_test', '0003_writinggradecache'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentplacementtestattempt',
+            name='adaptive_state',
+            field=models.JSONField(blank=True, null=True, verbose_name='حالة الاختبار التكيفي'),
+        ),
+        migrations.AddField(
+            model_name='studentplacementtestattempt',
+            name='mode',
+            field=models.CharField(choices=[('FIXED', 'ثابت'), ('ADAPTIVE', 'تكيفي (CAT)')], default='FIXED', max_length=10, verbose_name='نوع الاختبار'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 23:18
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placement_test', '0004_studentplacementtestattempt_adaptive_state_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentplacementtestattempt',
+            name='percentage',
+            field=models.FloatField(blank=True, null=True, verbose_name='النسبة المئوية'),
+        ),
+        migrations.AddField(
+            model_name='studentplacementtestattempt',
+            name='result_snapshot',
+            field=models.JSONField(blank=True, encoder=django.core.serializers.json.DjangoJSONEncoder, null=True, verbose_name='نسخة النتيجة'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2 on 2026-10-18 23:26
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def backfill_expires_at(apps, schema_editor):
+    # المحاولات الجارية بس - عشان الـ sweeper يقدر ينهيها
+    Attempt = apps.get_model('placement_test', 'StudentPlacementTestAttempt')
+    attempts = Attempt.objects.filter(
+        status='IN_PROGRESS', expires_at__isnull=True
+    ).select_related('placement_test')
+    for attempt in attempts:
+        attempt.expires_at = attempt.started_at + timedelta(minutes=attempt.placement_test.duration_minutes)
+        attempt.save(update_fields=['expires_at'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('placement_test', '0005_studentplacementtestattempt_percentage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentplacementtestattempt',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='ينتهي في'),
+        ),
+        migrations.RunPython(backfill_expires_at, migrations.RunPython.noop),
+    ]
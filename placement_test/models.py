@@ -3,7 +3,9 @@ from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
+from datetime import timedelta
 import random
 import json
 
@@ -409,6 +411,46 @@ class StudentPlacementTestAttempt(TimeStampedModel):
         verbose_name="الحالة"
     )
     
+    # نوع الاختبار (ثابت 50 سؤال أو تكيفي)
+    MODE_CHOICES = [
+        ('FIXED', 'ثابت'),
+        ('ADAPTIVE', 'تكيفي (CAT)'),
+    ]
+    mode = models.CharField(
+        max_length=10,
+        choices=MODE_CHOICES,
+        default='FIXED',
+        verbose_name="نوع الاختبار"
+    )
+    
+    # حالة الاختبار التكيفي (theta, se, الإجابات, السؤال الحالي, ...)
+    adaptive_state = models.JSONField(
+        blank=True,
+        null=True,
+        verbose_name="حالة الاختبار التكيفي"
+    )
+    
+    # ✅ نتيجة ثابتة بتتحفظ مرة واحدة عند إنهاء المحاولة (صفحة النتيجة والـ history)
+    percentage = models.FloatField(
+        null=True,
+        blank=True,
+        verbose_name="النسبة المئوية"
+    )
+    result_snapshot = models.JSONField(
+        blank=True,
+        null=True,
+        encoder=DjangoJSONEncoder,
+        verbose_name="نسخة النتيجة"
+    )
+    
+    # ✅ نهاية الوقت على السيرفر (الـ sweeper بينهي المحاولات اللي عدّت الوقت ده)
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="ينتهي في"
+    )
+    
     class Meta:
         verbose_name = "محاولة طالب"
         verbose_name_plural = "محاولات الطلاب"
@@ -417,6 +459,12 @@ class StudentPlacementTestAttempt(TimeStampedModel):
     def __str__(self):
         return f"{self.student.email} - {self.placement_test.title} - {self.started_at.strftime('%Y-%m-%d %H:%M')}"
     
+    def save(self, *args, **kwargs):
+        # ✅ حساب نهاية الوقت مرة واحدة عند إنشاء المحاولة
+        if self._state.adding and self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(minutes=self.placement_test.duration_minutes)
+        super().save(*args, **kwargs)
+    
     def set_selected_questions(self, questions_dict):
         """
         حفظ الأسئلة المختارة في JSON
@@ -479,6 +527,9 @@ class StudentPlacementTestAttempt(TimeStampedModel):
         if self.status == 'COMPLETED':
             return True
         
+        if self.expires_at:
+            return timezone.now() >= self.expires_at
+        
         elapsed = timezone.now() - self.started_at
         elapsed_minutes = elapsed.total_seconds() / 60
         return elapsed_minutes >= self.placement_test.duration_minutes
@@ -615,6 +666,61 @@ class StudentPlacementTestAnswer(TimeStampedModel):
         return types.get(model_name, model_name)
 
 
+# ============================================
+# AI Grading Cache
+# ============================================
+
+class WritingGradeCache(TimeStampedModel):
+    """
+    كاش نتائج تصحيح أسئلة الكتابة بالـ AI
+    المفتاح = SHA-256 للسؤال + الـ rubric + الإجابة بعد التطبيع + الـ model + الـ threshold
+    """
+    cache_key = models.CharField(
+        max_length=64,
+        unique=True,
+        verbose_name="مفتاح الكاش (SHA-256)"
+    )
+    model_name = models.CharField(
+        max_length=50,
+        verbose_name="Model المستخدم"
+    )
+    pass_threshold = models.PositiveIntegerField(
+        default=60,
+        verbose_name="نسبة النجاح"
+    )
+    
+    # النتيجة الكاملة (score, feedback, strengths, improvements, ...)
+    result = models.JSONField(verbose_name="نتيجة التصحيح")
+    cost = models.DecimalField(
+        max_digits=10,
+        decimal_places=6,
+        default=0,
+        verbose_name="تكلفة التصحيح الأصلية ($)"
+    )
+    
+    # إحصائيات
+    hits = models.PositiveIntegerField(default=0, verbose_name="عدد مرات الاستخدام")
+    last_hit_at = models.DateTimeField(null=True, blank=True, verbose_name="آخر استخدام")
+    expires_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        verbose_name="ينتهي في",
+        help_text="فارغ = لا ينتهي"
+    )
+    
+    class Meta:
+        verbose_name = "كاش تصحيح كتابة"
+        verbose_name_plural = "كاش تصحيح الكتابة"
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"{self.cache_key[:12]} - {self.model_name} - hits: {self.hits}"
+    
+    def is_expired(self):
+        return self.expires_at is not None and self.expires_at <= timezone.now()
+
+
 # ============================================
 # Helper Functions
 # ============================================
@@ -630,55 +736,15 @@ def select_random_questions_for_attempt(placement_test):
             ...
         }
     """
-    from django.contrib.contenttypes.models import ContentType
-    
-    selected_questions = {
-        'vocabulary': [],
-        'grammar': [],
-        'reading': [],
-        'listening': [],
-        'speaking': [],
-        'writing': []
-    }
-    
-    # Get ContentTypes
-    content_types = {
-        'vocabulary': ContentType.objects.get(model='vocabularyquestion'),
-        'grammar': ContentType.objects.get(model='grammarquestion'),
-        'reading': ContentType.objects.get(model='readingquestion'),
-        'listening': ContentType.objects.get(model='listeningquestion'),
-        'speaking': ContentType.objects.get(model='speakingquestion'),
-        'writing': ContentType.objects.get(model='writingquestion'),
-    }
-    
-    # Select random questions for each type
-    question_counts = {
+    from placement_test.services.question_pools import sample_question_ids
+    
+    # ✅ الاختيار من pools في Redis (SRANDMEMBER) بدل تحميل كل الـ IDs من الـ DB
+    # لو الأسئلة مش كفاية بيرجع كل المتاح
+    return sample_question_ids('placement_test', placement_test.id, {
         'vocabulary': placement_test.vocabulary_count,
         'grammar': placement_test.grammar_count,
         'reading': placement_test.reading_count,
         'listening': placement_test.listening_count,
         'speaking': placement_test.speaking_count,
         'writing': placement_test.writing_count,
-    }
-    
-    for q_type, count in question_counts.items():
-        # Get all active questions of this type from the bank
-        questions = PlacementTestQuestionBank.objects.filter(
-            placement_test=placement_test,
-            content_type=content_types[q_type],
-            is_active=True
-        ).values_list('object_id', flat=True)
-        
-        # Convert to list and shuffle
-        questions_list = list(questions)
-        
-        # Select random questions
-        if len(questions_list) >= count:
-            selected = random.sample(questions_list, count)
-        else:
-            # If not enough questions, take all available
-            selected = questions_list
-        
-        selected_questions[q_type] = selected
-    
-    return selected_questions
\ No newline at end of file
+    })
@@ -652,12 +652,11 @@ class SubmitExamSerializer(serializers.Serializer):
     """
     Serializer لتقديم إجابات الامتحان
     """
+    # ✅ الإجابات اختيارية: اللي اتحفظ بالـ autosave بيتدمج مع اللي مبعوت هنا
     answers = serializers.DictField(
         child=serializers.ListField(),
-        required=True,
-        error_messages={
-            'required': 'يجب إرسال الإجابات'
-        }
+        required=False,
+        default=dict
     )
     
     def validate_answers(self, value):
@@ -667,10 +666,7 @@ class SubmitExamSerializer(serializers.Serializer):
         required_keys = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking', 'writing']
         
         for key in required_keys:
-            if key not in value:
-                raise serializers.ValidationError(
-                    f'يجب تضمين إجابات {key}'
-                )
+            value.setdefault(key, [])
             
             if not isinstance(value[key], list):
                 raise serializers.ValidationError(
@@ -698,6 +694,66 @@ class SubmitExamSerializer(serializers.Serializer):
         return value
 
 
+class AutosaveMCQAnswerSerializer(serializers.Serializer):
+    """
+    Serializer لتغيير إجابة MCQ في الـ autosave (null = مسح الإجابة)
+    """
+    question_id = serializers.IntegerField(min_value=1)
+    selected_choice = serializers.ChoiceField(choices=['A', 'B', 'C', 'D'], allow_null=True)
+
+
+class AutosaveWritingAnswerSerializer(serializers.Serializer):
+    """
+    Serializer لمسودة إجابة Writing في الـ autosave (بدون حد أدنى)
+    """
+    question_id = serializers.IntegerField(min_value=1)
+    text_answer = serializers.CharField(
+        max_length=5000,
+        allow_blank=True,
+        allow_null=True,
+        trim_whitespace=False,
+        error_messages={
+            'max_length': 'الإجابة طويلة جداً (الحد الأقصى 5000 حرف)'
+        }
+    )
+
+
+class AutosaveAnswersSerializer(serializers.Serializer):
+    """
+    Serializer لحفظ الإجابات المتغيرة فقط (deltas) أثناء الامتحان
+    
+    {"answers": {"vocabulary": [{"question_id": 1, "selected_choice": "A"}], "writing": [...]}}
+    """
+    answers = serializers.DictField(
+        child=serializers.ListField(),
+        required=True,
+        error_messages={
+            'required': 'يجب إرسال الإجابات'
+        }
+    )
+    
+    def validate_answers(self, value):
+        mcq_types = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking']
+        validated = {}
+        
+        for q_type, answers in value.items():
+            if q_type in mcq_types:
+                serializer_class = AutosaveMCQAnswerSerializer
+            elif q_type == 'writing':
+                serializer_class = AutosaveWritingAnswerSerializer
+            else:
+                raise serializers.ValidationError(f'نوع أسئلة غير معروف: {q_type}')
+            
+            serializer = serializer_class(data=answers, many=True)
+            if not serializer.is_valid():
+                raise serializers.ValidationError(
+                    f'خطأ في إجابات {q_type}: {serializer.errors}'
+                )
+            validated[q_type] = [dict(answer) for answer in serializer.validated_data]
+        
+        return validated
+
+
 class StudentAnswerDetailSerializer(serializers.ModelSerializer):
     """
     Serializer لعرض تفاصيل إجابة الطالب
@@ -761,6 +817,8 @@ class ExamResultSerializer(serializers.ModelSerializer):
     
     def get_percentage(self, obj):
         """حساب النسبة المئوية"""
+        if obj.percentage is not None:
+            return obj.percentage
         total = obj.placement_test.total_questions
         if total > 0:
             return round((obj.score / total) * 100, 2)
@@ -797,6 +855,8 @@ class StudentAttemptListSerializer(serializers.ModelSerializer):
         return round(duration, 2) if duration else None
     
     def get_percentage(self, obj):
+        if obj.percentage is not None:
+            return obj.percentage
         total = obj.placement_test.total_questions
         if total > 0:
             return round((obj.score / total) * 100, 2)
@@ -0,0 +1,478 @@
+# placement_test/services/adaptive_service.py
+
+import logging
+import random
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Count, Sum, Case, When, IntegerField
+from django.utils import timezone
+
+from placement_test.models import (
+    StudentPlacementTestAttempt,
+    StudentPlacementTestAnswer
+)
+from sabr_questions.models import (
+    VocabularyQuestion,
+    GrammarQuestion,
+    ReadingQuestion,
+    ListeningQuestion,
+    SpeakingQuestion,
+    WritingQuestion
+)
+from .exam_service import ExamService
+from .result_snapshot import save_result_snapshot
+from .exam_timer import clear_timer
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# IRT (Rasch / 1PL) Helpers
+# ============================================
+
+# الصعوبة المبدئية لكل مستوى (على مقياس theta)
+DIFFICULTY_PRIOR = {
+    'EASY': -1.0,
+    'MEDIUM': 0.0,
+    'HARD': 1.0,
+}
+
+# كل ما زاد عدد إجابات السؤال، كل ما اعتمدنا على الصعوبة الفعلية أكثر من المبدئية
+CALIBRATION_PRIOR_WEIGHT = 20
+
+THETA_GRID = np.linspace(-4.0, 4.0, 161)
+LOG_PRIOR = -0.5 * THETA_GRID ** 2
+
+
+def probability_correct(theta, difficulty):
+    """
+    احتمال الإجابة الصحيحة (Rasch model)
+    """
+    return 1.0 / (1.0 + np.exp(-(np.asarray(theta) - np.asarray(difficulty))))
+
+
+def estimate_ability(responses: List[Dict[str, Any]]) -> Tuple[float, float]:
+    """
+    تقدير مستوى الطالب (EAP) من الإجابات
+
+    Args:
+        responses: [{'b': float, 'correct': bool}, ...]
+
+    Returns:
+        (theta, standard_error)
+    """
+    log_posterior = LOG_PRIOR.copy()
+
+    if responses:
+        difficulties = np.array([r['b'] for r in responses], dtype=float)
+        correct = np.array([bool(r['correct']) for r in responses])
+
+        # (grid x items)
+        p = probability_correct(THETA_GRID[:, None], difficulties[None, :])
+        p = np.clip(p, 1e-9, 1 - 1e-9)
+        log_posterior += np.where(correct[None, :], np.log(p), np.log(1 - p)).sum(axis=1)
+
+    posterior = np.exp(log_posterior - log_posterior.max())
+    posterior /= posterior.sum()
+
+    theta = float((THETA_GRID * posterior).sum())
+    se = float(np.sqrt(((THETA_GRID - theta) ** 2 * posterior).sum()))
+    return theta, se
+
+
+def item_information(theta: float, difficulties) -> np.ndarray:
+    """
+    Fisher information لكل سؤال عند theta
+    """
+    p = probability_correct(theta, difficulties)
+    return p * (1 - p)
+
+
+def projected_score(theta: float, pool_difficulties, total_questions: int) -> float:
+    """
+    الدرجة المتوقعة للطالب على امتحان ثابت من نفس البنك
+    (عشان نستخدم نفس حدود get_level_from_score)
+    """
+    if len(pool_difficulties) == 0:
+        return 0.0
+    expected_ratio = float(probability_correct(theta, np.asarray(pool_difficulties, dtype=float)).mean())
+    return expected_ratio * total_questions
+
+
+# ============================================
+# Adaptive Exam Service
+# ============================================
+
+class AdaptiveExamService:
+    """
+    خدمة اختبار تحديد المستوى التكيفي (Computerized Adaptive Testing)
+
+    - كل سؤال بيتختار حسب مستوى الطالب الحالي (أعلى information)
+    - الاختبار بيقف لما المستوى (CEFR) يبقى معروف بثقة
+    - في الآخر بيتحل عدد صغير من أسئلة الكتابة بصعوبة مناسبة لمستوى الطالب
+    """
+
+    MCQ_MODELS = {
+        'vocabulary': (VocabularyQuestion, 'vocabularyquestion', {'placement_question_bank': None}),
+        'grammar': (GrammarQuestion, 'grammarquestion', {'placement_question_bank': None}),
+        'reading': (ReadingQuestion, 'readingquestion', {'passage__placement_question_bank': None, 'passage__is_active': True}),
+        'listening': (ListeningQuestion, 'listeningquestion', {'audio__placement_question_bank': None, 'audio__is_active': True}),
+        'speaking': (SpeakingQuestion, 'speakingquestion', {'video__placement_question_bank': None, 'video__is_active': True}),
+    }
+
+    def __init__(self):
+        config = getattr(settings, 'ADAPTIVE_PLACEMENT_CONFIG', {}) or {}
+        self.min_items = config.get('min_items', 10)
+        self.max_items = config.get('max_items', 25)
+        self.se_target = config.get('se_target', 0.35)
+        self.confidence_z = config.get('confidence_z', 1.64)
+        self.writing_count = config.get('writing_count', 2)
+        self.top_k = config.get('top_k', 3)
+
+    # ----------------------------------------
+    # Item pool
+    # ----------------------------------------
+
+    @staticmethod
+    def _calibrated_difficulties(model_name: str, items: List[Tuple[int, str]]) -> List[List[float]]:
+        """
+        الصعوبة المعايرة لكل سؤال:
+        الصعوبة المبدئية (EASY/MEDIUM/HARD) + نسبة الإجابات الصحيحة الفعلية من المحاولات السابقة
+        """
+        content_type = ContentType.objects.get(model=model_name)
+        stats = {
+            row['object_id']: row
+            for row in StudentPlacementTestAnswer.objects.filter(
+                content_type=content_type,
+                object_id__in=[item_id for item_id, _ in items]
+            ).values('object_id').annotate(
+                total=Count('id'),
+                correct=Sum(Case(When(is_correct=True, then=1), default=0, output_field=IntegerField()))
+            )
+        }
+
+        pool = []
+        for item_id, difficulty in items:
+            b = DIFFICULTY_PRIOR.get(difficulty, 0.0)
+            row = stats.get(item_id)
+            if row and row['total']:
+                p = min(max(row['correct'] / row['total'], 0.02), 0.98)
+                empirical_b = float(np.log((1 - p) / p))
+                b = (row['total'] * empirical_b + CALIBRATION_PRIOR_WEIGHT * b) / (row['total'] + CALIBRATION_PRIOR_WEIGHT)
+            pool.append([item_id, round(b, 4)])
+        return pool
+
+    def build_item_pool(self, question_bank) -> Dict[str, Any]:
+        """
+        بناء بنك الأسئلة التكيفي (IDs + الصعوبة المعايرة)
+        """
+        pool = {}
+        for q_type, (QuestionModel, model_name, filters) in self.MCQ_MODELS.items():
+            bank_filters = {
+                key: (question_bank if value is None else value)
+                for key, value in filters.items()
+            }
+            items = list(
+                QuestionModel.objects.filter(is_active=True, **bank_filters).values_list('id', 'difficulty')
+            )
+            pool[q_type] = self._calibrated_difficulties(model_name, items)
+
+        writing_items = list(
+            WritingQuestion.objects.filter(
+                placement_question_bank=question_bank,
+                is_active=True
+            ).values_list('id', 'difficulty')
+        )
+        writing_pool = [
+            [item_id, DIFFICULTY_PRIOR.get(difficulty, 0.0)]
+            for item_id, difficulty in writing_items
+        ]
+        return {'pool': pool, 'writing_pool': writing_pool}
+
+    # ----------------------------------------
+    # Item selection & stopping
+    # ----------------------------------------
+
+    def _select_next_item(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        اختيار السؤال التالي:
+        1. نوع السؤال حسب التوزيع المطلوب (content balancing)
+        2. السؤال الأعلى information عند theta الحالية (عشوائي من أفضل top_k)
+        """
+        used = {(r['type'], r['id']) for r in state['responses']}
+        served = {q_type: 0 for q_type in state['pool']}
+        for response in state['responses']:
+            served[response['type']] += 1
+
+        candidates_by_type = {
+            q_type: [item for item in items if (q_type, item[0]) not in used]
+            for q_type, items in state['pool'].items()
+        }
+        available_types = [
+            q_type for q_type, items in candidates_by_type.items()
+            if items and state['targets'].get(q_type, 0) > 0
+        ]
+        if not available_types:
+            return None
+
+        min_ratio = min(served[q_type] / state['targets'][q_type] for q_type in available_types)
+        q_type = random.choice([
+            q_type for q_type in available_types
+            if served[q_type] / state['targets'][q_type] == min_ratio
+        ])
+
+        candidates = candidates_by_type[q_type]
+        information = item_information(state['theta'], np.array([b for _, b in candidates], dtype=float))
+        best = np.argsort(-information)[:self.top_k]
+        item_id, b = candidates[int(random.choice(list(best)))]
+        return {'type': q_type, 'id': item_id, 'b': b}
+
+    def _level_band(self, state: Dict[str, Any], placement_test) -> Tuple[str, str]:
+        """
+        المستوى عند حدود فترة الثقة لـ theta
+        """
+        pool_b = self._pool_difficulties(state)
+        delta = self.confidence_z * state['se']
+        total = placement_test.total_questions
+        low = self._score_to_level(projected_score(state['theta'] - delta, pool_b, total), placement_test)
+        high = self._score_to_level(projected_score(state['theta'] + delta, pool_b, total), placement_test)
+        return low, high
+
+    @staticmethod
+    def _pool_difficulties(state: Dict[str, Any]) -> List[float]:
+        return [b for items in state['pool'].values() for _, b in items]
+
+    @staticmethod
+    def _score_to_level(score: float, placement_test) -> str:
+        score = int(round(min(max(score, 0), placement_test.total_questions)))
+        return placement_test.get_level_from_score(score)
+
+    def _stop_reason(self, state: Dict[str, Any], placement_test) -> Optional[str]:
+        answered = len(state['responses'])
+        if answered >= self.max_items:
+            return 'max_items'
+        if answered >= self.min_items:
+            low, high = self._level_band(state, placement_test)
+            if low == high:
+                return 'level_confident'
+            if state['se'] <= self.se_target:
+                return 'precision_reached'
+        return None
+
+    def _select_writing_questions(self, state: Dict[str, Any]) -> List[int]:
+        """
+        أسئلة الكتابة الأقرب في الصعوبة لمستوى الطالب
+        """
+        writing_pool = list(state['writing_pool'])
+        random.shuffle(writing_pool)
+        writing_pool.sort(key=lambda item: abs(item[1] - state['theta']))
+        return [item_id for item_id, _ in writing_pool[:self.writing_count]]
+
+    @staticmethod
+    def _lock_attempt(attempt_id: int) -> StudentPlacementTestAttempt:
+        try:
+            return StudentPlacementTestAttempt.objects.select_for_update().select_related(
+                'placement_test'
+            ).get(id=attempt_id, status='IN_PROGRESS', mode='ADAPTIVE')
+        except StudentPlacementTestAttempt.DoesNotExist:
+            raise ValueError('الامتحان غير موجود أو تم إنهاؤه بالفعل')
+
+    # ----------------------------------------
+    # Public API
+    # ----------------------------------------
+
+    def start(self, attempt: StudentPlacementTestAttempt) -> Dict[str, Any]:
+        """
+        تجهيز المحاولة التكيفية واختيار أول سؤال
+
+        Returns:
+            {'question_type': str, 'question_id': int}
+        """
+        placement_test = attempt.placement_test
+        state = self.build_item_pool(attempt.question_bank)
+        state.update({
+            'targets': {
+                'vocabulary': placement_test.vocabulary_count,
+                'grammar': placement_test.grammar_count,
+                'reading': placement_test.reading_count,
+                'listening': placement_test.listening_count,
+                'speaking': placement_test.speaking_count,
+            },
+            'responses': [],
+            'theta': 0.0,
+            'se': 1.0,
+            'phase': 'MCQ',
+            'pending': None,
+            'writing_ids': [],
+            'stop_reason': None,
+        })
+
+        next_item = self._select_next_item(state)
+        if next_item is None:
+            raise ValueError('بنك الأسئلة لا يحتوي على أسئلة اختيار من متعدد كافية للامتحان التكيفي')
+        state['pending'] = next_item
+
+        attempt.mode = 'ADAPTIVE'
+        attempt.adaptive_state = state
+        attempt.save(update_fields=['mode', 'adaptive_state', 'updated_at'])
+
+        return {'question_type': next_item['type'], 'question_id': next_item['id']}
+
+    def submit_answer(
+        self,
+        attempt_id: int,
+        question_type: str,
+        question_id: int,
+        selected_choice: str
+    ) -> Dict[str, Any]:
+        """
+        تصحيح إجابة سؤال MCQ وتحديث theta واختيار السؤال التالي
+
+        Returns:
+            {
+                'is_correct': bool,
+                'answered': int,
+                'ability': {'theta': float, 'se': float},
+                'finished': bool,
+                'next_question': {'question_type', 'question_id'} | None,
+                'writing_question_ids': [...]   # لما مرحلة الـ MCQ تخلص
+            }
+        """
+        ExamService._check_time_limit(attempt_id, mode='ADAPTIVE')
+
+        with transaction.atomic():
+            attempt = self._lock_attempt(attempt_id)
+
+            state = attempt.adaptive_state
+            pending = state.get('pending')
+            if state['phase'] != 'MCQ' or not pending:
+                raise ValueError('لا يوجد سؤال في انتظار الإجابة')
+            if pending['type'] != question_type or int(pending['id']) != int(question_id):
+                raise ValueError('هذا ليس السؤال الحالي')
+
+            content_type = ContentType.objects.get(model=self.MCQ_MODELS[question_type][1])
+            answer, created = StudentPlacementTestAnswer.objects.get_or_create(
+                attempt=attempt,
+                content_type=content_type,
+                object_id=pending['id'],
+                defaults={'selected_choice': selected_choice}
+            )
+            if not created:
+                answer.selected_choice = selected_choice
+            answer.check_answer()
+
+            state['responses'].append({
+                'type': pending['type'],
+                'id': pending['id'],
+                'b': pending['b'],
+                'correct': answer.is_correct,
+            })
+            state['theta'], state['se'] = estimate_ability(state['responses'])
+
+            stop_reason = self._stop_reason(state, attempt.placement_test)
+            next_item = None if stop_reason else self._select_next_item(state)
+            if not stop_reason and next_item is None:
+                stop_reason = 'pool_exhausted'
+
+            state['pending'] = next_item
+            if stop_reason:
+                state['phase'] = 'WRITING'
+                state['stop_reason'] = stop_reason
+                state['writing_ids'] = self._select_writing_questions(state)
+                logger.info(
+                    f"Adaptive attempt {attempt.id} stopped MCQ phase after "
+                    f"{len(state['responses'])} items ({stop_reason}), theta={state['theta']:.2f}"
+                )
+
+            attempt.adaptive_state = state
+            attempt.save(update_fields=['adaptive_state', 'updated_at'])
+
+        return {
+            'is_correct': answer.is_correct,
+            'answered': len(state['responses']),
+            'ability': {'theta': round(state['theta'], 3), 'se': round(state['se'], 3)},
+            'finished': bool(stop_reason),
+            'stop_reason': stop_reason,
+            'next_question': (
+                {'question_type': next_item['type'], 'question_id': next_item['id']}
+                if next_item else None
+            ),
+            'writing_question_ids': state['writing_ids'],
+        }
+
+    def finish(self, attempt_id: int, writing_answers: List[Dict]) -> Dict[str, Any]:
+        """
+        تصحيح أسئلة الكتابة وإنهاء الاختبار
+        الدرجة النهائية = الدرجة المتوقعة على امتحان ثابت من نفس البنك (نفس حدود المستويات)
+        """
+        attempt = ExamService._check_time_limit(attempt_id, mode='ADAPTIVE')
+        if attempt.adaptive_state['phase'] != 'WRITING':
+            raise ValueError('يجب إنهاء أسئلة الاختيار من متعدد أولاً')
+
+        allowed_ids = {int(item_id) for item_id in attempt.adaptive_state['writing_ids']}
+        writing_answers = [
+            answer for answer in writing_answers
+            if int(answer['question_id']) in allowed_ids
+        ]
+        # ✅ تصحيح الـ AI قبل الـ lock (ممكن ياخد ثواني)
+        grading_results = ExamService._grade_writing_answers(attempt_id, writing_answers)
+
+        with transaction.atomic():
+            attempt = self._lock_attempt(attempt_id)
+
+            state = attempt.adaptive_state
+            if state['phase'] != 'WRITING':
+                raise ValueError('يجب إنهاء أسئلة الاختيار من متعدد أولاً')
+
+            writing_result = ExamService._save_writing_grades(attempt, writing_answers, grading_results)
+
+            writing_b = {item_id: b for item_id, b in state['writing_pool']}
+            for graded in writing_result['graded_answers']:
+                state['responses'].append({
+                    'type': 'writing',
+                    'id': int(graded['question_id']),
+                    'b': writing_b.get(int(graded['question_id']), 0.0),
+                    'correct': graded['is_correct'],
+                })
+            state['theta'], state['se'] = estimate_ability(state['responses'])
+            state['phase'] = 'DONE'
+
+            placement_test = attempt.placement_test
+            score = projected_score(state['theta'], self._pool_difficulties(state), placement_test.total_questions)
+            score = int(round(min(max(score, 0), placement_test.total_questions)))
+
+            attempt.adaptive_state = state
+            attempt.score = score
+            attempt.level_achieved = placement_test.get_level_from_score(score)
+            attempt.completed_at = timezone.now()
+            attempt.status = 'COMPLETED'
+            attempt.save()
+            save_result_snapshot(attempt)
+            transaction.on_commit(lambda: clear_timer('placement', attempt_id))
+
+        return {
+            'attempt_id': attempt.id,
+            'total_score': attempt.score,
+            'max_score': placement_test.total_questions,
+            'percentage': round(attempt.score / placement_test.total_questions * 100, 2) if placement_test.total_questions else 0,
+            'level': attempt.level_achieved,
+            'completed_at': attempt.completed_at,
+            'duration_minutes': round(attempt.get_duration(), 2) if attempt.get_duration() else 0,
+            'adaptive': {
+                'items_answered': len(state['responses']),
+                'stop_reason': state['stop_reason'],
+                'theta': round(state['theta'], 3),
+                'se': round(state['se'], 3),
+            },
+            'details': {
+                'writing': writing_result
+            }
+        }
+
+
+# Singleton instance
+adaptive_exam_service = AdaptiveExamService()
@@ -2,11 +2,16 @@
 
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List
 from decimal import Decimal
 
 from django.conf import settings
-from openai import OpenAI
+
+from sabr_questions.openai_client import create_chat_completion
+from . import grading_cache
+from .pre_grading import pre_grade_writing_answer
 
 logger = logging.getLogger('ai_grading')
 
@@ -24,8 +29,9 @@ class AIGradingService:
         api_key = getattr(settings, 'OPENAI_API_KEY', None)
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set in settings")
-        
-        self.client = OpenAI(api_key=api_key)
+
+        # ✅ الطلبات بتعدي على الـ client المشترك (connection pool + rate limit موزع)
+        #    sabr_questions/openai_client.py
         
         # ✅ التحقق من وجود AI_GRADING_CONFIG
         grading_config = getattr(settings, 'AI_GRADING_CONFIG', None)
@@ -34,11 +40,21 @@ class AIGradingService:
             self.model = grading_config.get('model', 'gpt-4o')
             self.temperature = grading_config.get('temperature', 0.3)
             self.max_tokens = grading_config.get('max_tokens', 1000)
+            self.max_concurrency = grading_config.get('max_concurrency', 5)
+            self.item_timeout = grading_config.get('item_timeout', 60)
+            self.cache_enabled = grading_config.get('cache_enabled', True)
+            self.cache_ttl_days = grading_config.get('cache_ttl_days')
+            self.pre_grading_enabled = grading_config.get('pre_grading_enabled', True)
         else:
             # ✅ قيم افتراضية إذا لم يتم تعريف AI_GRADING_CONFIG
             self.model = 'gpt-4o'
             self.temperature = 0.3
             self.max_tokens = 1000
+            self.max_concurrency = 5
+            self.item_timeout = 60
+            self.cache_enabled = True
+            self.cache_ttl_days = None
+            self.pre_grading_enabled = True
             
             logger.warning(
                 "AI_GRADING_CONFIG not found in settings. Using default values: "
@@ -54,7 +70,9 @@ class AIGradingService:
         max_points: int,
         min_words: int = 100,
         max_words: int = 500,
-        pass_threshold: int = 60  # ← الـ parameter الجديد
+        pass_threshold: int = 60,  # ← الـ parameter الجديد
+        timeout: Optional[float] = None,
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         تصحيح سؤال Writing باستخدام GPT-4o مع Binary Grading
@@ -68,6 +86,8 @@ class AIGradingService:
             min_words: الحد الأدنى للكلمات
             max_words: الحد الأقصى للكلمات
             pass_threshold: النسبة المئوية المطلوبة للنجاح (default: 60%)
+            timeout: أقصى مدة (بالثواني) لطلب الـ API قبل اللجوء للتصحيح الاحتياطي
+            use_cache: استخدام كاش النتائج (نفس السؤال + نفس الإجابة = نفس النتيجة بدون API call)
         
         Returns:
             {
@@ -81,7 +101,9 @@ class AIGradingService:
                 'word_count': int,
                 'is_within_limit': bool,
                 'tokens_used': int,
-                'cost': float
+                'cost': float,
+                'cached': bool,             # (موجود لو النتيجة جاية من الكاش)
+                'pre_graded': bool          # (موجود لو الإجابة اترفضت من الفلتر المحلي)
             }
         """
         
@@ -89,6 +111,39 @@ class AIGradingService:
         word_count = len(student_answer.split())
         is_within_limit = min_words <= word_count <= max_words
         
+        # ✅ الفلتر المحلي: الإجابات الفاشلة بشكل واضح ما بتروحش للـ AI
+        if self.pre_grading_enabled:
+            pre_graded = pre_grade_writing_answer(
+                question_text=question_text,
+                student_answer=student_answer,
+                sample_answer=sample_answer,
+                max_points=max_points,
+                min_words=min_words,
+                max_words=max_words,
+                pass_threshold=pass_threshold
+            )
+            if pre_graded:
+                return pre_graded
+        
+        # ✅ البحث في الكاش أولاً
+        cache_key = None
+        if use_cache and self.cache_enabled:
+            cache_key = grading_cache.make_cache_key(
+                self.model,
+                question_text=question_text,
+                student_answer=student_answer,
+                sample_answer=sample_answer,
+                rubric=rubric,
+                max_points=max_points,
+                min_words=min_words,
+                max_words=max_words,
+                pass_threshold=pass_threshold
+            )
+            cached = grading_cache.get_cached_results([cache_key]).get(cache_key)
+            if cached:
+                logger.info(f"Grading cache hit {cache_key[:12]}")
+                return cached
+        
         # بناء الـ Prompt
         prompt = self._build_prompt(
             question_text=question_text,
@@ -107,7 +162,7 @@ class AIGradingService:
             # استدعاء GPT-4o
             logger.info(f"Grading writing question with {self.model}, threshold={pass_threshold}%")
             
-            response = self.client.chat.completions.create(
+            response = create_chat_completion(
                 model=self.model,
                 messages=[
                     {
@@ -121,7 +176,8 @@ class AIGradingService:
                 ],
                 temperature=self.temperature,
                 max_tokens=self.max_tokens,
-                response_format={"type": "json_object"}
+                response_format={"type": "json_object"},
+                **({'timeout': timeout} if timeout else {})
             )
             
             # استخراج النتيجة
@@ -158,6 +214,9 @@ class AIGradingService:
             result['tokens_used'] = tokens_used
             result['cost'] = cost
             
+            if cache_key:
+                self._store_in_cache(cache_key, pass_threshold, result)
+            
             return result
             
         except json.JSONDecodeError as e:
@@ -168,6 +227,144 @@ class AIGradingService:
             logger.error(f"AI grading error: {e}", exc_info=True)
             return self._fallback_grading(word_count, is_within_limit, max_points, pass_threshold)
     
+    def grade_writing_batch(
+        self,
+        items: List[Dict[str, Any]],
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        تصحيح مجموعة أسئلة Writing بالتوازي
+
+        Args:
+            items: قائمة من الـ kwargs الخاصة بـ grade_writing_question
+                   [{'question_text': ..., 'student_answer': ..., ...}, ...]
+            max_concurrency: أقصى عدد طلبات متزامنة (default: AI_GRADING_CONFIG['max_concurrency'])
+            timeout: أقصى مدة لكل سؤال بالثواني (default: AI_GRADING_CONFIG['item_timeout'])
+
+        Returns:
+            قائمة نتائج بنفس ترتيب الـ items
+            (السؤال اللي يفشل أو يتأخر بياخد نتيجة _fallback_grading)
+            (الإجابات اللي اتصححت قبل كده بترجع من الكاش بدون API call)
+            (الإجابات الفاشلة بشكل واضح بيرفضها الفلتر المحلي بدون API call)
+        """
+        if not items:
+            return []
+
+        max_concurrency = max_concurrency or self.max_concurrency
+        timeout = timeout or self.item_timeout
+
+        cache_keys = [None] * len(items)
+        results = [None] * len(items)
+
+        # ✅ الفلتر المحلي أولاً
+        if self.pre_grading_enabled:
+            for index, item in enumerate(items):
+                results[index] = pre_grade_writing_answer(**item)
+
+        # ✅ البحث في الكاش لباقي العناصر في query واحدة
+        if self.cache_enabled:
+            for index, item in enumerate(items):
+                if results[index] is None:
+                    cache_keys[index] = grading_cache.make_cache_key(self.model, **item)
+            cached = grading_cache.get_cached_results(key for key in cache_keys if key)
+            for index, cache_key in enumerate(cache_keys):
+                if cache_key in cached:
+                    results[index] = dict(cached[cache_key])
+
+            if cached:
+                logger.info(f"Grading cache hits: {len(cached)}/{len(items)}")
+
+        pending = [index for index, result in enumerate(results) if result is None]
+        if not pending:
+            return results
+
+        if len(pending) == 1 or max_concurrency <= 1:
+            for index in pending:
+                results[index] = self.grade_writing_question(
+                    **items[index], timeout=timeout, use_cache=False
+                )
+        else:
+            self._grade_pending_concurrently(items, pending, results, max_concurrency, timeout)
+
+        # حفظ النتائج الجديدة في الكاش (من الـ main thread عشان اتصال الـ DB)
+        for index in pending:
+            if cache_keys[index]:
+                self._store_in_cache(
+                    cache_keys[index], items[index].get('pass_threshold', 60), results[index]
+                )
+
+        return results
+
+    def _grade_pending_concurrently(
+        self,
+        items: List[Dict[str, Any]],
+        pending: List[int],
+        results: List[Optional[Dict[str, Any]]],
+        max_concurrency: int,
+        timeout: float
+    ) -> None:
+        """
+        تصحيح العناصر اللي مش في الكاش بالتوازي (بيملى results في نفس الأماكن)
+        """
+        workers = min(max_concurrency, len(pending))
+        # كل موجة من الطلبات بتاخد timeout واحد على الأكثر
+        waves = -(-len(pending) // workers)
+        deadline = time.monotonic() + timeout * waves + 5
+
+        logger.info(f"Grading {len(pending)} writing answers with {workers} workers")
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-grading')
+        try:
+            futures = {
+                index: executor.submit(
+                    self.grade_writing_question, **items[index], timeout=timeout, use_cache=False
+                )
+                for index in pending
+            }
+
+            for index, future in futures.items():
+                try:
+                    remaining = max(deadline - time.monotonic(), 0)
+                    results[index] = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    logger.error(f"AI grading timed out after {timeout}s, using fallback grading")
+                    future.cancel()
+                    results[index] = self._fallback_for_item(items[index])
+                except Exception as e:
+                    logger.error(f"AI grading batch item failed: {e}", exc_info=True)
+                    results[index] = self._fallback_for_item(items[index])
+        finally:
+            # ما نستناش الطلبات المعلقة - نتايجها اتحسبت fallback خلاص
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _store_in_cache(self, cache_key: str, pass_threshold: int, result: Dict[str, Any]) -> None:
+        """
+        حفظ نتيجة الـ API في الكاش (نتائج الـ fallback ما بتتحفظش)
+        """
+        if result.get('is_fallback') or result.get('cached') or result.get('pre_graded'):
+            return
+        try:
+            grading_cache.store_result(
+                cache_key, self.model, pass_threshold, result, ttl_days=self.cache_ttl_days
+            )
+        except Exception as e:
+            logger.error(f"Failed to store grading result in cache: {e}")
+
+    def _fallback_for_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        تصحيح احتياطي لعنصر من الـ batch
+        """
+        word_count = len((item.get('student_answer') or '').split())
+        min_words = item.get('min_words', 100)
+        max_words = item.get('max_words', 500)
+        return self._fallback_grading(
+            word_count,
+            min_words <= word_count <= max_words,
+            item['max_points'],
+            item.get('pass_threshold', 60)
+        )
+
     def _build_prompt(
         self,
         question_text: str,
@@ -285,7 +482,8 @@ class AIGradingService:
             'word_count': word_count,
             'is_within_limit': is_within_limit,
             'tokens_used': 0,
-            'cost': 0.0
+            'cost': 0.0,
+            'is_fallback': True
         }
 
 
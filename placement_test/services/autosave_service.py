@@ -0,0 +1,175 @@
+# placement_test/services/autosave_service.py
+
+import logging
+from typing import Dict, List
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.utils import timezone
+
+from placement_test.models import (
+    StudentPlacementTestAttempt,
+    StudentPlacementTestAnswer
+)
+
+logger = logging.getLogger(__name__)
+
+
+ANSWER_TYPES = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking', 'writing']
+
+CONTENT_TYPE_MODELS = {
+    'vocabulary': 'vocabularyquestion',
+    'grammar': 'grammarquestion',
+    'reading': 'readingquestion',
+    'listening': 'listeningquestion',
+    'speaking': 'speakingquestion',
+    'writing': 'writingquestion',
+}
+
+
+def _answer_value_key(q_type: str) -> str:
+    return 'text_answer' if q_type == 'writing' else 'selected_choice'
+
+
+def filter_allowed_deltas(deltas: Dict[str, List[Dict]], allowed_questions: Dict[str, List]) -> Dict[str, List[Dict]]:
+    """
+    تجاهل أي إجابة لسؤال مش من أسئلة المحاولة
+    """
+    filtered = {}
+    for q_type in ANSWER_TYPES:
+        allowed_ids = {str(question_id) for question_id in allowed_questions.get(q_type, [])}
+        filtered[q_type] = [
+            delta for delta in deltas.get(q_type, [])
+            if str(delta.get('question_id')) in allowed_ids
+        ]
+    return filtered
+
+
+def merge_answer_deltas(saved: Dict[str, List[Dict]], deltas: Dict[str, List[Dict]]) -> Dict[str, List[Dict]]:
+    """
+    دمج تغييرات الإجابات (deltas) مع الإجابات المحفوظة
+
+    - نفس شكل answers في submit: {'vocabulary': [{'question_id': 1, 'selected_choice': 'A'}], ...}
+    - الإجابة الجديدة لنفس السؤال بتستبدل القديمة
+    - قيمة null (selected_choice / text_answer) بتمسح الإجابة المحفوظة
+    """
+    merged = {}
+    for q_type in ANSWER_TYPES:
+        value_key = _answer_value_key(q_type)
+        by_id = {
+            str(answer['question_id']): answer
+            for answer in (saved or {}).get(q_type, [])
+            if 'question_id' in answer
+        }
+        for delta in (deltas or {}).get(q_type, []):
+            if 'question_id' not in delta:
+                continue
+            question_id = str(delta['question_id'])
+            if delta.get(value_key) is None:
+                by_id.pop(question_id, None)
+            else:
+                by_id[question_id] = {
+                    'question_id': delta['question_id'],
+                    value_key: delta[value_key]
+                }
+        merged[q_type] = list(by_id.values())
+    return merged
+
+
+def count_answers(answers: Dict[str, List[Dict]]) -> int:
+    return sum(len(answers.get(q_type, [])) for q_type in ANSWER_TYPES)
+
+
+# ============================================
+# Placement Test (per-answer upserts)
+# ============================================
+
+def save_placement_answer_deltas(attempt: StudentPlacementTestAttempt, deltas: Dict[str, List[Dict]]) -> int:
+    """
+    حفظ تغييرات إجابات اختبار تحديد المستوى بدون تصحيح
+    (صف واحد لكل سؤال في StudentPlacementTestAnswer - bulk create/update)
+
+    Returns:
+        عدد الإجابات اللي اتحفظت
+    """
+    deltas = filter_allowed_deltas(deltas, attempt.get_selected_questions())
+    saved_count = 0
+    now = timezone.now()
+
+    with transaction.atomic():
+        for q_type in ANSWER_TYPES:
+            type_deltas = deltas[q_type]
+            if not type_deltas:
+                continue
+
+            value_key = _answer_value_key(q_type)
+            content_type = ContentType.objects.get(model=CONTENT_TYPE_MODELS[q_type])
+            existing = {
+                answer.object_id: answer
+                for answer in StudentPlacementTestAnswer.objects.filter(
+                    attempt=attempt,
+                    content_type=content_type,
+                    object_id__in=[int(delta['question_id']) for delta in type_deltas]
+                )
+            }
+
+            to_create = []
+            to_update = []
+            to_delete = []
+            for delta in type_deltas:
+                question_id = int(delta['question_id'])
+                value = delta.get(value_key)
+                answer = existing.get(question_id)
+
+                if value is None:
+                    if answer:
+                        to_delete.append(answer.id)
+                    continue
+
+                if answer:
+                    setattr(answer, value_key, value)
+                    # bulk_update مش بيحدث auto_now
+                    answer.updated_at = now
+                    to_update.append(answer)
+                else:
+                    answer = StudentPlacementTestAnswer(
+                        attempt=attempt,
+                        content_type=content_type,
+                        object_id=question_id,
+                        **{value_key: value}
+                    )
+                    existing[question_id] = answer
+                    to_create.append(answer)
+
+            if to_create:
+                StudentPlacementTestAnswer.objects.bulk_create(to_create, ignore_conflicts=True)
+            if to_update:
+                StudentPlacementTestAnswer.objects.bulk_update(to_update, [value_key, 'updated_at'])
+            if to_delete:
+                StudentPlacementTestAnswer.objects.filter(id__in=to_delete).delete()
+
+            saved_count += len(to_create) + len(to_update) + len(to_delete)
+
+    return saved_count
+
+
+def get_saved_placement_answers(attempt: StudentPlacementTestAttempt) -> Dict[str, List[Dict]]:
+    """
+    الإجابات المحفوظة للمحاولة بنفس شكل answers في submit
+    """
+    model_to_type = {model: q_type for q_type, model in CONTENT_TYPE_MODELS.items()}
+    answers = {q_type: [] for q_type in ANSWER_TYPES}
+
+    rows = StudentPlacementTestAnswer.objects.filter(attempt=attempt).values_list(
+        'content_type__model', 'object_id', 'selected_choice', 'text_answer'
+    )
+    for model_name, object_id, selected_choice, text_answer in rows:
+        q_type = model_to_type.get(model_name)
+        if q_type is None:
+            continue
+        value_key = _answer_value_key(q_type)
+        value = text_answer if q_type == 'writing' else selected_choice
+        if value is not None:
+            answers[q_type].append({'question_id': object_id, value_key: value})
+
+    return answers
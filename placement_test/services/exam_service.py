@@ -14,6 +14,9 @@ from placement_test.models import (
 )
 from sabr_questions.models import WritingQuestion
 from .ai_grading import ai_grading_service
+from .autosave_service import merge_answer_deltas, get_saved_placement_answers
+from .result_snapshot import save_result_snapshot
+from .exam_timer import clear_timer
 
 logger = logging.getLogger('ai_grading')
 
@@ -50,21 +53,31 @@ class ExamService:
             }
         """
         
+        # التحقق من انتهاء الوقت (بره الـ transaction)
+        attempt = ExamService._check_time_limit(attempt_id)
+        
+        # ✅ دمج الإجابات المحفوظة بالـ autosave مع الإجابات المبعوتة
+        answers_data = merge_answer_deltas(
+            get_saved_placement_answers(attempt),
+            answers_data
+        )
+        
+        # ✅ تصحيح الكتابة بالـ AI قبل الـ lock (ممكن ياخد ثواني)
+        writing_answers = answers_data.get('writing', [])
+        writing_grades = ExamService._grade_writing_answers(attempt_id, writing_answers)
+        
         with transaction.atomic():
             # الحصول على المحاولة
-            attempt = StudentPlacementTestAttempt.objects.select_for_update().get(
-                id=attempt_id,
-                status='IN_PROGRESS'
-            )
+            try:
+                attempt = StudentPlacementTestAttempt.objects.select_for_update().get(
+                    id=attempt_id,
+                    status='IN_PROGRESS'
+                )
+            except StudentPlacementTestAttempt.DoesNotExist:
+                raise ValueError('الامتحان غير موجود أو تم إنهاؤه بالفعل')
             
             # التحقق من صاحب المحاولة (في الـ view)
             
-            # التحقق من انتهاء الوقت
-            if attempt.is_time_up():
-                attempt.status = 'ABANDONED'
-                attempt.save()
-                raise ValueError('انتهى وقت الامتحان')
-            
             # حفظ وتصحيح الإجابات
             results = {
                 'vocabulary': ExamService._grade_mcq_questions(
@@ -82,14 +95,18 @@ class ExamService:
                 'speaking': ExamService._grade_mcq_questions(
                     attempt, answers_data.get('speaking', []), 'speakingquestion'
                 ),
-                'writing': ExamService._grade_writing_questions(
-                    attempt, answers_data.get('writing', [])
+                'writing': ExamService._save_writing_grades(
+                    attempt, writing_answers, writing_grades
                 )
             }
             
             # تحديد الامتحان كمكتمل وحساب النتيجة النهائية
             attempt.mark_completed()
             
+            # ✅ حفظ النتيجة مرة واحدة (صفحة النتيجة بتقرا منها بعد كده)
+            save_result_snapshot(attempt)
+            transaction.on_commit(lambda: clear_timer('placement', attempt_id))
+            
             # حساب النتيجة الكلية
             total_score = attempt.score
             max_score = attempt.placement_test.total_questions
@@ -106,6 +123,26 @@ class ExamService:
                 'details': results
             }
     
+    @staticmethod
+    def _check_time_limit(attempt_id: int, **filters) -> StudentPlacementTestAttempt:
+        """
+        التحقق من انتهاء الوقت قبل الـ transaction
+        ✅ الـ ABANDONED بيتحفظ بره الـ atomic block (الـ ValueError جوه الـ block كان بيعمل rollback ليه)
+
+        Returns:
+            المحاولة (من غير lock)
+        """
+        attempt = StudentPlacementTestAttempt.objects.select_related('placement_test').get(
+            id=attempt_id, status='IN_PROGRESS', **filters
+        )
+        if attempt.is_time_up():
+            StudentPlacementTestAttempt.objects.filter(id=attempt_id, status='IN_PROGRESS').update(
+                status='ABANDONED', updated_at=timezone.now()
+            )
+            clear_timer('placement', attempt_id)
+            raise ValueError('انتهى وقت الامتحان')
+        return attempt
+    
     @staticmethod
     def _grade_mcq_questions(
         attempt: StudentPlacementTestAttempt,
@@ -160,6 +197,59 @@ class ExamService:
         """
         تصحيح أسئلة الكتابة باستخدام AI
         ✅ نظام جديد: Binary Grading
+        ✅ كل الأسئلة بتتصحح بالتوازي عن طريق grade_writing_batch
+        """
+        return ExamService._save_writing_grades(
+            attempt, answers, ExamService._grade_writing_answers(attempt.id, answers)
+        )
+
+    @staticmethod
+    def _grade_writing_answers(attempt_id: int, answers: List[Dict]) -> List[Dict[str, Any]]:
+        """
+        طلبات الـ AI بس (من غير كتابة في الـ DB)
+        ✅ بتتنادى قبل select_for_update عشان المحاولة ما تفضلش مقفولة طول التصحيح
+
+        Returns:
+            نتيجة grade_writing_batch لكل إجابة بنفس ترتيب answers
+        """
+        # الحصول على الأسئلة مرة واحدة
+        writing_questions = WritingQuestion.objects.in_bulk(
+            [answer_data['question_id'] for answer_data in answers]
+        )
+        
+        grading_requests = []
+        for answer_data in answers:
+            question_id = answer_data['question_id']
+            
+            # الحصول على السؤال
+            writing_question = writing_questions.get(int(question_id))
+            if writing_question is None:
+                raise WritingQuestion.DoesNotExist(f'WritingQuestion {question_id} does not exist')
+            
+            grading_requests.append({
+                'question_text': writing_question.question_text,
+                'student_answer': answer_data['text_answer'],
+                'sample_answer': writing_question.sample_answer or '',
+                'rubric': writing_question.rubric or '',
+                'max_points': writing_question.points,
+                'min_words': writing_question.min_words,
+                'max_words': writing_question.max_words,
+                'pass_threshold': writing_question.pass_threshold  # ← استخدام الـ threshold
+            })
+        
+        # تصحيح باستخدام AI (كل الأسئلة بالتوازي)
+        logger.info(f"Grading {len(grading_requests)} writing questions for attempt {attempt_id}")
+        
+        return ai_grading_service.grade_writing_batch(grading_requests)
+
+    @staticmethod
+    def _save_writing_grades(
+        attempt: StudentPlacementTestAttempt,
+        answers: List[Dict],
+        grading_results: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        حفظ إجابات الكتابة ونتيجة الـ AI بتاعتها (_grade_writing_answers)
         """
         content_type = ContentType.objects.get(model='writingquestion')
         
@@ -168,37 +258,19 @@ class ExamService:
         graded_answers = []
         total_ai_cost = Decimal('0.000000')
         
-        for answer_data in answers:
+        for answer_data, grading_result in zip(answers, grading_results):
             question_id = answer_data['question_id']
-            text_answer = answer_data['text_answer']
-            
-            # الحصول على السؤال
-            writing_question = WritingQuestion.objects.get(id=question_id)
             
             # إنشاء أو تحديث الإجابة
             answer, created = StudentPlacementTestAnswer.objects.get_or_create(
                 attempt=attempt,
                 content_type=content_type,
                 object_id=question_id,
-                defaults={'text_answer': text_answer}
+                defaults={'text_answer': answer_data['text_answer']}
             )
             
             if not created:
-                answer.text_answer = text_answer
-            
-            # تصحيح باستخدام AI
-            logger.info(f"Grading writing question {question_id} for attempt {attempt.id}")
-            
-            grading_result = ai_grading_service.grade_writing_question(
-                question_text=writing_question.question_text,
-                student_answer=text_answer,
-                sample_answer=writing_question.sample_answer or '',
-                rubric=writing_question.rubric or '',
-                max_points=writing_question.points,  # ← أضف ده
-                min_words=writing_question.min_words,
-                max_words=writing_question.max_words,
-                pass_threshold=writing_question.pass_threshold  # ← استخدام الـ threshold
-            )
+                answer.text_answer = answer_data['text_answer']
             
             # ✅ حفظ النتيجة (0 or 1 فقط)
             answer.points_earned = grading_result['score']  # ← 0 or 1
@@ -0,0 +1,179 @@
+# placement_test/services/exam_timer.py
+
+import logging
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Dict, Any, Optional, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.utils import timezone
+
+from placement_test.services.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# Exam timers: examtimer:{kind}:{attempt_id} → "{student_id}:{expires_at_ts}"
+#
+# - placement → StudentPlacementTestAttempt (status = IN_PROGRESS)
+# - unit      → StudentUnitExamAttempt      (submitted_at = NULL)
+# - level     → StudentLevelExamAttempt     (submitted_at = NULL)
+#
+# ✅ expires_at في الـ DB هو المرجع - Redis نسخة بـ TTL عشان الـ polling ما يلمسش الـ DB
+# ✅ الـ sweeper (placement_test/tasks.py + levels/tasks.py) بينهي المحاولات بعد الـ grace
+# ============================================
+
+EXAM_KINDS = {
+    'placement': ('placement_test', 'StudentPlacementTestAttempt'),
+    'unit': ('levels', 'StudentUnitExamAttempt'),
+    'level': ('levels', 'StudentLevelExamAttempt'),
+}
+
+
+def _config() -> Dict:
+    return getattr(settings, 'EXAM_TIMER_CONFIG', {
+        'grace_seconds': 120,
+        'sweep_batch_size': 200,
+        'sweep_max_attempts': 500,
+        'sweep_lock_timeout': 600,
+    })
+
+
+def get_sweep_limits() -> Tuple[int, int]:
+    """
+    (أقصى عدد محاولات في الـ run, مدة الـ lock بالثواني) للـ sweeper
+    """
+    config = _config()
+    return config.get('sweep_max_attempts', 500), config.get('sweep_lock_timeout', 600)
+
+
+def get_grace() -> timedelta:
+    return timedelta(seconds=_config()['grace_seconds'])
+
+
+def get_attempt_model(kind: str):
+    return apps.get_model(*EXAM_KINDS[kind])
+
+
+def timer_key(kind: str, attempt_id: int) -> str:
+    return f'examtimer:{kind}:{attempt_id}'
+
+
+def is_past_grace(expires_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
+    """
+    الوقت خلص + المهلة خلصت (أي إجابات بعد كده مش بتتحسب)
+    """
+    if expires_at is None:
+        return False
+    return (now or timezone.now()) > expires_at + get_grace()
+
+
+def _is_active(kind: str, attempt) -> bool:
+    if kind == 'placement':
+        return attempt.status == 'IN_PROGRESS'
+    return attempt.submitted_at is None
+
+
+def start_timer(kind: str, attempt) -> None:
+    """
+    تسجيل نهاية وقت المحاولة في Redis (TTL = الوقت المتبقي + المهلة)
+    """
+    client = get_redis()
+    if client is None or attempt.expires_at is None:
+        return
+
+    ttl = int((attempt.expires_at + get_grace() - timezone.now()).total_seconds())
+    if ttl <= 0:
+        return
+    try:
+        client.set(
+            timer_key(kind, attempt.id),
+            f'{attempt.student_id}:{attempt.expires_at.timestamp()}',
+            ex=ttl
+        )
+    except Exception as e:
+        logger.warning(f"Failed to start exam timer {kind}:{attempt.id}: {str(e)}")
+
+
+def clear_timer(kind: str, attempt_id: int) -> None:
+    client = get_redis()
+    if client is None:
+        return
+    try:
+        client.delete(timer_key(kind, attempt_id))
+    except Exception as e:
+        logger.warning(f"Failed to clear exam timer {kind}:{attempt_id}: {str(e)}")
+
+
+def _timer_payload(attempt_id: int, expires_at: datetime) -> Dict[str, Any]:
+    remaining = int((expires_at - timezone.now()).total_seconds())
+    return {
+        'attempt_id': attempt_id,
+        'expires_at': expires_at,
+        'remaining_seconds': max(0, remaining),
+        'is_expired': remaining <= 0,
+    }
+
+
+def get_remaining_time(kind: str, attempt_id: int, student_id: int) -> Optional[Dict[str, Any]]:
+    """
+    الوقت المتبقي لمحاولة (Redis أولاً ثم الـ DB)
+
+    Returns:
+        {'attempt_id', 'expires_at', 'remaining_seconds', 'is_expired', 'is_active'}
+        أو None لو المحاولة مش موجودة/مش بتاعة الطالب
+    """
+    client = get_redis()
+    if client is not None:
+        try:
+            value = client.get(timer_key(kind, attempt_id))
+        except Exception as e:
+            logger.warning(f"Exam timer unavailable, falling back to DB: {str(e)}")
+            value = None
+
+        if value is not None:
+            owner_id, expires_ts = value.decode().split(':', 1)
+            if int(owner_id) != student_id:
+                return None
+            expires_at = datetime.fromtimestamp(float(expires_ts), tz=dt_timezone.utc)
+            return {**_timer_payload(attempt_id, expires_at), 'is_active': True}
+
+    # Fallback: الـ DB (ومعاه نرجّع الـ key لو المحاولة لسه شغالة)
+    model = get_attempt_model(kind)
+    fields = ['id', 'student_id', 'expires_at', 'status' if kind == 'placement' else 'submitted_at']
+    attempt = model.objects.filter(id=attempt_id, student_id=student_id).only(*fields).first()
+    if attempt is None:
+        return None
+
+    is_active = _is_active(kind, attempt)
+    if attempt.expires_at is None:
+        return {
+            'attempt_id': attempt_id,
+            'expires_at': None,
+            'remaining_seconds': None,
+            'is_expired': False,
+            'is_active': is_active,
+        }
+
+    if is_active:
+        start_timer(kind, attempt)
+    return {**_timer_payload(attempt_id, attempt.expires_at), 'is_active': is_active}
+
+
+def expired_attempt_ids(kind: str, batch_size: Optional[int] = None, exclude_ids=()):
+    """
+    IDs المحاولات الجارية اللي وقتها + المهلة خلصوا (دفعة واحدة)
+    """
+    model = get_attempt_model(kind)
+    deadline = timezone.now() - get_grace()
+    queryset = model.objects.filter(expires_at__lt=deadline)
+    if kind == 'placement':
+        queryset = queryset.filter(status='IN_PROGRESS')
+    else:
+        queryset = queryset.filter(submitted_at__isnull=True)
+    if exclude_ids:
+        queryset = queryset.exclude(id__in=exclude_ids)
+    return list(
+        queryset.order_by('expires_at').values_list('id', flat=True)[:batch_size or _config()['sweep_batch_size']]
+    )
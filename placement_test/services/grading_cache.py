@@ -0,0 +1,191 @@
+# placement_test/services/grading_cache.py
+
+import hashlib
+import json
+import logging
+import unicodedata
+from datetime import timedelta
+from decimal import Decimal
+from typing import Dict, Any, Iterable, Optional
+
+from django.db import IntegrityError
+from django.db.models import F, Sum, Count, Q, DecimalField
+from django.utils import timezone
+
+from placement_test.models import WritingGradeCache
+
+logger = logging.getLogger('ai_grading')
+
+# عدادات الـ lookups (hit / miss) - في Redis عشان تتجمع من كل الـ workers
+LOOKUP_COUNTER_KEY = 'grading_cache:lookups'
+
+
+def normalize_answer(text: str) -> str:
+    """
+    تطبيع الإجابة قبل الـ hashing
+    (توحيد الـ unicode + إزالة المسافات الزائدة) - الحروف الكبيرة والصغيرة بتفضل زي ما هي
+    لأنها بتأثر على تقييم الـ grammar
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.split())
+
+
+def make_cache_key(model: str, **grading_kwargs) -> str:
+    """
+    SHA-256 لكل المدخلات اللي بتأثر على نتيجة التصحيح
+    """
+    payload = {
+        'model': model,
+        'question_text': normalize_answer(grading_kwargs.get('question_text', '')),
+        'student_answer': normalize_answer(grading_kwargs.get('student_answer', '')),
+        'sample_answer': normalize_answer(grading_kwargs.get('sample_answer', '')),
+        'rubric': normalize_answer(grading_kwargs.get('rubric', '')),
+        'max_points': grading_kwargs.get('max_points'),
+        'min_words': grading_kwargs.get('min_words', 100),
+        'max_words': grading_kwargs.get('max_words', 500),
+        'pass_threshold': grading_kwargs.get('pass_threshold', 60),
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def get_cached_results(cache_keys: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    جلب النتائج المحفوظة لمجموعة مفاتيح في query واحدة
+
+    Returns:
+        {cache_key: result} للمفاتيح الموجودة وغير المنتهية فقط
+        (النتيجة بتكلفة 0 لأنها مش بتستدعي الـ API)
+    """
+    cache_keys = set(cache_keys)
+    if not cache_keys:
+        return {}
+
+    now = timezone.now()
+    entries = WritingGradeCache.objects.filter(
+        cache_key__in=cache_keys
+    ).filter(
+        Q(expires_at__isnull=True) | Q(expires_at__gt=now)
+    ).only('id', 'cache_key', 'result')
+
+    results = {}
+    hit_ids = []
+    for entry in entries:
+        result = dict(entry.result)
+        result['tokens_used'] = 0
+        result['cost'] = 0.0
+        result['cached'] = True
+        results[entry.cache_key] = result
+        hit_ids.append(entry.id)
+
+    if hit_ids:
+        WritingGradeCache.objects.filter(id__in=hit_ids).update(
+            hits=F('hits') + 1,
+            last_hit_at=now
+        )
+
+    _count_lookups(hits=len(results), misses=len(cache_keys) - len(results))
+    return results
+
+
+def _count_lookups(hits: int, misses: int) -> None:
+    from placement_test.services.redis_client import get_redis
+
+    redis_client = get_redis()
+    if redis_client is None:
+        return
+    try:
+        pipe = redis_client.pipeline()
+        if hits:
+            pipe.hincrby(LOOKUP_COUNTER_KEY, 'hits', hits)
+        if misses:
+            pipe.hincrby(LOOKUP_COUNTER_KEY, 'misses', misses)
+        pipe.execute()
+    except Exception as e:
+        logger.warning(f"Could not update grading cache counters: {str(e)}")
+
+
+def _get_lookup_counts() -> Optional[Dict[str, int]]:
+    from placement_test.services.redis_client import get_redis
+
+    redis_client = get_redis()
+    if redis_client is None:
+        return None
+    try:
+        counts = redis_client.hgetall(LOOKUP_COUNTER_KEY)
+    except Exception as e:
+        logger.warning(f"Could not read grading cache counters: {str(e)}")
+        return None
+    counts = {
+        (key.decode() if isinstance(key, bytes) else key): int(value)
+        for key, value in counts.items()
+    }
+    return {'hits': counts.get('hits', 0), 'misses': counts.get('misses', 0)}
+
+
+def store_result(
+    cache_key: str,
+    model: str,
+    pass_threshold: int,
+    result: Dict[str, Any],
+    ttl_days: Optional[int] = None
+) -> None:
+    """
+    حفظ نتيجة تصحيح ناجحة في الكاش
+    """
+    expires_at = timezone.now() + timedelta(days=ttl_days) if ttl_days else None
+
+    try:
+        WritingGradeCache.objects.update_or_create(
+            cache_key=cache_key,
+            defaults={
+                'model_name': model,
+                'pass_threshold': pass_threshold,
+                'result': result,
+                'cost': Decimal(str(result.get('cost', 0))),
+                'expires_at': expires_at,
+            }
+        )
+    except IntegrityError:
+        # طلب تاني حفظ نفس المفتاح في نفس اللحظة
+        logger.info(f"Grading cache entry {cache_key[:12]} already stored")
+
+
+def get_cache_stats() -> Dict[str, Any]:
+    """
+    إحصائيات الكاش
+    hits = مجموع عدادات الـ entries (من أول ما الكاش اشتغل)
+    lookups = عدادات الـ hit / miss الفعلية من Redis (None لو Redis مش متظبط)
+    """
+    stats = WritingGradeCache.objects.aggregate(
+        total_entries=Count('id'),
+        total_hits=Sum('hits'),
+        expired=Count('id', filter=Q(expires_at__lte=timezone.now())),
+        saved_cost=Sum(
+            F('cost') * F('hits'),
+            output_field=DecimalField(max_digits=16, decimal_places=6)
+        ),
+    )
+    lookups = _get_lookup_counts()
+    if lookups is not None:
+        total_lookups = lookups['hits'] + lookups['misses']
+        hit_rate = round(lookups['hits'] / total_lookups * 100, 2) if total_lookups > 0 else 0
+    else:
+        hit_rate = None
+
+    return {
+        'entries': stats['total_entries'] or 0,
+        'expired_entries': stats['expired'] or 0,
+        'hits': stats['total_hits'] or 0,
+        'lookups': lookups,
+        'hit_rate': hit_rate,
+        'saved_cost': float(stats['saved_cost'] or 0),
+    }
+
+
+def purge_expired() -> int:
+    """
+    حذف النتائج المنتهية
+    """
+    deleted, _ = WritingGradeCache.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,157 @@
+# placement_test/services/pre_grading.py
+
+import logging
+import re
+from collections import Counter
+from typing import Dict, Any, Optional, List
+
+logger = logging.getLogger('ai_grading')
+
+
+# ============================================
+# حدود الفلتر المحلي (لازم تكون واضحة جداً - أي حالة مش أكيدة بتروح للـ AI)
+# ============================================
+
+# الإجابة أقل من ثلث الحد الأدنى للكلمات
+MIN_WORDS_RATIO = 1 / 3
+# الإجابة أكبر من 3 أضعاف الحد الأقصى للكلمات
+MAX_WORDS_RATIO = 3
+# نسبة الحروف الإنجليزية من إجمالي الحروف
+MIN_ENGLISH_RATIO = 0.5
+# نسبة الـ 3-grams المنسوخة من السؤال أو نموذج الإجابة
+MAX_COPY_RATIO = 0.8
+# نسبة الكلمات المختلفة من إجمالي الكلمات (للإجابات 20 كلمة أو أكثر)
+MIN_UNIQUE_RATIO = 0.25
+# نسبة تكرار أكثر كلمة (غير الكلمات الشائعة)
+MAX_TOP_TOKEN_RATIO = 0.4
+SPAM_MIN_WORDS = 20
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'of', 'to', 'in', 'on', 'at', 'for',
+    'is', 'are', 'was', 'were', 'be', 'i', 'you', 'he', 'she', 'it', 'we', 'they',
+    'my', 'your', 'his', 'her', 'its', 'our', 'their', 'this', 'that', 'with',
+}
+
+WORD_RE = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?", re.UNICODE)
+
+
+def _tokenize(text: str) -> List[str]:
+    return [token.lower() for token in WORD_RE.findall(text or '')]
+
+
+def _english_ratio(text: str) -> float:
+    letters = [ch for ch in text if ch.isalpha()]
+    if not letters:
+        return 0.0
+    english = sum(1 for ch in letters if 'a' <= ch.lower() <= 'z')
+    return english / len(letters)
+
+
+def _shingles(tokens: List[str], size: int = 3) -> set:
+    if len(tokens) < size:
+        return {tuple(tokens)} if tokens else set()
+    return {tuple(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+
+
+def _copy_ratio(answer_tokens: List[str], source_text: str) -> float:
+    """
+    نسبة الـ 3-grams في الإجابة الموجودة في النص المصدر
+    """
+    source_tokens = _tokenize(source_text)
+    if not answer_tokens or not source_tokens:
+        return 0.0
+    answer_shingles = _shingles(answer_tokens)
+    return len(answer_shingles & _shingles(source_tokens)) / len(answer_shingles)
+
+
+def _is_spam(tokens: List[str]) -> bool:
+    if len(tokens) < SPAM_MIN_WORDS:
+        return False
+    if len(set(tokens)) / len(tokens) < MIN_UNIQUE_RATIO:
+        return True
+    content_tokens = [token for token in tokens if token not in STOP_WORDS]
+    if not content_tokens:
+        return True
+    _, top_count = Counter(content_tokens).most_common(1)[0]
+    return top_count / len(tokens) > MAX_TOP_TOKEN_RATIO
+
+
+def pre_grade_writing_answer(
+    question_text: str,
+    student_answer: str,
+    sample_answer: str,
+    max_points: int,
+    min_words: int = 100,
+    max_words: int = 500,
+    pass_threshold: int = 60,
+    **kwargs
+) -> Optional[Dict[str, Any]]:
+    """
+    فلتر محلي قبل الـ AI للإجابات الفاشلة بشكل واضح
+
+    Returns:
+        None لو الإجابة محتاجة تصحيح بالـ AI
+        أو نتيجة FAIL بنفس شكل grade_writing_question (بدون أي تكلفة)
+    """
+    student_answer = student_answer or ''
+    word_count = len(student_answer.split())
+    is_within_limit = min_words <= word_count <= max_words
+    tokens = _tokenize(student_answer)
+
+    reason = None
+    feedback = None
+    improvements = []
+
+    if word_count == 0 or not tokens:
+        reason = 'empty'
+        feedback = 'لم يتم تقديم إجابة.'
+        improvements = ['اكتب إجابة باللغة الإنجليزية تجيب على السؤال']
+
+    elif word_count < min_words * MIN_WORDS_RATIO:
+        reason = 'too_short'
+        feedback = f'الإجابة قصيرة جداً ({word_count} كلمة) والحد الأدنى المطلوب {min_words} كلمة.'
+        improvements = [f'اكتب {min_words} كلمة على الأقل', 'طور أفكارك بأمثلة وتفاصيل']
+
+    elif word_count > max_words * MAX_WORDS_RATIO:
+        reason = 'too_long'
+        feedback = f'الإجابة طويلة جداً ({word_count} كلمة) والحد الأقصى المسموح {max_words} كلمة.'
+        improvements = [f'التزم بحد أقصى {max_words} كلمة', 'ركز على النقاط الأساسية فقط']
+
+    elif _english_ratio(student_answer) < MIN_ENGLISH_RATIO:
+        reason = 'not_english'
+        feedback = 'الإجابة ليست باللغة الإنجليزية.'
+        improvements = ['اكتب إجابتك باللغة الإنجليزية']
+
+    elif max(
+        _copy_ratio(tokens, question_text),
+        _copy_ratio(tokens, sample_answer)
+    ) >= MAX_COPY_RATIO:
+        reason = 'copied'
+        feedback = 'الإجابة منسوخة من نص السؤال أو من نموذج الإجابة.'
+        improvements = ['اكتب إجابتك بأسلوبك الخاص', 'استخدم كلماتك وأفكارك الشخصية']
+
+    elif _is_spam(tokens):
+        reason = 'repeated_tokens'
+        feedback = 'الإجابة تحتوي على تكرار مفرط لنفس الكلمات.'
+        improvements = ['تجنب تكرار نفس الكلمات', 'اكتب جمل مترابطة تجيب على السؤال']
+
+    if reason is None:
+        return None
+
+    logger.info(f"Pre-grading short-circuit: reason={reason}, word_count={word_count}")
+
+    return {
+        'raw_score': 0,
+        'percentage': 0.0,
+        'score': 0,
+        'is_correct': False,
+        'feedback': f'{feedback} الحد الأدنى للنجاح: {pass_threshold}%.',
+        'strengths': [],
+        'improvements': improvements,
+        'word_count': word_count,
+        'is_within_limit': is_within_limit,
+        'tokens_used': 0,
+        'cost': 0.0,
+        'pre_graded': True,
+        'pre_grading_reason': reason
+    }
@@ -0,0 +1,187 @@
+# placement_test/services/question_pools.py
+
+import logging
+import random
+from typing import Dict, List, Optional
+
+from django.conf import settings
+
+from placement_test.services.redis_client import get_redis
+from sabr_questions.models import (
+    VocabularyQuestion,
+    GrammarQuestion,
+    ReadingQuestion,
+    ListeningQuestion,
+    SpeakingQuestion,
+    WritingQuestion
+)
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# Pools: {owner}:{bank_id}:{q_type} → Redis SET فيه IDs الأسئلة النشطة
+#
+# - placement      → PlacementQuestionBank   (placement_question_bank)
+# - levels         → LevelsUnitsQuestionBank (levels_units_question_bank)
+# - placement_test → PlacementTestQuestionBank (الربط القديم بـ GenericForeignKey)
+#
+# ✅ الـ pool بيتبني مرة واحدة من الـ DB والاختيار بيتم بـ SRANDMEMBER
+# ✅ signals (placement_test/signals.py) بتمسح الـ pool مع أي تعديل في الأسئلة
+# ============================================
+
+Q_TYPES = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking', 'writing']
+
+# النوع → (Model, prefix الـ parent اللي عليه البنك و is_active)
+QUESTION_SOURCES = {
+    'vocabulary': (VocabularyQuestion, ''),
+    'grammar': (GrammarQuestion, ''),
+    'reading': (ReadingQuestion, 'passage__'),
+    'listening': (ListeningQuestion, 'audio__'),
+    'speaking': (SpeakingQuestion, 'video__'),
+    'writing': (WritingQuestion, ''),
+}
+
+BANK_FIELDS = {
+    'placement': 'placement_question_bank',
+    'levels': 'levels_units_question_bank',
+}
+
+
+def _config() -> Dict:
+    return getattr(settings, 'QUESTION_POOL_CONFIG', {'enabled': False, 'ttl': 60 * 60})
+
+
+def _get_redis():
+    """
+    Redis client - None لو Redis مش متظبط أو الـ pools مقفولة
+    """
+    if not _config()['enabled']:
+        return None
+    return get_redis()
+
+
+def pool_key(owner: str, bank_id: int, q_type: str) -> str:
+    return f'qpool:{owner}:{bank_id}:{q_type}'
+
+
+def _loaded_key(key: str) -> str:
+    return f'{key}:loaded'
+
+
+def load_pool_ids(owner: str, bank_id: int, q_type: str) -> List[int]:
+    """
+    IDs الأسئلة النشطة من الـ DB (بيتنادي بس لما الـ pool مش موجود)
+    """
+    if owner == 'placement_test':
+        from django.contrib.contenttypes.models import ContentType
+        from placement_test.models import PlacementTestQuestionBank
+
+        model = QUESTION_SOURCES[q_type][0]
+        return list(
+            PlacementTestQuestionBank.objects.filter(
+                placement_test_id=bank_id,
+                content_type=ContentType.objects.get_for_model(model),
+                is_active=True
+            ).values_list('object_id', flat=True)
+        )
+
+    model, parent = QUESTION_SOURCES[q_type]
+    filters = {
+        f'{parent}{BANK_FIELDS[owner]}': bank_id,
+        'is_active': True,
+    }
+    if parent:
+        filters[f'{parent}is_active'] = True
+    return list(model.objects.filter(**filters).values_list('id', flat=True))
+
+
+def _sample_from_redis(client, owner: str, bank_id: int, counts: Dict[str, int]) -> Dict[str, List[int]]:
+    keys = {q_type: pool_key(owner, bank_id, q_type) for q_type in counts}
+
+    pipe = client.pipeline()
+    for q_type, key in keys.items():
+        pipe.exists(_loaded_key(key))
+        pipe.srandmember(key, counts[q_type])
+    replies = pipe.execute()
+
+    sampled = {}
+    missing = []
+    for index, q_type in enumerate(keys):
+        loaded, members = replies[index * 2], replies[index * 2 + 1]
+        if loaded:
+            sampled[q_type] = [int(member) for member in members]
+        else:
+            missing.append(q_type)
+
+    if missing:
+        # بناء الـ pools الناقصة مرة واحدة
+        ttl = _config()['ttl']
+        pipe = client.pipeline()
+        for q_type in missing:
+            ids = load_pool_ids(owner, bank_id, q_type)
+            key = keys[q_type]
+            pipe.delete(key)
+            if ids:
+                pipe.sadd(key, *ids)
+                pipe.expire(key, ttl)
+            pipe.set(_loaded_key(key), 1, ex=ttl)
+            sampled[q_type] = random.sample(ids, min(counts[q_type], len(ids)))
+        pipe.execute()
+
+    return sampled
+
+
+def sample_question_ids(owner: str, bank_id: int, counts: Dict[str, int]) -> Dict[str, List[int]]:
+    """
+    اختيار IDs عشوائية لكل نوع من بنك معين
+
+    Args:
+        owner: 'placement' | 'levels' | 'placement_test'
+        bank_id: معرف البنك
+        counts: {'vocabulary': 10, 'grammar': 10, ...}
+
+    Returns:
+        {'vocabulary': [ids], ...} - بترتيب عشوائي
+    """
+    counts = {q_type: count for q_type, count in counts.items() if count > 0}
+    selected = {q_type: [] for q_type in Q_TYPES}
+
+    client = _get_redis()
+    sampled: Optional[Dict[str, List[int]]] = None
+    if client is not None and counts:
+        try:
+            sampled = _sample_from_redis(client, owner, bank_id, counts)
+        except Exception as e:
+            logger.warning(f"Question pool unavailable, falling back to DB: {str(e)}")
+
+    if sampled is None:
+        sampled = {}
+        for q_type, count in counts.items():
+            ids = load_pool_ids(owner, bank_id, q_type)
+            sampled[q_type] = random.sample(ids, min(count, len(ids)))
+
+    for q_type, ids in sampled.items():
+        random.shuffle(ids)
+        selected[q_type] = ids
+    return selected
+
+
+def invalidate_pools(owner: str, bank_ids, q_types=None) -> None:
+    """
+    مسح pools بنك (أو أكتر) - بتتبني تاني مع أول امتحان
+    """
+    client = _get_redis()
+    bank_ids = [bank_id for bank_id in bank_ids if bank_id]
+    if client is None or not bank_ids:
+        return
+
+    keys = []
+    for bank_id in bank_ids:
+        for q_type in (q_types or Q_TYPES):
+            key = pool_key(owner, bank_id, q_type)
+            keys.extend([key, _loaded_key(key)])
+    try:
+        client.delete(*keys)
+    except Exception as e:
+        logger.warning(f"Failed to invalidate question pools {keys}: {str(e)}")
@@ -0,0 +1,19 @@
+# placement_test/services/redis_client.py
+
+from django.conf import settings
+
+_redis_client = None
+
+
+def get_redis():
+    """
+    Redis client مشترك (lazy) - None لو REDIS_URL مش متظبط
+    """
+    global _redis_client
+    redis_url = getattr(settings, 'REDIS_URL', None)
+    if not redis_url:
+        return None
+    if _redis_client is None:
+        import redis
+        _redis_client = redis.Redis.from_url(redis_url)
+    return _redis_client
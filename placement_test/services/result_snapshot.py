@@ -0,0 +1,89 @@
+# placement_test/services/result_snapshot.py
+
+import logging
+from typing import Dict, Any
+
+from placement_test.models import (
+    StudentPlacementTestAttempt,
+    StudentPlacementTestAnswer
+)
+from placement_test.serializers import (
+    ExamResultSerializer,
+    StudentAnswerDetailSerializer
+)
+from .autosave_service import ANSWER_TYPES, CONTENT_TYPE_MODELS
+
+logger = logging.getLogger(__name__)
+
+
+MCQ_TYPES = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking']
+
+
+def build_result_snapshot(attempt: StudentPlacementTestAttempt) -> Dict[str, Any]:
+    """
+    بناء نتيجة الامتحان الكاملة (نفس شكل response الـ get_exam_result)
+    ✅ بتتحسب مرة واحدة عند إنهاء المحاولة وبعد كده بتتقري من result_snapshot
+    """
+    model_to_type = {model: q_type for q_type, model in CONTENT_TYPE_MODELS.items()}
+    answers_by_type = {q_type: [] for q_type in ANSWER_TYPES}
+
+    answers = StudentPlacementTestAnswer.objects.filter(
+        attempt=attempt
+    ).select_related('content_type').order_by('answered_at')
+
+    for answer in answers:
+        key = model_to_type.get(answer.content_type.model)
+        if key:
+            answers_by_type[key].append(
+                StudentAnswerDetailSerializer(answer).data
+            )
+
+    # إحصائيات تفصيلية
+    total_mcq = sum(len(answers_by_type[q_type]) for q_type in MCQ_TYPES)
+    correct_mcq = sum(
+        1 for q_type in MCQ_TYPES for a in answers_by_type[q_type] if a['is_correct']
+    )
+
+    writing_scores = [a['points_earned'] for a in answers_by_type['writing']]
+    total_writing_score = sum(writing_scores)
+    max_writing_score = len(writing_scores) * 10  # assuming 10 points per writing question
+
+    return {
+        'exam_info': ExamResultSerializer(attempt).data,
+        'statistics': {
+            'mcq': {
+                'total': total_mcq,
+                'correct': correct_mcq,
+                'wrong': total_mcq - correct_mcq,
+                'accuracy': round((correct_mcq / total_mcq * 100), 2) if total_mcq > 0 else 0
+            },
+            'writing': {
+                'total_questions': len(writing_scores),
+                'total_score': total_writing_score,
+                'max_score': max_writing_score,
+                'average_score': round(sum(writing_scores) / len(writing_scores), 2) if writing_scores else 0
+            }
+        },
+        'answers_details': answers_by_type
+    }
+
+
+def save_result_snapshot(attempt: StudentPlacementTestAttempt) -> Dict[str, Any]:
+    """
+    حفظ snapshot ثابت للنتيجة + الأعمدة الملخصة (للـ history والتقارير)
+    """
+    total = attempt.placement_test.total_questions
+    attempt.percentage = round((attempt.score / total) * 100, 2) if total > 0 else 0
+    attempt.result_snapshot = build_result_snapshot(attempt)
+    attempt.save(update_fields=['percentage', 'result_snapshot', 'updated_at'])
+    return attempt.result_snapshot
+
+
+def get_result_snapshot(attempt: StudentPlacementTestAttempt) -> Dict[str, Any]:
+    """
+    قراءة الـ snapshot (ولو المحاولة قديمة ومفيهاش snapshot بيتبني ويتحفظ أول مرة)
+    """
+    if attempt.result_snapshot is None:
+        logger.info(f"Backfilling result snapshot for attempt {attempt.id}")
+        return save_result_snapshot(attempt)
+    return attempt.result_snapshot
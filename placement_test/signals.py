@@ -0,0 +1,105 @@
+# placement_test/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+
+from placement_test.models import PlacementTestQuestionBank
+from placement_test.services.question_pools import invalidate_pools, BANK_FIELDS, QUESTION_SOURCES
+from sabr_questions.models import ReadingPassage, ListeningAudio, SpeakingVideo
+
+
+# ============================================
+# مسح pools الأسئلة العشوائية (question_pools.py) مع أي تعديل
+#
+# ✅ البنوك وقت التحميل بتتحفظ (post_init) - سؤال/قطعة اتنقلت من بنك A لـ B الاتنين بيتمسحوا
+# ✅ المسح بعد الـ commit - rebuild في نفس اللحظة ما يخزنش الأسئلة القديمة طول الـ TTL
+# ============================================
+
+MODEL_TYPES = {model: q_type for q_type, (model, _) in QUESTION_SOURCES.items()}
+
+# الـ parent (passage/audio/video) → نوع الأسئلة اللي تحته
+PARENT_TYPES = {
+    ReadingPassage: 'reading',
+    ListeningAudio: 'listening',
+    SpeakingVideo: 'speaking',
+}
+
+
+def _parent_field(sender):
+    return QUESTION_SOURCES[MODEL_TYPES[sender]][1].rstrip('_')
+
+
+def _owner_banks(obj):
+    """
+    {owner: bank_id} - من __dict__ عشان الـ deferred fields ما تعملش query
+    """
+    return {owner: obj.__dict__.get(f'{field}_id') for owner, field in BANK_FIELDS.items()}
+
+
+def _invalidate_after_commit(bank_ids, q_type):
+    def clear():
+        for owner, ids in bank_ids.items():
+            invalidate_pools(owner, list(ids), [q_type])
+
+    transaction.on_commit(clear)
+
+
+def _collect_banks(*bank_maps):
+    bank_ids = {owner: set() for owner in BANK_FIELDS}
+    for bank_map in bank_maps:
+        for owner, bank_id in bank_map.items():
+            if bank_id:
+                bank_ids[owner].add(bank_id)
+    return bank_ids
+
+
+def remember_question_banks(sender, instance, **kwargs):
+    if sender in PARENT_TYPES or not QUESTION_SOURCES[MODEL_TYPES[sender]][1]:
+        instance._loaded_banks = _owner_banks(instance)
+    else:
+        instance._loaded_parent_id = instance.__dict__.get(f'{_parent_field(sender)}_id')
+
+
+def invalidate_question_pools(sender, instance, **kwargs):
+    q_type = MODEL_TYPES[sender]
+    parent_name = _parent_field(sender)
+    if parent_name:
+        # Reading/Listening/Speaking: البنك على الـ passage/audio/video (الحالي + القديم لو اتنقل)
+        parent_model = sender._meta.get_field(parent_name).related_model
+        parent_ids = {getattr(instance, f'{parent_name}_id'), getattr(instance, '_loaded_parent_id', None)} - {None}
+        parents = parent_model.objects.filter(id__in=parent_ids).values(
+            *(f'{field}_id' for field in BANK_FIELDS.values())
+        )
+        bank_ids = _collect_banks(*(
+            {owner: parent[f'{field}_id'] for owner, field in BANK_FIELDS.items()} for parent in parents
+        ))
+        instance._loaded_parent_id = getattr(instance, f'{parent_name}_id')
+    else:
+        bank_ids = _collect_banks(_owner_banks(instance), getattr(instance, '_loaded_banks', {}))
+        instance._loaded_banks = _owner_banks(instance)
+    _invalidate_after_commit(bank_ids, q_type)
+
+
+def invalidate_parent_pools(sender, instance, **kwargs):
+    bank_ids = _collect_banks(_owner_banks(instance), getattr(instance, '_loaded_banks', {}))
+    instance._loaded_banks = _owner_banks(instance)
+    _invalidate_after_commit(bank_ids, PARENT_TYPES[sender])
+
+
+def invalidate_placement_test_pools(sender, instance, **kwargs):
+    invalidate_pools('placement_test', [instance.placement_test_id])
+
+
+for model in [*MODEL_TYPES, *PARENT_TYPES]:
+    post_init.connect(remember_question_banks, sender=model, dispatch_uid=f'qpool_init_{model.__name__}')
+
+for model in MODEL_TYPES:
+    post_save.connect(invalidate_question_pools, sender=model, dispatch_uid=f'qpool_save_{model.__name__}')
+    post_delete.connect(invalidate_question_pools, sender=model, dispatch_uid=f'qpool_delete_{model.__name__}')
+
+for model in PARENT_TYPES:
+    post_save.connect(invalidate_parent_pools, sender=model, dispatch_uid=f'qpool_save_{model.__name__}')
+    post_delete.connect(invalidate_parent_pools, sender=model, dispatch_uid=f'qpool_delete_{model.__name__}')
+
+post_save.connect(invalidate_placement_test_pools, sender=PlacementTestQuestionBank, dispatch_uid='qpool_save_placement_test')
+post_delete.connect(invalidate_placement_test_pools, sender=PlacementTestQuestionBank, dispatch_uid='qpool_delete_placement_test')
@@ -0,0 +1,38 @@
+import logging
+from celery import shared_task
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================================
+# TASK — Sweep expired placement attempts
+# ============================================================
+
+@shared_task(bind=True, max_retries=0)
+def sweep_expired_placement_attempts(self):
+    """
+    المحاولات الجارية اللي وقتها خلص (+ المهلة) → ABANDONED
+    (نفس اللي is_time_up بيعمله لما الطالب يرجع - بس من غير ما نستنى الطالب)
+    """
+    from django.utils import timezone
+    from .models import StudentPlacementTestAttempt
+    from .services.exam_timer import expired_attempt_ids, clear_timer
+
+    total = 0
+    while True:
+        attempt_ids = expired_attempt_ids('placement')
+        if not attempt_ids:
+            break
+
+        # status في الـ filter عشان ما نلمسش محاولة اتسلمت في نفس اللحظة
+        total += StudentPlacementTestAttempt.objects.filter(
+            id__in=attempt_ids,
+            status='IN_PROGRESS'
+        ).update(status='ABANDONED', updated_at=timezone.now())
+
+        for attempt_id in attempt_ids:
+            clear_timer('placement', attempt_id)
+
+    if total:
+        logger.info(f"Abandoned {total} expired placement attempts")
+    return total
@@ -175,4 +175,50 @@ urlpatterns = [
         views.get_active_exam,
         name='student-active-exam'
     ),
+    
+    # ============================================
+    # 6. AI Grading Cache
+    # ============================================
+    path(
+        'ai-grading/cache-stats/',
+        views.ai_grading_cache_stats,
+        name='ai-grading-cache-stats'
+    ),
+    
+    # ============================================
+    # 7. Student - Adaptive Placement Test (CAT)
+    # ============================================
+    path(
+        'student/adaptive/start/',
+        views.start_adaptive_exam,
+        name='student-adaptive-start'
+    ),
+    path(
+        'student/adaptive/<int:attempt_id>/answer/',
+        views.submit_adaptive_answer,
+        name='student-adaptive-answer'
+    ),
+    path(
+        'student/adaptive/<int:attempt_id>/finish/',
+        views.finish_adaptive_exam,
+        name='student-adaptive-finish'
+    ),
+    
+    # ============================================
+    # 8. Student - Exam Autosave
+    # ============================================
+    path(
+        'student/autosave/<int:attempt_id>/',
+        views.autosave_exam,
+        name='student-autosave-exam'
+    ),
+    
+    # ============================================
+    # 9. Student - Exam Timer
+    # ============================================
+    path(
+        'student/exam-timer/<int:attempt_id>/',
+        views.get_exam_timer,
+        name='student-exam-timer'
+    ),
 ]
\ No newline at end of file
@@ -1,10 +1,11 @@
 from django.shortcuts import get_object_or_404
 from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
 import random
 
 from placement_test.models import PlacementQuestionBank , StudentPlacementTestAttempt, PlacementTest, StudentPlacementTestAnswer
@@ -51,9 +52,19 @@ from .serializers import (
 )
 
 from placement_test.services.exam_service import exam_service
+from placement_test.services.adaptive_service import adaptive_exam_service
+from placement_test.services.result_snapshot import get_result_snapshot
+from placement_test.services.question_pools import sample_question_ids
+from placement_test.services.exam_timer import start_timer, get_remaining_time
+from placement_test.services.autosave_service import (
+    save_placement_answer_deltas,
+    get_saved_placement_answers,
+    count_answers
+)
 from placement_test.serializers import (
     # ... الـ imports الموجودة
     SubmitExamSerializer,
+    AutosaveAnswersSerializer,
     ExamResultSerializer,
     StudentAnswerDetailSerializer,
     StudentAttemptListSerializer,
@@ -932,12 +943,7 @@ def create_exam_from_bank(request):
     """
     
     # ✅ البحث عن جميع البنوك الجاهزة للامتحان
-    ready_banks = []
-    all_banks = PlacementQuestionBank .objects.all()
-    
-    for bank in all_banks:
-        if bank.is_ready_for_exam():
-            ready_banks.append(bank)
+    ready_banks = get_ready_question_banks()
     
     # ✅ التحقق من وجود بنوك جاهزة
     if not ready_banks:
@@ -952,20 +958,7 @@ def create_exam_from_bank(request):
     question_bank = random.choice(ready_banks)
     
     # ✅ Create or get default PlacementTest
-    placement_test, created = PlacementTest.objects.get_or_create(
-        title=f"Placement Test - {question_bank.title}",
-        defaults={
-            'description': f'Auto-generated for {question_bank.title}',
-            'duration_minutes': 30,
-            'total_questions': 50,
-            'vocabulary_count': 10,
-            'grammar_count': 10,
-            'reading_count': 6,
-            'listening_count': 10,
-            'speaking_count': 10,
-            'writing_count': 4,
-        }
-    )
+    placement_test = get_or_create_placement_test(question_bank)
     
     # ⚠️ TODO: REMOVE COMMENTS IN PRODUCTION ⚠️
     # ========================================
@@ -1009,6 +1002,7 @@ def create_exam_from_bank(request):
         
         # Save selected questions
         attempt.set_selected_questions(selected_questions)
+        transaction.on_commit(lambda: start_timer('placement', attempt))
         
         # Fetch actual question objects
         exam_questions = fetch_selected_questions(selected_questions)
@@ -1032,7 +1026,7 @@ def create_exam_from_bank(request):
             'duration_minutes': placement_test.duration_minutes,
             'total_questions': placement_test.total_questions,
             'started_at': attempt.started_at,
-            'ends_at': attempt.started_at + timezone.timedelta(minutes=placement_test.duration_minutes)
+            'ends_at': attempt.expires_at
         },
         'questions': exam_questions,
         'distribution': {
@@ -1048,6 +1042,37 @@ def create_exam_from_bank(request):
 # 5. HELPER FUNCTIONS
 # ============================================
 
+def get_ready_question_banks():
+    """
+    جميع البنوك الجاهزة للامتحان
+    """
+    return [
+        bank for bank in PlacementQuestionBank.objects.all()
+        if bank.is_ready_for_exam()
+    ]
+
+
+def get_or_create_placement_test(question_bank):
+    """
+    الاختبار الافتراضي المرتبط بالبنك
+    """
+    placement_test, _ = PlacementTest.objects.get_or_create(
+        title=f"Placement Test - {question_bank.title}",
+        defaults={
+            'description': f'Auto-generated for {question_bank.title}',
+            'duration_minutes': 30,
+            'total_questions': 50,
+            'vocabulary_count': 10,
+            'grammar_count': 10,
+            'reading_count': 6,
+            'listening_count': 10,
+            'speaking_count': 10,
+            'writing_count': 4,
+        }
+    )
+    return placement_test
+
+
 def select_random_questions_from_bank(question_bank):
     """
     اختيار أسئلة عشوائية من البنك
@@ -1062,73 +1087,15 @@ def select_random_questions_from_bank(question_bank):
             'writing': [list of question IDs]
         }
     """
-    selected_questions = {
-        'vocabulary': [],
-        'grammar': [],
-        'reading': [],
-        'listening': [],
-        'speaking': [],
-        'writing': []
-    }
-    
-    # Vocabulary (10 questions)
-    vocabulary_ids = list(
-        VocabularyQuestion.objects.filter(
-            placement_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['vocabulary'] = random.sample(vocabulary_ids, min(10, len(vocabulary_ids)))
-    
-    # Grammar (10 questions)
-    grammar_ids = list(
-        GrammarQuestion.objects.filter(
-            placement_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['grammar'] = random.sample(grammar_ids, min(10, len(grammar_ids)))
-    
-    # Reading (6 questions)
-    reading_ids = list(
-        ReadingQuestion.objects.filter(
-            passage__placement_question_bank=question_bank,
-            passage__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['reading'] = random.sample(reading_ids, min(6, len(reading_ids)))
-    
-    # Listening (10 questions)
-    listening_ids = list(
-        ListeningQuestion.objects.filter(
-            audio__placement_question_bank=question_bank,
-            audio__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['listening'] = random.sample(listening_ids, min(10, len(listening_ids)))
-    
-    # Speaking (10 questions)
-    speaking_ids = list(
-        SpeakingQuestion.objects.filter(
-            video__placement_question_bank=question_bank,
-            video__is_active=True,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['speaking'] = random.sample(speaking_ids, min(10, len(speaking_ids)))
-    
-    # Writing (4 questions)
-    writing_ids = list(
-        WritingQuestion.objects.filter(
-            placement_question_bank=question_bank,
-            is_active=True
-        ).values_list('id', flat=True)
-    )
-    selected_questions['writing'] = random.sample(writing_ids, min(4, len(writing_ids)))
-    
-    return selected_questions
+    # ✅ الاختيار من pools في Redis (SRANDMEMBER) بدل تحميل كل الـ IDs من الـ DB
+    return sample_question_ids('placement', question_bank.id, {
+        'vocabulary': 10,
+        'grammar': 10,
+        'reading': 6,
+        'listening': 10,
+        'speaking': 10,
+        'writing': 4,
+    })
 
 def fetch_selected_questions(selected_questions):
     """
@@ -1240,6 +1207,9 @@ def submit_exam(request, attempt_id):
             ]
         }
     }
+    
+    ✅ الإجابات المحفوظة بالـ autosave بتتدمج تلقائياً،
+    فممكن يتبعت body فاضي لإنهاء الامتحان بس
     """
     
     # التحقق من المحاولة
@@ -1254,6 +1224,11 @@ def submit_exam(request, attempt_id):
             'error': 'الامتحان غير موجود أو تم إنهاؤه بالفعل'
         }, status=status.HTTP_404_NOT_FOUND)
     
+    if attempt.mode == 'ADAPTIVE':
+        return Response({
+            'error': 'هذا امتحان تكيفي، استخدم /student/adaptive/ للإجابة'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
     # التحقق من انتهاء الوقت
     if attempt.is_time_up():
         attempt.status = 'ABANDONED'
@@ -1318,7 +1293,9 @@ def get_exam_result(request, attempt_id):
     GET /api/place/student/exam-result/{attempt_id}/
     """
     try:
-        attempt = StudentPlacementTestAttempt.objects.get(
+        attempt = StudentPlacementTestAttempt.objects.select_related(
+            'placement_test', 'question_bank', 'student'
+        ).get(
             id=attempt_id,
             student=request.user
         )
@@ -1334,79 +1311,8 @@ def get_exam_result(request, attempt_id):
             'status': attempt.status
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    # تفاصيل النتيجة
-    result_serializer = ExamResultSerializer(attempt)
-    
-    # تفاصيل الإجابات
-    answers = StudentPlacementTestAnswer.objects.filter(
-        attempt=attempt
-    ).order_by('answered_at')
-    
-    answers_by_type = {
-        'vocabulary': [],
-        'grammar': [],
-        'reading': [],
-        'listening': [],
-        'speaking': [],
-        'writing': []
-    }
-    
-    for answer in answers:
-        q_type = answer.get_question_type_display()
-        type_mapping = {
-            'مفردات': 'vocabulary',
-            'قواعد': 'grammar',
-            'قراءة': 'reading',
-            'استماع': 'listening',
-            'تحدث': 'speaking',
-            'كتابة': 'writing'
-        }
-        
-        key = type_mapping.get(q_type)
-        if key:
-            answers_by_type[key].append(
-                StudentAnswerDetailSerializer(answer).data
-            )
-    
-    # إحصائيات تفصيلية
-    total_mcq = sum([
-        len(answers_by_type['vocabulary']),
-        len(answers_by_type['grammar']),
-        len(answers_by_type['reading']),
-        len(answers_by_type['listening']),
-        len(answers_by_type['speaking'])
-    ])
-    
-    correct_mcq = sum([
-        sum(1 for a in answers_by_type['vocabulary'] if a['is_correct']),
-        sum(1 for a in answers_by_type['grammar'] if a['is_correct']),
-        sum(1 for a in answers_by_type['reading'] if a['is_correct']),
-        sum(1 for a in answers_by_type['listening'] if a['is_correct']),
-        sum(1 for a in answers_by_type['speaking'] if a['is_correct'])
-    ])
-    
-    writing_scores = [a['points_earned'] for a in answers_by_type['writing']]
-    total_writing_score = sum(writing_scores)
-    max_writing_score = len(writing_scores) * 10  # assuming 10 points per writing question
-    
-    return Response({
-        'exam_info': result_serializer.data,
-        'statistics': {
-            'mcq': {
-                'total': total_mcq,
-                'correct': correct_mcq,
-                'wrong': total_mcq - correct_mcq,
-                'accuracy': round((correct_mcq / total_mcq * 100), 2) if total_mcq > 0 else 0
-            },
-            'writing': {
-                'total_questions': len(writing_scores),
-                'total_score': total_writing_score,
-                'max_score': max_writing_score,
-                'average_score': round(sum(writing_scores) / len(writing_scores), 2) if writing_scores else 0
-            }
-        },
-        'answers_details': answers_by_type
-    }, status=status.HTTP_200_OK)
+    # ✅ النتيجة محفوظة مرة واحدة عند الإنهاء (بدون إعادة قراءة وتجميع الإجابات)
+    return Response(get_result_snapshot(attempt), status=status.HTTP_200_OK)
 
 
 @api_view(['GET'])
@@ -1429,6 +1335,9 @@ def my_exam_attempts(request):
     ).select_related(
         'placement_test',
         'question_bank'
+    ).defer(
+        # ✅ القائمة بتعتمد على الأعمدة الملخصة بس
+        'result_snapshot', 'adaptive_state', 'selected_questions_json'
     ).order_by('-started_at')
     
     if status_filter:
@@ -1439,26 +1348,21 @@ def my_exam_attempts(request):
     
     serializer = StudentAttemptListSerializer(attempts, many=True)
     
-    # إحصائيات عامة
-    total_attempts = StudentPlacementTestAttempt.objects.filter(
-        student=request.user
-    ).count()
-    
-    completed_attempts = StudentPlacementTestAttempt.objects.filter(
-        student=request.user,
-        status='COMPLETED'
-    ).count()
-    
-    in_progress = StudentPlacementTestAttempt.objects.filter(
-        student=request.user,
-        status='IN_PROGRESS'
-    ).count()
+    # إحصائيات عامة (query واحدة)
+    student_attempts = StudentPlacementTestAttempt.objects.filter(student=request.user)
+    stats = student_attempts.aggregate(
+        total_attempts=Count('id'),
+        completed=Count('id', filter=Q(status='COMPLETED')),
+        in_progress=Count('id', filter=Q(status='IN_PROGRESS'))
+    )
+    total_attempts = stats['total_attempts']
+    completed_attempts = stats['completed']
+    in_progress = stats['in_progress']
     
     # أعلى درجة
-    best_attempt = StudentPlacementTestAttempt.objects.filter(
-        student=request.user,
+    best_attempt = student_attempts.filter(
         status='COMPLETED'
-    ).order_by('-score').first()
+    ).only('score', 'level_achieved').order_by('-score').first()
     
     return Response({
         'summary': {
@@ -1517,6 +1421,307 @@ def get_active_exam(request):
             'duration_minutes': active_attempt.placement_test.duration_minutes,
             'elapsed_minutes': round(elapsed_minutes, 2),
             'remaining_minutes': round(max(0, remaining_minutes), 2),
+            'expires_at': active_attempt.expires_at,
             'total_questions': active_attempt.placement_test.total_questions
         }
-    }, status=status.HTTP_200_OK)
\ No newline at end of file
+    }, status=status.HTTP_200_OK)
+
+# ============================================
+# 6. AI GRADING CACHE
+# ============================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, IsAdminUser])
+def ai_grading_cache_stats(request):
+    """
+    إحصائيات كاش تصحيح الكتابة (staff بس)
+
+    GET /api/place/ai-grading/cache-stats/
+    """
+    from placement_test.services.grading_cache import get_cache_stats
+
+    return Response({
+        'cache': get_cache_stats()
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================
+# 7. ADAPTIVE PLACEMENT TEST (CAT)
+# ============================================
+
+def _adaptive_question_payload(question_type, question_id):
+    """
+    بيانات سؤال واحد (بنفس شكل أسئلة الامتحان الثابت)
+    """
+    selected = {q_type: [] for q_type in ['vocabulary', 'grammar', 'reading', 'listening', 'speaking', 'writing']}
+    selected[question_type] = [question_id]
+    questions = fetch_selected_questions(selected)[question_type]
+    return {
+        'question_type': question_type,
+        'question': questions[0] if questions else None
+    }
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def start_adaptive_exam(request):
+    """
+    بدء اختبار تحديد مستوى تكيفي
+    كل سؤال بيتختار حسب إجابات الطالب السابقة، والاختبار بيقف أول ما المستوى يبان بثقة
+
+    POST /api/place/student/adaptive/start/
+    """
+    ready_banks = get_ready_question_banks()
+    if not ready_banks:
+        return Response({
+            'error': 'لا يوجد بنوك أسئلة جاهزة للامتحان',
+            'ready_banks': 0
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    question_bank = random.choice(ready_banks)
+    placement_test = get_or_create_placement_test(question_bank)
+
+    try:
+        with transaction.atomic():
+            attempt = StudentPlacementTestAttempt.objects.create(
+                student=request.user,
+                placement_test=placement_test,
+                question_bank=question_bank,
+                status='IN_PROGRESS',
+                mode='ADAPTIVE',
+                started_at=timezone.now()
+            )
+            first_item = adaptive_exam_service.start(attempt)
+            transaction.on_commit(lambda: start_timer('placement', attempt))
+    except ValueError as e:
+        # المحاولة اترجعت rollback - البنك ما فيهوش أسئلة MCQ
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    return Response({
+        'message': 'تم إنشاء الامتحان التكيفي بنجاح',
+        'attempt': {
+            'id': attempt.id,
+            'mode': attempt.mode,
+            'question_bank': {
+                'id': question_bank.id,
+                'title': question_bank.title
+            },
+            'duration_minutes': placement_test.duration_minutes,
+            'max_questions': adaptive_exam_service.max_items + adaptive_exam_service.writing_count,
+            'started_at': attempt.started_at,
+            'ends_at': attempt.started_at + timezone.timedelta(minutes=placement_test.duration_minutes)
+        },
+        'next_question': _adaptive_question_payload(first_item['question_type'], first_item['question_id'])
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def submit_adaptive_answer(request, attempt_id):
+    """
+    إجابة السؤال الحالي في الاختبار التكيفي
+
+    POST /api/place/student/adaptive/{attempt_id}/answer/
+
+    Body:
+    {
+        "question_type": "grammar",
+        "question_id": 12,
+        "selected_choice": "B"
+    }
+    """
+    question_type = request.data.get('question_type')
+    question_id = request.data.get('question_id')
+    selected_choice = request.data.get('selected_choice')
+
+    if question_type not in adaptive_exam_service.MCQ_MODELS or not question_id or selected_choice not in ['A', 'B', 'C', 'D']:
+        return Response({
+            'error': 'question_type و question_id و selected_choice مطلوبين'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if not StudentPlacementTestAttempt.objects.filter(
+        id=attempt_id, student=request.user, status='IN_PROGRESS', mode='ADAPTIVE'
+    ).exists():
+        return Response({
+            'error': 'الامتحان غير موجود أو تم إنهاؤه بالفعل'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    try:
+        result = adaptive_exam_service.submit_answer(
+            attempt_id=attempt_id,
+            question_type=question_type,
+            question_id=question_id,
+            selected_choice=selected_choice
+        )
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    next_question = None
+    if result['next_question']:
+        next_question = _adaptive_question_payload(
+            result['next_question']['question_type'],
+            result['next_question']['question_id']
+        )
+
+    writing_questions = []
+    if result['finished']:
+        writing_questions = WritingQuestionSerializer(
+            WritingQuestion.objects.filter(id__in=result['writing_question_ids']),
+            many=True
+        ).data
+
+    return Response({
+        'is_correct': result['is_correct'],
+        'answered': result['answered'],
+        'mcq_finished': result['finished'],
+        'next_question': next_question,
+        'writing_questions': writing_questions
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def finish_adaptive_exam(request, attempt_id):
+    """
+    تسليم أسئلة الكتابة وإنهاء الاختبار التكيفي
+
+    POST /api/place/student/adaptive/{attempt_id}/finish/
+
+    Body:
+    {
+        "writing": [
+            {"question_id": 7, "text_answer": "..."}
+        ]
+    }
+    """
+    if not StudentPlacementTestAttempt.objects.filter(
+        id=attempt_id, student=request.user, status='IN_PROGRESS', mode='ADAPTIVE'
+    ).exists():
+        return Response({
+            'error': 'الامتحان غير موجود أو تم إنهاؤه بالفعل'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    writing_answers = [
+        answer for answer in request.data.get('writing', [])
+        if 'question_id' in answer and 'text_answer' in answer
+    ]
+
+    try:
+        result = adaptive_exam_service.finish(attempt_id, writing_answers)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    # ✅ تحديث placement_test_taken للطالب
+    try:
+        from sabr_auth.models import Student
+
+        student = Student.objects.get(user=request.user)
+        if not student.placement_test_taken:
+            student.placement_test_taken = True
+            student.placement_test_date = timezone.now().date()
+            student.save(update_fields=['placement_test_taken', 'placement_test_date'])
+
+    except Student.DoesNotExist:
+        logger.warning(f"Student profile not found for user {request.user.id}")
+
+    return Response({
+        'message': 'تم تقديم الامتحان بنجاح',
+        'result': result
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================
+# 8. STUDENT EXAM AUTOSAVE
+# ============================================
+
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def autosave_exam(request, attempt_id):
+    """
+    حفظ الإجابات تلقائياً أثناء الامتحان (التغييرات فقط)
+
+    GET  /api/place/student/autosave/{attempt_id}/   ← الإجابات المحفوظة (للاستكمال)
+    POST /api/place/student/autosave/{attempt_id}/
+
+    Body (الأسئلة اللي اتغيرت بس - null بيمسح الإجابة):
+    {
+        "answers": {
+            "vocabulary": [{"question_id": 1, "selected_choice": "A"}],
+            "writing": [{"question_id": 7, "text_answer": "draft..."}]
+        }
+    }
+    """
+    try:
+        attempt = StudentPlacementTestAttempt.objects.select_related('placement_test').get(
+            id=attempt_id,
+            student=request.user,
+            status='IN_PROGRESS'
+        )
+    except StudentPlacementTestAttempt.DoesNotExist:
+        return Response({
+            'error': 'الامتحان غير موجود أو تم إنهاؤه بالفعل'
+        }, status=status.HTTP_404_NOT_FOUND)
+
+    if attempt.mode == 'ADAPTIVE':
+        return Response({
+            'error': 'الامتحان التكيفي بيحفظ كل إجابة لوحدها'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if attempt.is_time_up():
+        attempt.status = 'ABANDONED'
+        attempt.save()
+        return Response({
+            'error': 'انتهى وقت الامتحان'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    if request.method == 'GET':
+        answers = get_saved_placement_answers(attempt)
+        return Response({
+            'attempt_id': attempt.id,
+            'answers': answers,
+            'answered_count': count_answers(answers)
+        }, status=status.HTTP_200_OK)
+
+    serializer = AutosaveAnswersSerializer(data=request.data)
+    if not serializer.is_valid():
+        return Response({
+            'error': 'بيانات غير صحيحة',
+            'details': serializer.errors
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    saved_count = save_placement_answer_deltas(attempt, serializer.validated_data['answers'])
+
+    return Response({
+        'message': 'تم حفظ الإجابات',
+        'saved_count': saved_count,
+        'saved_at': timezone.now()
+    }, status=status.HTTP_200_OK)
+
+
+# ============================================
+# 9. STUDENT EXAM TIMER
+# ============================================
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def get_exam_timer(request, attempt_id):
+    """
+    الوقت المتبقي للامتحان (للـ polling من الـ frontend - Redis أولاً من غير ما نلمس الـ DB)
+
+    GET /api/place/student/exam-timer/{attempt_id}/
+
+    Response:
+    {
+        "attempt_id": 12,
+        "expires_at": "...",
+        "remaining_seconds": 1534,
+        "is_expired": false,
+        "is_active": true
+    }
+    """
+    timer = get_remaining_time('placement', attempt_id, request.user.id)
+    if timer is None:
+        return Response({
+            'error': 'الامتحان غير موجود'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response(timer, status=status.HTTP_200_OK)
@@ -0,0 +1,571 @@
+# sabr_questions/ai_generation.py
+
+import hashlib
+import json
+import logging
+import queue
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# توليد الأسئلة بالـ AI على أجزاء (step / ielts / esp / general)
+#
+# ✅ المحتوى بيتقسم لأجزاء بعدد tokens محدد (tiktoken)
+# ✅ عدد الأسئلة (سهل/متوسط/صعب) بيتوزع على الأجزاء
+# ✅ كل جزء طلب stream مستقل بالتوازي (بحد أقصى) - كل سؤال بيتحفظ أول ما يكمل في الـ stream
+# ✅ جزء يفشل ما يوقعش الـ job كله - بيفشل بس لو كل الأجزاء فشلت
+# ✅ checkpoint لكل جزء على الـ job (chunk_checkpoints) - الـ retry بيعيد الأجزاء الفاشلة بس
+# ============================================
+
+DIFFICULTIES = ('EASY', 'MEDIUM', 'HARD')
+
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, 'AI_GENERATION_CONFIG', {
+        'model': 'gpt-4o-mini',
+        'max_output_tokens': 8000,
+        'chunk_tokens': 12000,
+        'questions_per_request': 15,
+        'max_requests': 8,
+        'max_concurrency': 4,
+        'request_timeout': 180,
+    })
+
+
+# ============================================
+# Tokens
+# ============================================
+
+_encoding = None
+
+
+def _get_encoding(model: str):
+    """
+    tiktoken encoding (lazy) - None لو مش متاح (بنرجع لتقدير تقريبي)
+    """
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            try:
+                _encoding = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encoding = tiktoken.get_encoding('o200k_base')
+        except Exception as e:
+            logger.warning(f"tiktoken unavailable, using approximate token counts: {str(e)}")
+            _encoding = False
+    return _encoding or None
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    encoding = _get_encoding(model or _config()['model'])
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+
+def _split_long_text(text: str, max_tokens: int, model: str) -> List[str]:
+    """
+    فقرة أطول من الحد → أجزاء بعدد tokens ثابت
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        size = max_tokens * 4
+        return [text[start:start + size] for start in range(0, len(text), size)]
+
+    tokens = encoding.encode(text)
+    return [
+        encoding.decode(tokens[start:start + max_tokens])
+        for start in range(0, len(tokens), max_tokens)
+    ]
+
+
+def split_content(content: str, max_tokens: int, model: Optional[str] = None) -> List[str]:
+    """
+    تقسيم المحتوى لأجزاء كل جزء <= max_tokens (على حدود الفقرات قدر الإمكان)
+    """
+    model = model or _config()['model']
+    chunks = []
+    current = []
+    current_tokens = 0
+
+    for paragraph in content.split('\n\n'):
+        if not paragraph.strip():
+            continue
+        paragraph_tokens = count_tokens(paragraph, model)
+
+        if paragraph_tokens > max_tokens:
+            if current:
+                chunks.append('\n\n'.join(current))
+                current, current_tokens = [], 0
+            chunks.extend(_split_long_text(paragraph, max_tokens, model))
+            continue
+
+        if current and current_tokens + paragraph_tokens > max_tokens:
+            chunks.append('\n\n'.join(current))
+            current, current_tokens = [], 0
+
+        current.append(paragraph)
+        current_tokens += paragraph_tokens
+
+    if current:
+        chunks.append('\n\n'.join(current))
+    return chunks
+
+
+# ============================================
+# Planning
+# ============================================
+
+def distribute_counts(no_easy: int, no_medium: int, no_hard: int, parts: int) -> List[Dict[str, int]]:
+    """
+    توزيع عدد الأسئلة على الطلبات (round-robin عشان الإجمالي يبقى متساوي تقريباً)
+
+    Returns:
+        [{'EASY': 2, 'MEDIUM': 3, 'HARD': 1}, ...] - بطول parts
+    """
+    plan = [dict.fromkeys(DIFFICULTIES, 0) for _ in range(parts)]
+    cursor = 0
+    for difficulty, count in zip(DIFFICULTIES, (no_easy, no_medium, no_hard)):
+        for _ in range(count):
+            plan[cursor % parts][difficulty] += 1
+            cursor += 1
+    return plan
+
+
+def plan_requests(content: str, no_easy: int, no_medium: int, no_hard: int) -> List[Dict[str, Any]]:
+    """
+    تقسيم الـ job لطلبات: كل طلب = جزء من المحتوى + نصيبه من الأسئلة
+
+    - عدد الطلبات = max(أجزاء المحتوى, الأسئلة / questions_per_request)
+      بحد أقصى max_requests (عشان الوقت ما يكبرش مع حجم المحتوى)
+    - لو الأجزاء أكتر من الطلبات بناخد أجزاء موزعة على المحتوى كله
+    """
+    config = _config()
+    total = no_easy + no_medium + no_hard
+    if total <= 0:
+        return []
+
+    chunks = split_content(content, config['chunk_tokens'], config['model']) or [content]
+    by_questions = -(-total // config['questions_per_request'])
+    parts = min(max(len(chunks), by_questions), config['max_requests'], total)
+
+    requests = []
+    for index, counts in enumerate(distribute_counts(no_easy, no_medium, no_hard, parts)):
+        if parts <= len(chunks):
+            chunk = chunks[index * len(chunks) // parts]
+        else:
+            chunk = chunks[index % len(chunks)]
+        requests.append({'index': index, 'content': chunk, 'counts': counts})
+    return requests
+
+
+# ============================================
+# Streaming parser
+# ============================================
+
+class StreamingItemParser:
+    """
+    بيطلّع عناصر الـ arrays اللي في أول مستوى من JSON بيوصل على أجزاء
+
+    {"questions": [{...}, {...}]}  →  ('questions', {...}) أول ما العنصر يقفل
+    (قطعة قراءة بتطلع كاملة بأسئلتها - والرد المقطوع بيخسر العنصر الأخير بس)
+    """
+
+    def __init__(self):
+        self.text = ''
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_key = None
+        self._current_key = None
+        self._item_start = None
+
+    def feed(self, delta: str) -> List[Tuple[str, Dict[str, Any]]]:
+        self.text += delta
+        items = []
+        text = self.text
+
+        while self._pos < len(text):
+            ch = text[self._pos]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = text[self._string_start:self._pos]
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = self._pos + 1
+            elif ch in '{[':
+                self._depth += 1
+                if ch == '[' and self._depth == 2:
+                    self._current_key = self._last_key
+                elif ch == '{' and self._depth == 3 and self._current_key:
+                    self._item_start = self._pos
+            elif ch in '}]':
+                if ch == '}' and self._depth == 3 and self._item_start is not None:
+                    raw_item = text[self._item_start:self._pos + 1]
+                    self._item_start = None
+                    try:
+                        items.append((self._current_key, json.loads(raw_item)))
+                    except ValueError:
+                        logger.warning(f"[AIGeneration] Skipping malformed item in '{self._current_key}'")
+                self._depth -= 1
+            self._pos += 1
+
+        return items
+
+
+# ============================================
+# Requests
+# ============================================
+
+def _chunk_prompt(build_prompt: Callable, schema: str, skill_type: str,
+                  request: Dict[str, Any], additional_notes: str, parts: int) -> str:
+    counts = request['counts']
+
+    notes = additional_notes
+    if parts > 1:
+        # الأجزاء بتشتغل على نفس المحتوى أحياناً - نمنع تكرار الأسئلة
+        part_note = (
+            f"هذا الجزء رقم {request['index'] + 1} من {parts} من نفس الطلب، "
+            f"ركّز على أفكار ومعلومات مختلفة عن باقي الأجزاء ولا تكرر الأسئلة."
+        )
+        notes = f"{additional_notes}\n{part_note}" if additional_notes else part_note
+
+    return build_prompt(
+        skill_type=skill_type,
+        content=request['content'],
+        no_easy=counts['EASY'],
+        no_medium=counts['MEDIUM'],
+        no_hard=counts['HARD'],
+        additional_notes=notes,
+        schema=schema,
+    )
+
+
+def _stream_chunk(prompt: str, index: int, events: queue.Queue) -> None:
+    """
+    طلب جزء واحد بـ stream=True (في thread) - كل سؤال بيكمل بيتبعت للـ main thread يتحفظ
+
+    events: ('items', index, [(key, item), ...]) ثم ('done' | 'error', index, {...})
+    """
+    from sabr_questions.openai_client import create_chat_completion
+
+    config = _config()
+    parser = StreamingItemParser()
+    finish_reason = None
+    try:
+        stream = create_chat_completion(
+            model=config['model'],
+            max_tokens=config['max_output_tokens'],
+            messages=[{"role": "user", "content": prompt}],
+            timeout=config['request_timeout'],
+            stream=True,
+        )
+        for event in stream:
+            if not event.choices:
+                continue
+            choice = event.choices[0]
+            if choice.delta and choice.delta.content:
+                items = parser.feed(choice.delta.content)
+                if items:
+                    events.put(('items', index, items))
+            if choice.finish_reason:
+                finish_reason = choice.finish_reason
+
+        events.put(('done', index, {'raw_output': parser.text, 'finish_reason': finish_reason}))
+    except Exception as e:
+        events.put(('error', index, {'raw_output': parser.text, 'error': str(e)}))
+
+
+# ============================================
+# Checkpoints (job.chunk_checkpoints)
+#
+# {
+#     "signature": "...",        ← hash للخطة (المحتوى + التوزيع) - لو اتغيرت بنبدأ من الأول
+#     "parts": 4,
+#     "chunks": {
+#         "0": {"status": "SAVED", "saved_items": 5, "questions_created": 5, "counts": {...},
+#               "difficulty_counts": {"EASY": 2, ...}, "raw_output": "...", "truncated": false},
+#         "1": {"status": "STREAMING", "saved_items": 2, ...},   ← لسه بيوصل (أو الـ worker وقع)
+#         "2": {"status": "FAILED", "error": "...", "difficulty_counts": {...}}
+#     }
+# }
+#
+# ✅ SAVED بس لو الرد خلص (stop) أو اتقطع عند حد الـ tokens (length - بنخسر الذيل بس)
+# ✅ network / timeout / الـ worker وقع → الجزء بيفضل قابل للـ retry
+#    والـ retry بيطلب الناقص بس (المطلوب - difficulty_counts)
+# ============================================
+
+def _plan_signature(skill_type: str, requests: List[Dict[str, Any]]) -> str:
+    plan = [
+        [request['counts'], hashlib.sha256(request['content'].encode('utf-8')).hexdigest()]
+        for request in requests
+    ]
+    return hashlib.sha256(json.dumps([skill_type, plan], sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _item_difficulties(item: Dict[str, Any]) -> Dict[str, int]:
+    """
+    عدد الأسئلة لكل صعوبة في عنصر واحد (سؤال - أو قطعة/أوديو/فيديو بأسئلتها)
+    """
+    nested = item.get('questions')
+    questions = nested if isinstance(nested, list) else [item]
+    counts = dict.fromkeys(DIFFICULTIES, 0)
+    for question in questions:
+        question = question if isinstance(question, dict) else {}
+        difficulty = str(question.get('difficulty') or item.get('difficulty') or '').upper()
+        if difficulty in counts:
+            counts[difficulty] += 1
+    return counts
+
+
+def _chunk_shortfall(entry: Dict[str, Any], requested: Dict[str, int]) -> Dict[str, int]:
+    """
+    الأسئلة اللي لسه ناقصة من نصيب الجزء (لكل صعوبة)
+    """
+    saved = entry.get('difficulty_counts', {})
+    return {difficulty: max(0, requested[difficulty] - saved.get(difficulty, 0)) for difficulty in DIFFICULTIES}
+
+
+def _store_checkpoints(job, checkpoints: Dict[str, Any]) -> None:
+    job.chunk_checkpoints = checkpoints
+    job.save(update_fields=['chunk_checkpoints', 'updated_at'])
+
+
+def _save_items(job, checkpoints: Dict[str, Any], index: int,
+                items: List[Tuple[str, Dict[str, Any]]], save_questions: Callable) -> None:
+    """
+    حفظ الأسئلة اللي كملت من جزء + الـ checkpoint بتاعه في نفس الـ transaction
+    (فالـ retry عمره ما يكرر أسئلة اتحفظت - و questions_created بيزيد أول بأول)
+    """
+    data: Dict[str, List[Dict[str, Any]]] = {}
+    for key, item in items:
+        data.setdefault(key, []).append(item)
+
+    entry = checkpoints['chunks'][str(index)]
+    try:
+        with transaction.atomic():
+            counts = save_questions(data)
+            created = sum(counts.values())
+            entry['saved_items'] = entry.get('saved_items', 0) + len(items)
+            entry['questions_created'] = entry.get('questions_created', 0) + created
+            previous = entry.get('counts', {})
+            entry['counts'] = {key: previous.get(key, 0) + value for key, value in counts.items()}
+            difficulty_counts = entry.get('difficulty_counts', dict.fromkeys(DIFFICULTIES, 0))
+            for _, item in items:
+                for difficulty, count in _item_difficulties(item).items():
+                    difficulty_counts[difficulty] = difficulty_counts.get(difficulty, 0) + count
+            entry['difficulty_counts'] = difficulty_counts
+            job.chunk_checkpoints = checkpoints
+            job.questions_created += created
+            job.save(update_fields=['chunk_checkpoints', 'questions_created', 'updated_at'])
+    except Exception as e:
+        if len(items) > 1:
+            # عنصر واحد بايظ ما يضيعش الباقي
+            for item in items:
+                _save_items(job, checkpoints, index, [item], save_questions)
+            return
+        logger.error(f"[AIGeneration] Job #{job.id} part {index + 1}: dropped invalid item: {str(e)}")
+
+
+def _finish_chunk(job, checkpoints: Dict[str, Any], index: int, payload: Dict[str, Any]) -> None:
+    entry = checkpoints['chunks'][str(index)]
+    entry['raw_output'] = payload.get('raw_output', '')
+    finish_reason = payload.get('finish_reason')
+    error = payload.get('error')
+    if not error and finish_reason not in ('stop', 'length'):
+        error = f"الرد وقف قبل ما يكمل ({finish_reason or 'من غير finish_reason'})"
+
+    if error:
+        # ✅ الجزء يفضل قابل للـ retry - اللي اتحفظ محسوب والـ retry بيطلب الناقص بس
+        logger.error(
+            f"[AIGeneration] Job #{job.id} part {index + 1} failed after "
+            f"{entry.get('saved_items', 0)} items: {error}"
+        )
+        entry.update(status='FAILED', error=error)
+    elif entry.get('saved_items'):
+        # ✅ length → الرد اتقطع عند حد الـ tokens: بنخسر الذيل بس (طلبه تاني هيتقطع برضه)
+        truncated = finish_reason == 'length'
+        entry.update(status='SAVED', truncated=truncated, error=None)
+        if truncated:
+            logger.warning(
+                f"[AIGeneration] Job #{job.id} part {index + 1} hit the token limit, "
+                f"kept {entry['saved_items']} items"
+            )
+    else:
+        logger.error(f"[AIGeneration] Job #{job.id} part {index + 1} failed: no items")
+        entry.update(status='FAILED', error='لا يوجد أسئلة صالحة في رد الـ AI')
+
+    _store_checkpoints(job, checkpoints)
+
+
+def partial_result_message(result: Dict[str, Any]) -> Optional[str]:
+    """
+    رسالة job.error_message لما الـ job يخلص ناقص (أجزاء فشلت أو أسئلة أقل من المطلوب) - None لو كامل
+    """
+    messages = []
+    if result['failed_parts']:
+        messages.append(
+            f"تم حفظ الأسئلة جزئياً ({result['parts'] - len(result['failed_parts'])}/{result['parts']} أجزاء)"
+        )
+    if result.get('missing_questions'):
+        messages.append(f"ناقص {result['missing_questions']} سؤال من المطلوب")
+    return ' - '.join(messages) or None
+
+
+def checkpoint_progress(job) -> Dict[str, int]:
+    """
+    تقدم الأجزاء (لـ generation_job_status)
+    """
+    checkpoints = job.chunk_checkpoints or {}
+    chunks = checkpoints.get('chunks', {}).values()
+    return {
+        'parts': checkpoints.get('parts', 0),
+        'parts_saved': sum(1 for entry in chunks if entry.get('status') == 'SAVED'),
+        'parts_streaming': sum(1 for entry in chunks if entry.get('status') == 'STREAMING'),
+        'parts_failed': sum(1 for entry in chunks if entry.get('status') == 'FAILED'),
+    }
+
+
+def generate_questions_for_job(job, build_prompt: Callable, schema: str, skill_type: str,
+                               content: str, save_questions: Callable) -> Dict[str, Any]:
+    """
+    توليد وحفظ أسئلة job على أجزاء بالتوازي (streaming) مع checkpoint لكل جزء
+
+    Args:
+        job: AIGenerationJob (أو نسخة الـ app) - فيه no_easy/no_medium/no_hard/additional_notes/chunk_checkpoints
+        build_prompt: _build_prompt بتاع الـ app (step/ielts/esp/general)
+        schema: _get_schema_for_skill_type(skill_type)
+        save_questions: بتاخد JSON (جزئي) وبترجع عدد الأسئلة لكل نوع (_save_questions)
+
+    Returns:
+        {'parts': 4, 'failed_parts': [2], 'questions_created': 15, 'missing_questions': 3}
+        (الأجزاء اللي اتحفظت في محاولة سابقة مش بتتطلب تاني)
+
+    Raises:
+        ValueError لو مفيش ولا جزء اتحفظ، أو المحتوى اتغير بعد ما اتحفظ أسئلة من الخطة القديمة
+    """
+    config = _config()
+    requests = plan_requests(content, job.no_easy, job.no_medium, job.no_hard)
+    if not requests:
+        return {'parts': 0, 'failed_parts': [], 'questions_created': job.questions_created, 'missing_questions': 0}
+
+    parts = len(requests)
+    signature = _plan_signature(skill_type, requests)
+    checkpoints = job.chunk_checkpoints or {}
+    if checkpoints.get('signature') != signature:
+        if job.questions_created:
+            # خطة جديدة فوق أسئلة الخطة القديمة = أسئلة مكررة
+            raise ValueError(
+                f"المحتوى اتغير بعد ما اتحفظ {job.questions_created} سؤال - "
+                f"اعمل job جديد بدل إعادة المحاولة"
+            )
+        if checkpoints.get('chunks'):
+            logger.info(f"[AIGeneration] Job #{job.id} content changed, restarting checkpoints")
+        checkpoints = {'signature': signature, 'parts': parts, 'chunks': {}}
+        _store_checkpoints(job, checkpoints)
+    chunks = checkpoints['chunks']
+
+    def status_of(request):
+        return chunks.get(str(request['index']), {}).get('status')
+
+    # ① الأجزاء اللي ما خلصتش (فشلت، أو STREAMING والـ worker وقع) → بنطلب الناقص منها بس
+    pending = []
+    for request in requests:
+        if status_of(request) == 'SAVED':
+            continue
+        entry = chunks.get(str(request['index']), {})
+        shortfall = _chunk_shortfall(entry, request['counts'])
+        if entry.get('saved_items') and not any(shortfall.values()):
+            entry.update(status='SAVED', error=None)
+            continue
+        pending.append({**request, 'counts': shortfall})
+
+    # ② الأجزاء الباقية → طلبات streaming بالتوازي
+    if pending:
+        logger.info(
+            f"[AIGeneration] Job #{job.id} {skill_type}: streaming {len(pending)}/{parts} parts "
+            f"(max concurrency {config['max_concurrency']})"
+        )
+
+        for request in pending:
+            # اللي اتحفظ من الجزء في محاولة سابقة بيفضل محسوب
+            chunks.setdefault(str(request['index']), {}).update(status='STREAMING', error=None)
+        _store_checkpoints(job, checkpoints)
+
+        additional_notes = job.additional_notes or ''
+        events: queue.Queue = queue.Queue()
+        workers = max(1, min(config['max_concurrency'], len(pending)))
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-generation')
+        try:
+            for request in pending:
+                prompt = _chunk_prompt(build_prompt, schema, skill_type, request, additional_notes, parts)
+                executor.submit(_stream_chunk, prompt, request['index'], events)
+
+            # الحفظ في الـ DB من الـ main thread بس - أول بأول
+            remaining = len(pending)
+            while remaining:
+                try:
+                    batch = [events.get(timeout=config['request_timeout'] + 30)]
+                except queue.Empty:
+                    logger.error(f"[AIGeneration] Job #{job.id}: no stream activity, giving up on {remaining} parts")
+                    for request in pending:
+                        if status_of(request) == 'STREAMING':
+                            _finish_chunk(job, checkpoints, request['index'], {'error': 'انتهت مهلة الرد'})
+                    break
+
+                while True:
+                    try:
+                        batch.append(events.get_nowait())
+                    except queue.Empty:
+                        break
+
+                buffered: Dict[int, List[Tuple[str, Dict[str, Any]]]] = {}
+                for kind, index, payload in batch:
+                    if kind == 'items':
+                        buffered.setdefault(index, []).extend(payload)
+                        continue
+                    if index in buffered:
+                        _save_items(job, checkpoints, index, buffered.pop(index), save_questions)
+                    _finish_chunk(job, checkpoints, index, payload)
+                    remaining -= 1
+                for index, items in buffered.items():
+                    _save_items(job, checkpoints, index, items, save_questions)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    failed_parts = [request['index'] for request in requests if status_of(request) != 'SAVED']
+    if len(failed_parts) == parts:
+        errors = [chunks.get(str(index), {}).get('error') for index in failed_parts]
+        raise ValueError(f"فشل توليد الأسئلة: {next((e for e in reversed(errors) if e), 'لا يوجد رد')}")
+
+    if failed_parts:
+        logger.warning(f"[AIGeneration] Job #{job.id}: {len(failed_parts)}/{parts} parts failed")
+
+    missing_questions = sum(
+        sum(_chunk_shortfall(chunks.get(str(request['index']), {}), request['counts']).values())
+        for request in requests
+    )
+    if missing_questions:
+        logger.warning(f"[AIGeneration] Job #{job.id}: {missing_questions} questions short of the request")
+
+    return {
+        'parts': parts,
+        'failed_parts': failed_parts,
+        'questions_created': job.questions_created,
+        'missing_questions': missing_questions,
+    }
@@ -0,0 +1,229 @@
+# sabr_questions/bulk_save.py
+
+from typing import Any, Dict, List
+
+from django.db import transaction
+
+from sabr_questions.models import (
+    VocabularyQuestion, VocabularyQuestionSet,
+    GrammarQuestion, GrammarQuestionSet,
+    ReadingPassage, ReadingQuestion,
+    ListeningAudio, ListeningQuestion,
+    SpeakingVideo, SpeakingQuestion,
+    WritingQuestion,
+)
+
+
+# ============================================
+# حفظ أسئلة الـ AI (step / ielts / esp / general) بـ bulk_create
+#
+# ✅ الـ parents (passages/audios/videos) في statement واحد لكل نوع
+# ✅ الأسئلة تحتهم في statement واحد لكل نوع - كله في transaction واحدة
+# ============================================
+
+# نوع الـ skill → {القسم: key في JSON الـ AI}
+SECTION_KEYS = {
+    'VOCABULARY': {'vocabulary': 'questions'},
+    'GRAMMAR': {'grammar': 'questions'},
+    'READING': {'reading': 'passages'},
+    'LISTENING': {'listening': 'audios'},
+    'SPEAKING': {'speaking': 'videos'},
+    'WRITING': {'writing': 'questions'},
+    'GENERAL_PATH': {
+        'vocabulary': 'vocabulary_questions',
+        'grammar': 'grammar_questions',
+        'reading': 'passages',
+        'listening': 'audios',
+        'speaking': 'videos',
+        'writing': 'writing_questions',
+    },
+}
+
+SECTIONS = ['vocabulary', 'grammar', 'reading', 'listening', 'speaking', 'writing']
+
+BATCH_SIZE = 500
+
+
+def text_to_letter(options, correct_text):
+    """يحول نص الإجابة الصحيحة لحرف A/B/C/D"""
+    for idx, option in enumerate(options):
+        if option == correct_text:
+            return chr(65 + idx)
+    return None
+
+
+def _mcq_fields(q: Dict[str, Any], english_explanation: bool):
+    """
+    حقول السؤال MCQ المشتركة - None لو الإجابة الصحيحة مش من ضمن الاختيارات
+    """
+    options = q.get('options', [])
+    correct_letter = text_to_letter(options, q.get('correct_answer', ''))
+    if not correct_letter:
+        return None
+
+    fields = dict(
+        question_text=q.get('question_text', ''),
+        choice_a=options[0] if len(options) > 0 else '',
+        choice_b=options[1] if len(options) > 1 else '',
+        choice_c=options[2] if len(options) > 2 else '',
+        choice_d=options[3] if len(options) > 3 else '',
+        correct_answer=correct_letter,
+        explanation=q.get('explanation', ''),
+        points=1,
+        is_active=True,
+        order=0,
+    )
+    if english_explanation:
+        fields['english_explanation'] = q.get('english_explanation', '')
+    return fields
+
+
+def _question_set(set_model, set_label: str, title: str, usage_type: str):
+    q_set, _ = set_model.objects.get_or_create(
+        title=f'{set_label} {title} Questions',
+        usage_type=usage_type,
+        defaults={'description': f'Auto-generated set for {set_label}'}
+    )
+    return q_set
+
+
+def _standalone_mcq(model, set_model, title, items, owner, set_label, english_explanation) -> int:
+    if not items:
+        return 0
+    q_set = _question_set(set_model, set_label, title, owner['usage_type'])
+
+    questions = []
+    for q in items:
+        fields = _mcq_fields(q, english_explanation)
+        if fields is None:
+            continue
+        questions.append(model(
+            question_set=q_set,
+            difficulty=q.get('difficulty', 'MEDIUM'),
+            **fields,
+            **owner,
+        ))
+
+    model.objects.bulk_create(questions, batch_size=BATCH_SIZE)
+    return len(questions)
+
+
+def _parents_with_questions(parent_model, question_model, parent_field, items, build_parent,
+                            owner, english_explanation, question_difficulty=False) -> int:
+    """
+    passages/audios/videos + أسئلتهم: bulk_create للـ parents وبعدين للأسئلة بالـ IDs الجديدة
+    """
+    if not items:
+        return 0
+
+    parents = [
+        parent_model(
+            **build_parent(item),
+            is_active=True,
+            order=0,
+            difficulty=item.get('difficulty', 'MEDIUM'),
+            **owner,
+        )
+        for item in items
+    ]
+    parent_model.objects.bulk_create(parents, batch_size=BATCH_SIZE)
+
+    questions = []
+    for parent, item in zip(parents, items):
+        for q in item.get('questions', []):
+            fields = _mcq_fields(q, english_explanation)
+            if fields is None:
+                continue
+            if question_difficulty:
+                fields['difficulty'] = q.get('difficulty', 'MEDIUM')
+            questions.append(question_model(**{parent_field: parent}, **fields))
+
+    question_model.objects.bulk_create(questions, batch_size=BATCH_SIZE)
+    return len(questions)
+
+
+def _writing(items, owner) -> int:
+    questions = [
+        WritingQuestion(
+            title=q.get('title', 'AI Generated Question'),
+            question_text=q.get('question_text', ''),
+            sample_answer=q.get('sample_answer', ''),
+            rubric=q.get('rubric', ''),
+            min_words=q.get('min_words', 150),
+            max_words=q.get('max_words', 400),
+            points=10,
+            is_active=True,
+            order=0,
+            difficulty=q.get('difficulty', 'MEDIUM'),
+            **owner,
+        )
+        for q in items
+    ]
+    WritingQuestion.objects.bulk_create(questions, batch_size=BATCH_SIZE)
+    return len(questions)
+
+
+def bulk_save_generated_questions(skill, skill_type: str, data: Dict[str, Any], usage_type: str,
+                                  skill_field: str, set_label: str,
+                                  english_explanation: bool = True) -> Dict[str, int]:
+    """
+    حفظ JSON الـ AI كله في transaction واحدة
+
+    Args:
+        skill: الـ skill اللي الأسئلة هتتربط بيها
+        usage_type: 'STEP' | 'IELTS' | 'ESP' | 'GENERAL'
+        skill_field: 'step_skill' | 'ielts_skill' | 'esp_skill' | 'general_skill'
+        set_label: بيتحط في اسم الـ VocabularyQuestionSet/GrammarQuestionSet
+        english_explanation: حفظ english_explanation للأسئلة MCQ
+
+    Returns:
+        {'vocabulary': 10, 'grammar': 0, 'reading': 5, ...} - عدد الأسئلة لكل نوع
+    """
+    owner = {'usage_type': usage_type, skill_field: skill}
+    counts = dict.fromkeys(SECTIONS, 0)
+    sections = SECTION_KEYS.get(skill_type, {})
+
+    def items(section) -> List[Dict[str, Any]]:
+        key = sections.get(section)
+        return (data.get(key) or []) if key else []
+
+    with transaction.atomic():
+        counts['vocabulary'] = _standalone_mcq(
+            VocabularyQuestion, VocabularyQuestionSet, 'Vocabulary',
+            items('vocabulary'), owner, set_label, english_explanation
+        )
+        counts['grammar'] = _standalone_mcq(
+            GrammarQuestion, GrammarQuestionSet, 'Grammar',
+            items('grammar'), owner, set_label, english_explanation
+        )
+        counts['reading'] = _parents_with_questions(
+            ReadingPassage, ReadingQuestion, 'passage', items('reading'),
+            lambda item: {
+                'title': item.get('title', 'AI Generated Passage'),
+                'passage_text': item.get('passage_text', ''),
+            },
+            owner, english_explanation, question_difficulty=True
+        )
+        counts['listening'] = _parents_with_questions(
+            ListeningAudio, ListeningQuestion, 'audio', items('listening'),
+            lambda item: {
+                'title': item.get('title', 'AI Generated Audio'),
+                'audio_file': '',
+                'transcript': item.get('transcript', ''),
+                'duration': 0,
+            },
+            owner, english_explanation
+        )
+        counts['speaking'] = _parents_with_questions(
+            SpeakingVideo, SpeakingQuestion, 'video', items('speaking'),
+            lambda item: {
+                'title': item.get('title', 'AI Generated Video'),
+                'video_file': '',
+                'description': item.get('transcript', ''),
+                'duration': 0,
+            },
+            owner, english_explanation
+        )
+        counts['writing'] = _writing(items('writing'), owner)
+
+    return counts
@@ -0,0 +1,145 @@
+# sabr_questions/extraction_store.py
+
+import hashlib
+import logging
+from typing import Optional
+
+from django.db import IntegrityError, transaction
+
+from sabr_questions.models import ExtractedContent, ExtractedContentPage
+from sabr_questions.pdf_extraction import PAGE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# مخزن الاستخراج بالـ content hash (step / ielts / esp / general)
+#
+# ✅ الـ view بيحسب SHA-256 للملف وهو بيقراه - لو نفس الملف اتستخرج قبل كده (من أي track)
+#    الكتاب/الميديا بيتربط بالنتيجة على طول (DONE) من غير رفع لـ Cloudinary ولا task
+# ✅ الـ task بيدوّر في المخزن تاني قبل الشغل (رفعتين لنفس الملف في نفس الوقت)
+#    وبيحفظ النتيجة فيه أول ما يخلص
+# ✅ الكتب بتتخزن بالـ extraction_mode (LAYOUT و TEXT نتايجهم مختلفة)
+# ✅ الصفحات row لكل صفحة (ExtractedContentPage) وبتتنسخ على batches - الذاكرة ما بتكبرش مع حجم الكتاب
+# ============================================
+
+KIND_BOOK = 'BOOK'
+KIND_MEDIA = 'MEDIA'
+
+PAGE_FIELDS = ('page_number', 'text', 'char_offset', 'char_count', 'token_count', 'term_counts')
+
+
+def hash_upload(uploaded_file) -> str:
+    """
+    SHA-256 للملف المرفوع (chunk chunk) - وبيرجع الملف لأوله عشان الرفع
+    """
+    digest = hashlib.sha256()
+    for chunk in uploaded_file.chunks():
+        digest.update(chunk)
+    uploaded_file.seek(0)
+    return digest.hexdigest()
+
+
+def _public_id(file_field) -> str:
+    return getattr(file_field, 'public_id', None) or str(file_field)
+
+
+def _find(content_hash: str, kind: str, variant: str = '') -> Optional[ExtractedContent]:
+    if not content_hash:
+        return None
+    return ExtractedContent.objects.filter(content_hash=content_hash, kind=kind, variant=variant).first()
+
+
+def _copy_pages(source_pages, page_model, **owner) -> None:
+    """
+    نسخ صفحات (queryset) لـ page_model على batches بـ iterator - من غير ما الكتاب كله يتحمل في الذاكرة
+    """
+    batch = []
+    for page in source_pages.order_by('page_number').values(*PAGE_FIELDS).iterator(chunk_size=PAGE_BATCH_SIZE):
+        batch.append(page_model(**owner, **page))
+        if len(batch) >= PAGE_BATCH_SIZE:
+            page_model.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        page_model.objects.bulk_create(batch)
+
+
+def _store(content_hash: str, kind: str, variant: str, pages=None, **values) -> None:
+    # المخزن تحسين بس - فشله ما يوقعش الاستخراج
+    try:
+        with transaction.atomic():
+            entry, _ = ExtractedContent.objects.update_or_create(
+                content_hash=content_hash, kind=kind, variant=variant, defaults=values,
+            )
+            if pages is not None:
+                entry.pages.all().delete()
+                _copy_pages(pages, ExtractedContentPage, content=entry)
+    except IntegrityError:
+        pass
+    except Exception as e:
+        logger.warning(f"[ExtractionStore] Could not store {kind} {content_hash[:12]}: {str(e)}")
+
+
+# ============================================
+# Books
+# ============================================
+
+def find_book(content_hash: str, extraction_mode: str) -> Optional[ExtractedContent]:
+    entry = _find(content_hash, KIND_BOOK, extraction_mode)
+    # entry من غير صفحات (الحفظ ما كملش) ما ينفعش يتربط
+    if entry and entry.page_count and not entry.pages.exists():
+        return None
+    return entry
+
+
+def link_book(entry: ExtractedContent, book, page_model) -> None:
+    """
+    نسخ صفحات entry للكتاب ({App}ExtractedBookPage) + status=DONE
+    """
+    with transaction.atomic():
+        page_model.objects.filter(book=book).delete()
+        _copy_pages(entry.pages.all(), page_model, book=book)
+        book.page_count = entry.page_count
+        book.status = 'DONE'
+        book.error_message = None
+        book.save(update_fields=['page_count', 'status', 'error_message'])
+
+
+def store_book(book) -> None:
+    if not book.content_hash:
+        return
+    _store(
+        book.content_hash, KIND_BOOK, book.extraction_mode,
+        file_public_id=_public_id(book.pdf_file),
+        page_count=book.page_count,
+        pages=book.pages.all(),
+    )
+
+
+# ============================================
+# Media
+# ============================================
+
+def find_media(content_hash: str) -> Optional[ExtractedContent]:
+    return _find(content_hash, KIND_MEDIA)
+
+
+def link_media(entry: ExtractedContent, media) -> None:
+    media.transcript = entry.transcript
+    media.transcript_segments = entry.transcript_segments
+    media.duration_seconds = entry.duration_seconds
+    media.status = 'DONE'
+    media.error_message = None
+    media.save(update_fields=['transcript', 'transcript_segments', 'duration_seconds', 'status', 'error_message'])
+
+
+def store_media(media) -> None:
+    if not media.content_hash:
+        return
+    _store(
+        media.content_hash, KIND_MEDIA, '',
+        file_public_id=_public_id(media.media_file),
+        transcript=media.transcript or '',
+        transcript_segments=media.transcript_segments,
+        duration_seconds=media.duration_seconds,
+    )
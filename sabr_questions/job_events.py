@@ -0,0 +1,192 @@
+# sabr_questions/job_events.py
+
+import json
+import logging
+import time
+from typing import Any, Dict, Iterable, Iterator
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.http import StreamingHttpResponse
+from rest_framework.renderers import BaseRenderer
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# تحديثات الـ AI jobs للـ dashboard (step / ielts / esp / general)
+#
+# ✅ أي save لكتاب/ميديا/job (من الـ Celery tasks) بيتنشر على Redis pub/sub - channel لكل track
+# ✅ GET /api/{track}/ai/events/ → server-sent events: snapshot للشغال دلوقتي + كل تغيير بعد كده
+#    connection واحد للـ dashboard كله بدل polling لكل job كل كام ثانية
+# ✅ الـ stream بيقفل بعد max_stream_seconds والـ client بيعمل reconnect (retry)
+#
+# الـ auth بالـ JWT header - المتصفح محتاج fetch stream (EventSource ما بيبعتش headers)
+# ============================================
+
+ACTIVE_STATUSES = ('PENDING', 'PROCESSING')
+
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, 'AI_EVENTS_CONFIG', {
+        'max_stream_seconds': 300,
+        'heartbeat_seconds': 15,
+        'retry_ms': 3000,
+    })
+
+
+def channel_name(track: str) -> str:
+    return f"ai-events:{track}"
+
+
+# ============================================
+# Payloads
+# ============================================
+
+def book_event(book) -> Dict[str, Any]:
+    return {
+        'type': 'book',
+        'id': book.id,
+        'name': book.name,
+        'status': book.status,
+        'page_count': book.page_count,
+        'error_message': book.error_message,
+    }
+
+
+def media_event(media) -> Dict[str, Any]:
+    return {
+        'type': 'media',
+        'id': media.id,
+        'name': media.name,
+        'status': media.status,
+        'duration_seconds': media.duration_seconds,
+        'error_message': media.error_message,
+    }
+
+
+def job_event(job) -> Dict[str, Any]:
+    from sabr_questions.ai_generation import checkpoint_progress
+
+    return {
+        'type': 'job',
+        'id': job.id,
+        'status': job.status,
+        'skill_type': job.skill_type,
+        'total_questions_requested': job.total_questions_requested,
+        'questions_created': job.questions_created,
+        'progress': checkpoint_progress(job),
+        'error_message': job.error_message,
+    }
+
+
+# ============================================
+# Publish (post_save)
+# ============================================
+
+def publish(track: str, event: Dict[str, Any]) -> None:
+    """
+    نشر التحديث بعد الـ commit (الـ dashboard ما يشوفش حاجة ممكن تترجع rollback)
+    """
+    from placement_test.services.redis_client import get_redis
+
+    redis_client = get_redis()
+    if redis_client is None:
+        return
+
+    message = json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+    def send():
+        try:
+            redis_client.publish(channel_name(track), message)
+        except Exception as e:
+            logger.warning(f"[AIEvents] Could not publish {event['type']} #{event['id']}: {str(e)}")
+
+    transaction.on_commit(send)
+
+
+def connect_job_events(track: str, book_model, media_model, job_model) -> None:
+    """
+    بتتنادي من signals.py بتاع كل app
+    """
+    builders = {book_model: book_event, media_model: media_event, job_model: job_event}
+
+    def on_save(sender, instance, **kwargs):
+        publish(track, builders[sender](instance))
+
+    for model in builders:
+        post_save.connect(on_save, sender=model, weak=False, dispatch_uid=f'ai_events_{track}_{model.__name__}')
+
+
+# ============================================
+# Server-sent events
+# ============================================
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    عشان الـ content negotiation يقبل Accept: text/event-stream (الأخطاء بترجع JSON)
+    """
+    media_type = 'text/event-stream'
+    format = 'sse'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+
+
+def _format(event: Dict[str, Any]) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, cls=DjangoJSONEncoder, ensure_ascii=False)}\n\n"
+
+
+def _stream(pubsub, snapshot: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    config = _config()
+    deadline = time.monotonic() + config['max_stream_seconds']
+    next_heartbeat = time.monotonic() + config['heartbeat_seconds']
+    try:
+        yield f"retry: {config['retry_ms']}\n\n"
+        for event in snapshot:
+            yield _format(event)
+
+        while time.monotonic() < deadline:
+            message = pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if message and message['type'] == 'message':
+                data = message['data']
+                data = data.decode('utf-8') if isinstance(data, bytes) else data
+                yield f"event: {json.loads(data)['type']}\ndata: {data}\n\n"
+            elif time.monotonic() >= next_heartbeat:
+                # comment - بيخلي الـ proxies ما تقفلش الـ connection
+                yield ": ping\n\n"
+                next_heartbeat = time.monotonic() + config['heartbeat_seconds']
+    finally:
+        pubsub.close()
+
+
+def event_stream_response(track: str, book_model, media_model, job_model):
+    """
+    StreamingHttpResponse للـ track - None لو Redis مش متظبط
+    """
+    from placement_test.services.redis_client import get_redis
+
+    redis_client = get_redis()
+    if redis_client is None:
+        return None
+
+    # subscribe قبل الـ snapshot عشان ما يفوتناش تحديث ما بينهم
+    pubsub = redis_client.pubsub()
+    pubsub.subscribe(channel_name(track))
+    try:
+        snapshot = (
+            [book_event(book) for book in book_model.objects.filter(status__in=ACTIVE_STATUSES)]
+            + [media_event(media) for media in media_model.objects.filter(status__in=ACTIVE_STATUSES)]
+            + [job_event(job) for job in job_model.objects.filter(status__in=ACTIVE_STATUSES)]
+        )
+    except Exception:
+        pubsub.close()
+        raise
+
+    response = StreamingHttpResponse(_stream(pubsub, snapshot), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,95 @@
+# sabr_questions/management/commands/benchmark_transcription.py
+
+import re
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from sabr_questions import transcription
+
+
+# ============================================
+# مقارنة محركات التفريغ على نفس الكليب (السرعة + WER)
+#
+# python manage.py benchmark_transcription --clip sample.mp3 --reference sample.txt
+# python manage.py benchmark_transcription --clip lecture.mp4 --backends faster_whisper --model base --runs 3
+# ============================================
+
+def _words(text: str):
+    return re.findall(r"[a-z0-9']+", (text or '').lower())
+
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    (substitutions + deletions + insertions) / عدد كلمات الـ reference
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    if not ref:
+        return 0.0 if not hyp else 1.0
+
+    previous = list(range(len(hyp) + 1))
+    for i, ref_word in enumerate(ref, 1):
+        current = [i] + [0] * len(hyp)
+        for j, hyp_word in enumerate(hyp, 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (ref_word != hyp_word),
+            )
+        previous = current
+    return previous[-1] / len(ref)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark transcription backends (throughput + WER) on a sample clip'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clip', required=True, help='ملف صوت/فيديو')
+        parser.add_argument('--reference', help='ملف نص التفريغ الصحيح (لحساب WER)')
+        parser.add_argument('--backends', nargs='+', default=list(transcription.BACKENDS))
+        parser.add_argument('--model', help='اسم الـ model (الافتراضي TRANSCRIPTION_CONFIG)')
+        parser.add_argument('--runs', type=int, default=1)
+        parser.add_argument('--parallel', action='store_true', help='الأجزاء بالتوازي زي الـ worker')
+
+    def handle(self, *args, **options):
+        unknown = set(options['backends']) - set(transcription.BACKENDS)
+        if unknown:
+            raise CommandError(f"Unknown backends: {', '.join(sorted(unknown))}")
+
+        reference = None
+        if options['reference']:
+            with open(options['reference'], encoding='utf-8') as f:
+                reference = f.read()
+
+        audio = transcription.load_pcm(options['clip'])
+        audio_seconds = len(audio) / transcription.SAMPLE_RATE
+        model_name = options['model'] or transcription.model_name_for_queue()
+        self.stdout.write(f"Clip: {audio_seconds:.1f}s audio, model '{model_name}'\n")
+
+        header = f"{'backend':<16}{'load (s)':>10}{'wall (s)':>10}{'x realtime':>12}{'WER':>8}"
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+
+        for backend in options['backends']:
+            try:
+                started = time.monotonic()
+                transcription.get_model(backend=backend, model=model_name)
+                load_seconds = time.monotonic() - started
+            except Exception as e:
+                self.stdout.write(f"{backend:<16}unavailable: {str(e)}")
+                continue
+
+            timings = []
+            result = None
+            for _ in range(max(1, options['runs'])):
+                started = time.monotonic()
+                result = transcription.transcribe_audio(
+                    audio, backend=backend, model=model_name, parallel=options['parallel']
+                )
+                timings.append(time.monotonic() - started)
+
+            wall = min(timings)
+            wer = f"{word_error_rate(reference, result['text']):.1%}" if reference is not None else '-'
+            self.stdout.write(
+                f"{backend:<16}{load_seconds:>10.1f}{wall:>10.1f}{audio_seconds / wall:>12.1f}{wer:>8}"
+            )
@@ -0,0 +1,35 @@
+# Generated by Django 5.2 on 2026-10-18 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabr_questions', '0004_grammarquestion_english_explanation_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedContent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='تاريخ الإنشاء')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاريخ التحديث')),
+                ('content_hash', models.CharField(max_length=64, verbose_name='SHA-256')),
+                ('kind', models.CharField(choices=[('BOOK', 'Book'), ('MEDIA', 'Media')], max_length=10)),
+                ('variant', models.CharField(blank=True, default='', max_length=20)),
+                ('file_public_id', models.CharField(max_length=255)),
+                ('page_count', models.PositiveIntegerField(default=0)),
+                ('pages', models.JSONField(blank=True, default=list)),
+                ('transcript', models.TextField(blank=True, default='')),
+                ('transcript_segments', models.JSONField(blank=True, default=list)),
+                ('duration_seconds', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'محتوى مستخرج',
+                'verbose_name_plural': 'المحتوى المستخرج',
+                'unique_together': {('content_hash', 'kind', 'variant')},
+            },
+        ),
+    ]
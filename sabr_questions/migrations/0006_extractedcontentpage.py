@@ -0,0 +1,63 @@
+# Generated by Django 5.2 on 2026-10-19 00:21
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+PAGE_FIELDS = ('page_number', 'text', 'char_offset', 'char_count', 'token_count', 'term_counts')
+
+
+def copy_json_pages(apps, schema_editor):
+    ExtractedContent = apps.get_model('sabr_questions', 'ExtractedContent')
+    ExtractedContentPage = apps.get_model('sabr_questions', 'ExtractedContentPage')
+
+    books = ExtractedContent.objects.filter(kind='BOOK').values_list('id', 'pages')
+    for content_id, pages in books.iterator(chunk_size=20):
+        ExtractedContentPage.objects.bulk_create(
+            [
+                ExtractedContentPage(content_id=content_id, **{field: page[field] for field in PAGE_FIELDS if field in page})
+                for page in pages or []
+            ],
+            batch_size=50,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('sabr_questions', '0005_extractedcontent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExtractedContentPage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('page_number', models.PositiveIntegerField(verbose_name='رقم الصفحة')),
+                ('text', models.TextField(blank=True, default='', verbose_name='النص')),
+                ('char_offset', models.PositiveBigIntegerField(default=0)),
+                ('char_count', models.PositiveIntegerField(default=0)),
+                ('token_count', models.PositiveIntegerField(default=0)),
+                ('term_counts', models.JSONField(blank=True, default=dict)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='page_rows', to='sabr_questions.extractedcontent')),
+            ],
+            options={
+                'verbose_name': 'صفحة محتوى مستخرج',
+                'verbose_name_plural': 'صفحات المحتوى المستخرج',
+                'ordering': ['page_number'],
+                'abstract': False,
+                'unique_together': {('content', 'page_number')},
+            },
+        ),
+        migrations.RunPython(copy_json_pages, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='extractedcontent',
+            name='pages',
+        ),
+        # الـ related_name بيتسمى 'pages' بعد ما الـ JSONField القديم يتشال
+        migrations.AlterField(
+            model_name='extractedcontentpage',
+            name='content',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pages', to='sabr_questions.extractedcontent'),
+        ),
+    ]
@@ -30,6 +30,25 @@ class OrderedModel(models.Model):
         ordering = ['order', 'id']
 
 
+class ExtractedBookPageBase(models.Model):
+    """
+    صفحة من كتاب مستخرج (step / ielts / esp / general)
+    كل app بيعمل نسخة فيها FK للكتاب بتاعه (related_name='pages')
+    """
+    page_number = models.PositiveIntegerField(verbose_name="رقم الصفحة")
+    text = models.TextField(blank=True, default='', verbose_name="النص")
+    # مكان الصفحة في نص الكتاب كله (get_book_text)
+    char_offset = models.PositiveBigIntegerField(default=0)
+    char_count = models.PositiveIntegerField(default=0)
+    token_count = models.PositiveIntegerField(default=0)
+    # {term: count} للـ BM25 (sabr_questions/relevance.py)
+    term_counts = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        abstract = True
+        ordering = ['page_number']
+
+
 # ============================================
 # Difficulty Mixin
 # ============================================
@@ -729,4 +748,53 @@ class WritingQuestion(TimeStampedModel, OrderedModel, UsageTypeMixin, Difficulty
         ]
     
     def __str__(self):
-        return self.title
\ No newline at end of file
+        return self.title
+
+# ============================================
+# Extracted Content (مشترك بين step / ielts / esp / general)
+# ============================================
+
+class ExtractedContent(TimeStampedModel):
+    """
+    نتيجة استخراج ملف بالـ SHA-256 بتاع الـ bytes بتاعته
+    أي رفع تاني لنفس الملف (من أي track) بيتربط بالنتيجة دي من غير task
+    """
+    KIND_CHOICES = [
+        ('BOOK', 'Book'),
+        ('MEDIA', 'Media'),
+    ]
+
+    content_hash = models.CharField(max_length=64, verbose_name="SHA-256")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    # extraction_mode للكتب - فاضي للميديا
+    variant = models.CharField(max_length=20, blank=True, default='')
+    # public_id على Cloudinary (raw) - الرفع التاني مش بيرفع الملف تاني
+    file_public_id = models.CharField(max_length=255)
+    # صفحات الكتب في ExtractedContentPage (related_name='pages')
+    page_count = models.PositiveIntegerField(default=0)
+    transcript = models.TextField(blank=True, default='')
+    transcript_segments = models.JSONField(default=list, blank=True)
+    duration_seconds = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "محتوى مستخرج"
+        verbose_name_plural = "المحتوى المستخرج"
+        unique_together = [('content_hash', 'kind', 'variant')]
+
+    def __str__(self):
+        return f"{self.kind} {self.content_hash[:12]}"
+
+
+class ExtractedContentPage(ExtractedBookPageBase):
+    """
+    صفحات الكتاب في المخزن - row لكل صفحة زي {App}ExtractedBookPage (مش JSON واحد للكتاب كله)
+    """
+    content = models.ForeignKey(ExtractedContent, on_delete=models.CASCADE, related_name='pages')
+
+    class Meta(ExtractedBookPageBase.Meta):
+        verbose_name = "صفحة محتوى مستخرج"
+        verbose_name_plural = "صفحات المحتوى المستخرج"
+        unique_together = [('content', 'page_number')]
+
+    def __str__(self):
+        return f"{self.content} - p{self.page_number}"
@@ -0,0 +1,224 @@
+# sabr_questions/openai_client.py
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# OpenAI client مشترك (توليد الأسئلة + تصحيح الكتابة)
+#
+# ✅ client واحد لكل process - HTTP connection pool بيتعاد استخدامه (keep-alive)
+# ✅ rate limit موزع على كل الـ processes (gunicorn + Celery) - token bucket في Redis
+#    للطلبات/دقيقة والـ tokens/دقيقة: الطلب الزيادة بيستنى دوره بدل ما ياخد 429
+# ✅ 429 / timeout / 5xx → retry بـ exponential backoff + jitter (و Retry-After لو موجود)
+# ============================================
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, 'OPENAI_CLIENT_CONFIG', {
+        'max_connections': 50,
+        'max_keepalive_connections': 20,
+        'max_retries': 5,
+        'backoff_base': 1.0,
+        'backoff_max': 30.0,
+        'requests_per_minute': 0,
+        'tokens_per_minute': 0,
+        'limiter_max_wait': 120,
+    })
+
+
+class RateLimitWaitExceeded(Exception):
+    """
+    الـ bucket ما فضّاش مكان للطلب في limiter_max_wait ثانية
+    """
+
+
+# ============================================
+# Client
+# ============================================
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """
+    OpenAI client للـ process ده (lazy) - بعد fork (prefork/gunicorn) بيتعمل واحد جديد
+    """
+    global _client, _client_pid
+    if _client is not None and _client_pid == os.getpid():
+        return _client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            import httpx
+            from openai import DefaultHttpxClient, OpenAI
+
+            config = _config()
+            _client = OpenAI(
+                api_key=getattr(settings, 'OPENAI_API_KEY', None) or os.environ.get('OPENAI_API_KEY'),
+                # الـ retries هنا (create_chat_completion) عشان كل محاولة تعدي على الـ limiter
+                max_retries=0,
+                http_client=DefaultHttpxClient(limits=httpx.Limits(
+                    max_connections=config['max_connections'],
+                    max_keepalive_connections=config['max_keepalive_connections'],
+                )),
+            )
+            _client_pid = os.getpid()
+    return _client
+
+
+# ============================================
+# Rate limiter (Redis token bucket)
+# ============================================
+
+# KEYS: bucket الطلبات، bucket الـ tokens
+# ARGV: [capacity, requested] لكل bucket (الـ refill = capacity كل 60 ثانية)
+# Returns: 0 لو اتحجز - غير كده عدد الـ ms لحد ما يبقى فيه مكان
+_TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call('TIME')
+local now = tonumber(now_parts[1]) + tonumber(now_parts[2]) / 1000000
+local wait = 0
+local levels = {}
+
+for i, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local requested = tonumber(ARGV[i * 2])
+    local rate = capacity / 60
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    levels[i] = tokens
+    if tokens < requested then
+        wait = math.max(wait, (requested - tokens) / rate)
+    end
+end
+
+for i, key in ipairs(KEYS) do
+    local tokens = levels[i]
+    if wait == 0 then
+        tokens = tokens - tonumber(ARGV[i * 2])
+    end
+    redis.call('HSET', key, 'tokens', tokens, 'ts', now)
+    redis.call('EXPIRE', key, 120)
+end
+
+return math.ceil(wait * 1000)
+"""
+
+_bucket_script = None
+
+
+def _reserve(redis_client, buckets: List[tuple]) -> int:
+    global _bucket_script
+    if _bucket_script is None:
+        _bucket_script = redis_client.register_script(_TOKEN_BUCKET_SCRIPT)
+    keys = [key for key, _, _ in buckets]
+    args = [value for _, capacity, requested in buckets for value in (capacity, min(requested, capacity))]
+    return int(_bucket_script(keys=keys, args=args, client=redis_client))
+
+
+def acquire(tokens: int) -> None:
+    """
+    حجز طلب واحد + tokens من الـ buckets المشتركة - بيستنى لحد ما يبقى فيه مكان
+
+    Raises:
+        RateLimitWaitExceeded لو الانتظار عدّى limiter_max_wait
+    """
+    config = _config()
+    buckets = []
+    if config['requests_per_minute']:
+        buckets.append(('openai:bucket:requests', config['requests_per_minute'], 1))
+    if config['tokens_per_minute']:
+        buckets.append(('openai:bucket:tokens', config['tokens_per_minute'], tokens))
+    if not buckets:
+        return
+
+    from placement_test.services.redis_client import get_redis
+
+    redis_client = get_redis()
+    if redis_client is None:
+        return
+
+    deadline = time.monotonic() + config['limiter_max_wait']
+    while True:
+        try:
+            wait_ms = _reserve(redis_client, buckets)
+        except Exception as e:
+            # Redis واقع → من غير limiter أحسن من إن كل الطلبات تفشل
+            logger.warning(f"[OpenAI] Rate limiter unavailable: {str(e)}")
+            return
+        if not wait_ms:
+            return
+
+        wait = wait_ms / 1000 + random.uniform(0, 0.25)
+        if time.monotonic() + wait > deadline:
+            raise RateLimitWaitExceeded(f"OpenAI rate limit: انتظار أكتر من {config['limiter_max_wait']} ثانية")
+        time.sleep(wait)
+
+
+def estimate_tokens(messages: List[Dict[str, Any]], max_tokens: int, model: Optional[str] = None) -> int:
+    from sabr_questions.ai_generation import count_tokens
+
+    prompt_tokens = sum(count_tokens(str(message.get('content') or ''), model) for message in messages)
+    return prompt_tokens + (max_tokens or 0)
+
+
+# ============================================
+# Requests
+# ============================================
+
+def _is_retryable(error: Exception) -> bool:
+    import openai
+
+    if isinstance(error, (openai.RateLimitError, openai.APITimeoutError,
+                          openai.APIConnectionError, openai.InternalServerError)):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code in (408, 409)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, 'response', None)
+    value = response.headers.get('retry-after') if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def create_chat_completion(**kwargs):
+    """
+    client.chat.completions.create من خلال الـ limiter + retry
+
+    kwargs: نفس parameters الـ SDK (model, messages, max_tokens, stream, timeout, ...)
+    مع stream=True الـ retry بيغطي فتح الـ stream بس
+    """
+    config = _config()
+    tokens = estimate_tokens(kwargs.get('messages', []), kwargs.get('max_tokens'), kwargs.get('model'))
+    client = get_client()
+
+    attempt = 0
+    while True:
+        acquire(tokens)
+        try:
+            return client.chat.completions.create(**kwargs)
+        except Exception as e:
+            if attempt >= config['max_retries'] or not _is_retryable(e):
+                raise
+            # full jitter - الـ processes اللي وقعت مع بعض ما ترجعش مع بعض
+            delay = random.uniform(0, min(config['backoff_max'], config['backoff_base'] * 2 ** attempt))
+            delay = max(delay, _retry_after(e) or 0)
+            attempt += 1
+            logger.warning(
+                f"[OpenAI] {type(e).__name__}, retry {attempt}/{config['max_retries']} in {delay:.1f}s"
+            )
+            time.sleep(delay)
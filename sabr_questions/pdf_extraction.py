@@ -0,0 +1,305 @@
+# sabr_questions/pdf_extraction.py
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# استخراج نص كتب الـ PDF (step / ielts / esp / general)
+#
+# ✅ تحميل واحد stream لملف مؤقت مع حد أقصى للحجم
+# ✅ الصفحات بتتقسم ranges على process pool - الوقت بيمشي مع عدد الـ cores مش عدد الصفحات
+# ✅ كل صفحة بتتحفظ row لوحدها ({App}ExtractedBookPage) - الكتب الكبيرة ما بتتحملش في الذاكرة
+# ✅ LAYOUT = pdfplumber (بيحافظ على ترتيب الأعمدة/الجداول)
+#    TEXT   = pdfminer مباشرة (أسرع - للكتب اللي مفيهاش layout مهم)
+# ============================================
+
+MODE_LAYOUT = 'LAYOUT'
+MODE_TEXT = 'TEXT'
+
+EXTRACTION_MODE_CHOICES = [
+    (MODE_LAYOUT, 'Layout (pdfplumber)'),
+    (MODE_TEXT, 'Text only (pdfminer)'),
+]
+
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+PAGE_BATCH_SIZE = 50
+# أقصى عدد صفحات في response واحد (extracted_book_pages)
+MAX_PAGES_PER_REQUEST = 50
+
+
+def _config() -> Dict:
+    return getattr(settings, 'PDF_EXTRACTION_CONFIG', {
+        'max_pages': 500,
+        'max_download_mb': 100,
+        'max_workers': 0,
+        'min_pages_per_worker': 5,
+        'pages_per_task': 10,
+        'download_timeout': 120,
+    })
+
+
+# ============================================
+# Download
+# ============================================
+
+def download_to_tempfile(url: str, suffix: str, max_download_mb: int, timeout: int) -> str:
+    """
+    تحميل ملف (stream) لملف مؤقت - بيقف أول ما الحجم يعدّي max_download_mb
+
+    Returns:
+        مسار الملف المؤقت (المسؤولية على الـ caller يمسحه)
+
+    Raises:
+        ValueError لو الملف أكبر من max_download_mb
+    """
+    max_bytes = max_download_mb * 1024 * 1024
+
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        content_length = response.headers.get('Content-Length')
+        if content_length and int(content_length) > max_bytes:
+            raise ValueError(f"حجم الملف أكبر من الحد المسموح ({max_download_mb} ميجا)")
+
+        with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as tmp:
+            tmp_path = tmp.name
+            try:
+                downloaded = 0
+                while True:
+                    block = response.read(DOWNLOAD_CHUNK_SIZE)
+                    if not block:
+                        break
+                    downloaded += len(block)
+                    if downloaded > max_bytes:
+                        raise ValueError(f"حجم الملف أكبر من الحد المسموح ({max_download_mb} ميجا)")
+                    tmp.write(block)
+            except Exception:
+                tmp.close()
+                os.unlink(tmp_path)
+                raise
+
+    return tmp_path
+
+
+def download_pdf(url: str) -> str:
+    """
+    تحميل الملف مرة واحدة (stream) لملف مؤقت
+
+    Returns:
+        مسار الملف المؤقت (المسؤولية على الـ caller يمسحه)
+
+    Raises:
+        ValueError لو الملف أكبر من max_download_mb
+    """
+    config = _config()
+    return download_to_tempfile(url, '.pdf', config['max_download_mb'], config['download_timeout'])
+
+
+# ============================================
+# Extraction (بتشتغل جوه الـ worker processes)
+# ============================================
+
+def _extract_range_layout(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    import pdfplumber
+
+    pages = []
+    with pdfplumber.open(path, pages=list(range(start + 1, end + 1))) as pdf:
+        for page in pdf.pages:
+            text = page.extract_text() or ''
+            pages.append((page.page_number, text.strip()))
+            page.close()
+    return pages
+
+
+def _extract_range_text(path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    from io import StringIO
+
+    from pdfminer.converter import TextConverter
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+    from pdfminer.pdfpage import PDFPage
+
+    pages = []
+    resources = PDFResourceManager(caching=True)
+    with open(path, 'rb') as fp:
+        for offset, page in enumerate(PDFPage.get_pages(fp, pagenos=set(range(start, end)))):
+            output = StringIO()
+            device = TextConverter(resources, output, laparams=LAParams())
+            PDFPageInterpreter(resources, device).process_page(page)
+            device.close()
+            pages.append((start + offset + 1, output.getvalue().strip()))
+    return pages
+
+
+_EXTRACTORS = {
+    MODE_LAYOUT: _extract_range_layout,
+    MODE_TEXT: _extract_range_text,
+}
+
+
+# ============================================
+# Public API
+# ============================================
+
+def get_page_count(path: str) -> int:
+    from pdfminer.pdfdocument import PDFDocument
+    from pdfminer.pdfpage import PDFPage
+    from pdfminer.pdfparser import PDFParser
+
+    with open(path, 'rb') as fp:
+        document = PDFDocument(PDFParser(fp))
+        return sum(1 for _ in PDFPage.create_pages(document))
+
+
+def page_ranges(total_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    تقسيم الصفحات (0-based, end exclusive) على الـ workers
+
+    page_ranges(10, 3) → [(0, 4), (4, 7), (7, 10)]
+    """
+    workers = max(1, min(workers, total_pages))
+    size, extra = divmod(total_pages, workers)
+    ranges, start = [], 0
+    for i in range(workers):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+def _worker_count(total_pages: int) -> int:
+    config = _config()
+    by_pages = total_pages // max(1, config['min_pages_per_worker'])
+    workers = min(config['max_workers'] or os.cpu_count() or 1, os.cpu_count() or 1, by_pages)
+    # Celery prefork workers are daemonic and can't spawn children
+    if multiprocessing.current_process().daemon:
+        return 1
+    return max(1, workers)
+
+
+def iter_extracted_pages(path: str, total_pages: int, mode: str = MODE_LAYOUT) -> Iterator[Tuple[int, str]]:
+    """
+    استخراج النص صفحة بصفحة - كل range بيرجع أول ما يخلص (مش بالترتيب)
+
+    الـ ranges صغيرة (pages_per_task) عشان الذاكرة ما تكبرش مع حجم الكتاب
+
+    Yields:
+        (page_number 1-based, text)
+    """
+    extractor = _EXTRACTORS.get(mode, _extract_range_layout)
+    if total_pages <= 0:
+        return
+
+    pages_per_task = max(1, _config()['pages_per_task'])
+    ranges = page_ranges(total_pages, -(-total_pages // pages_per_task))
+    workers = _worker_count(total_pages)
+    if workers == 1:
+        for start, end in ranges:
+            yield from extractor(path, start, end)
+        return
+
+    logger.info(f"[PDFExtraction] {total_pages} pages ({mode}) across {workers} processes")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(extractor, path, start, end) for start, end in ranges]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+# ============================================
+# Per-page storage ({App}ExtractedBookPage)
+# ============================================
+
+PAGE_SEPARATOR = "\n\n"
+
+
+def _assign_offsets(page_model, book) -> None:
+    """
+    char_offset لكل صفحة = مكانها في get_book_text(book) (الصفحات الفاضية مش بتتحسب)
+    """
+    pages = list(page_model.objects.filter(book=book).only('id', 'char_count').order_by('page_number'))
+    offset = 0
+    for page in pages:
+        page.char_offset = offset
+        if page.char_count:
+            offset += page.char_count + len(PAGE_SEPARATOR)
+    page_model.objects.bulk_update(pages, ['char_offset'], batch_size=PAGE_BATCH_SIZE)
+
+
+def extract_book_pages(book, page_model) -> int:
+    """
+    تحميل + استخراج كتاب وحفظه صفحة صفحة أول ما كل range يخلص
+
+    Args:
+        book: {App}ExtractedBook (pdf_file + extraction_mode)
+        page_model: {App}ExtractedBookPage
+
+    Returns:
+        عدد صفحات الكتاب
+
+    Raises:
+        ValueError لو الملف أكبر من المسموح (حجم أو عدد صفحات)
+    """
+    from sabr_questions.ai_generation import count_tokens
+    from sabr_questions.relevance import term_counts
+
+    max_pages = _config()['max_pages']
+    tmp_path = download_pdf(book.pdf_file.url)
+    try:
+        total_pages = get_page_count(tmp_path)
+        if max_pages and total_pages > max_pages:
+            raise ValueError(
+                f"الملف يحتوي على {total_pages} صفحة. الحد الأقصى المسموح {max_pages} صفحة فقط."
+            )
+
+        # retry → نبدأ الكتاب من الأول
+        page_model.objects.filter(book=book).delete()
+
+        batch = []
+        for page_number, text in iter_extracted_pages(tmp_path, total_pages, book.extraction_mode):
+            batch.append(page_model(
+                book=book,
+                page_number=page_number,
+                text=text,
+                char_count=len(text),
+                token_count=count_tokens(text) if text else 0,
+                term_counts=term_counts(text),
+            ))
+            if len(batch) >= PAGE_BATCH_SIZE:
+                page_model.objects.bulk_create(batch)
+                batch = []
+        page_model.objects.bulk_create(batch)
+
+        _assign_offsets(page_model, book)
+        return total_pages
+    finally:
+        os.unlink(tmp_path)
+
+
+def get_book_text(book, page_start: Optional[int] = None, page_end: Optional[int] = None) -> str:
+    """
+    نص الكتاب (أو صفحات page_start..page_end بس - 1-based, شاملة)
+
+    الكتب القديمة (قبل التخزين بالصفحة) بترجع extracted_text كله
+    """
+    pages = book.pages.exclude(text='')
+    if page_start:
+        pages = pages.filter(page_number__gte=page_start)
+    if page_end:
+        pages = pages.filter(page_number__lte=page_end)
+
+    texts = list(pages.order_by('page_number').values_list('text', flat=True))
+    if not texts and not book.pages.exists():
+        return book.extracted_text or ''
+    return PAGE_SEPARATOR.join(texts)
+
+
+def book_has_text(book) -> bool:
+    return book.pages.exclude(text='').exists() or bool(book.extracted_text)
@@ -0,0 +1,246 @@
+# sabr_questions/relevance.py
+
+import logging
+import math
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List
+
+from django.conf import settings
+
+from sabr_questions.ai_generation import count_tokens, split_content
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# اختيار أجزاء المحتوى المناسبة للتوليد (BM25)
+#
+# ✅ كل صفحة كتاب term_counts بتاعها بيتحسب وقت الاستخراج ({App}ExtractedBookPage)
+# ✅ الترانسكريبت والكتب القديمة بتتقسم وقت التوليد (split_content)
+# ✅ لو المحتوى كله أقل من max_prompt_tokens بيتبعت زي ما هو
+#    غير كده: الأجزاء الأقرب لنوع المهارة + additional_notes لحد الـ budget (بترتيبها الأصلي)
+# ============================================
+
+_TOKEN_RE = re.compile(r"[a-z\u0600-\u06ff]{2,}")
+
+STOPWORDS = frozenset("""
+a an and are as at be been but by can did do does for from had has have he her his how i if in
+into is it its me my no not of on or our she so than that the their them then there these they
+this those to was we were what when which who will with would you your
+في من على إلى الى عن مع هذا هذه ذلك التي الذي هو هي أن ان كان لا ما او أو ثم قد كل
+""".split())
+
+# كلمات بتظهر في الأجزاء المناسبة لكل نوع مهارة
+SKILL_QUERY_TERMS = {
+    'VOCABULARY': 'vocabulary word words meaning definition synonym antonym phrase expression term '
+                  'collocation idiom مفردات معنى كلمة',
+    'GRAMMAR': 'grammar tense verb verbs noun adjective adverb clause sentence passive conditional '
+               'article preposition pronoun modal قواعد',
+    'READING': 'reading passage text article story paragraph read author قراءة نص',
+    'LISTENING': 'listening listen conversation dialogue audio speaker interview lecture استماع',
+    'SPEAKING': 'speaking speak talk discuss describe opinion conversation presentation تحدث',
+    'WRITING': 'writing write essay letter paragraph email report composition كتابة',
+    'GENERAL_PATH': '',
+}
+
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, 'CONTENT_RELEVANCE_CONFIG', {
+        'enabled': True,
+        'max_prompt_tokens': 24000,
+        'chunk_tokens': 800,
+        'k1': 1.5,
+        'b': 0.75,
+    })
+
+
+# ============================================
+# Terms
+# ============================================
+
+def tokenize(text: str) -> List[str]:
+    return [term for term in _TOKEN_RE.findall((text or '').lower()) if term not in STOPWORDS]
+
+
+def term_counts(text: str) -> Dict[str, int]:
+    """
+    بيتخزن مع كل صفحة وقت الاستخراج (الـ index)
+    """
+    return dict(Counter(tokenize(text)))
+
+
+# ============================================
+# Chunks
+# ============================================
+
+def _chunk(source: int, position: int, label, text: str, tokens: int = None, terms=None) -> Dict[str, Any]:
+    terms = terms if terms else term_counts(text)
+    return {
+        'source': source,
+        'position': position,
+        'label': label,
+        'text': text,
+        'tokens': tokens or count_tokens(text),
+        'terms': terms,
+        'length': sum(terms.values()),
+    }
+
+
+def _text_chunks(source: int, text: str) -> List[Dict[str, Any]]:
+    return [
+        _chunk(source, position, None, part)
+        for position, part in enumerate(split_content(text or '', _config()['chunk_tokens']))
+    ]
+
+
+def _book_chunks(source: int, book) -> List[Dict[str, Any]]:
+    pages = book.pages.exclude(text='').order_by('page_number').values_list(
+        'page_number', 'text', 'token_count', 'term_counts'
+    )
+    chunks = [
+        _chunk(source, position, page_number, text, tokens, terms)
+        for position, (page_number, text, tokens, terms) in enumerate(pages)
+    ]
+    if not chunks and not book.pages.exists():
+        # كتاب اتستخرج قبل التخزين بالصفحة
+        return _text_chunks(source, book.extracted_text)
+    return chunks
+
+
+# ============================================
+# Ranking
+# ============================================
+
+def bm25_scores(chunks: List[Dict[str, Any]], query: Dict[str, float]) -> List[float]:
+    """
+    BM25 لكل جزء - query: {term: weight}
+    """
+    config = _config()
+    k1, b = config['k1'], config['b']
+    total = len(chunks)
+    if not total or not query:
+        return [0.0] * total
+
+    avg_length = (sum(chunk['length'] for chunk in chunks) / total) or 1
+    document_frequency = {
+        term: sum(1 for chunk in chunks if term in chunk['terms'])
+        for term in query
+    }
+    idf = {
+        term: math.log(1 + (total - df + 0.5) / (df + 0.5))
+        for term, df in document_frequency.items() if df
+    }
+
+    scores = []
+    for chunk in chunks:
+        norm = k1 * (1 - b + b * chunk['length'] / avg_length)
+        score = 0.0
+        for term, term_idf in idf.items():
+            tf = chunk['terms'].get(term, 0)
+            if tf:
+                score += query[term] * term_idf * tf * (k1 + 1) / (tf + norm)
+        scores.append(score)
+    return scores
+
+
+def _build_query(skill_type: str, query_text: str) -> Dict[str, float]:
+    query = {term: 1.0 for term in tokenize(SKILL_QUERY_TERMS.get(skill_type, ''))}
+    # كلام المستخدم (العنوان/الوصف/الملاحظات) أهم من الكلمات العامة
+    for term in tokenize(query_text):
+        query[term] = 2.0
+    return query
+
+
+def _spread(indexes: List[int], chunks: List[Dict[str, Any]], budget: int) -> List[int]:
+    """
+    ترتيب موزع على المحتوى كله (مش أول الكتاب بس)
+    """
+    stride = max(1, math.ceil(sum(chunks[i]['tokens'] for i in indexes) / budget))
+    return [indexes[i] for offset in range(stride) for i in range(offset, len(indexes), stride)]
+
+
+def _select(chunks: List[Dict[str, Any]], scores: List[float], budget: int) -> List[Dict[str, Any]]:
+    # الأجزاء اللي فيها كلمات الـ query الأول - الباقي (لو فضل budget) عينة موزعة
+    matched = sorted((i for i in range(len(chunks)) if scores[i] > 0), key=lambda i: scores[i], reverse=True)
+    unmatched = [i for i in range(len(chunks)) if scores[i] <= 0]
+    ranked = matched + _spread(unmatched, chunks, budget)
+
+    selected, used = [], 0
+    for i in ranked:
+        if used + chunks[i]['tokens'] > budget:
+            continue
+        selected.append(chunks[i])
+        used += chunks[i]['tokens']
+    return selected
+
+
+def _pages_label(pages: List[int]) -> str:
+    """
+    [3, 5, 6, 7] → '3، 5-7'
+    """
+    ranges, start, previous = [], None, None
+    for page in pages + [None]:
+        if start is not None and page != previous + 1:
+            ranges.append(str(start) if start == previous else f"{start}-{previous}")
+            start = None
+        if start is None:
+            start = page
+        previous = page
+    return '، '.join(ranges)
+
+
+# ============================================
+# Public API
+# ============================================
+
+def build_generation_content(books: Iterable, media: Iterable, skill_type: str, query_text: str = '') -> str:
+    """
+    محتوى الكتب + الترانسكريبتات للـ prompt
+
+    Args:
+        books: {App}ExtractedBook (status=DONE)
+        media: {App}ExtractedMedia (status=DONE)
+        query_text: عنوان/وصف المهارة + additional_notes
+
+    Returns:
+        "=== كتاب: ... ===\\n..." - فاضي لو مفيش محتوى
+    """
+    config = _config()
+    sources = [('كتاب', book.name, _book_chunks(i, book)) for i, book in enumerate(books)]
+    offset = len(sources)
+    sources += [
+        ('ترانسكريبت', m.name, _text_chunks(offset + i, m.transcript))
+        for i, m in enumerate(media)
+    ]
+
+    chunks = [chunk for _, _, source_chunks in sources for chunk in source_chunks]
+    total_tokens = sum(chunk['tokens'] for chunk in chunks)
+    budget = config['max_prompt_tokens']
+
+    if config['enabled'] and total_tokens > budget:
+        selected = _select(chunks, bm25_scores(chunks, _build_query(skill_type, query_text)), budget)
+        selected_ids = {(chunk['source'], chunk['position']) for chunk in selected}
+        logger.info(
+            f"[Relevance] {skill_type}: {len(selected)}/{len(chunks)} chunks, "
+            f"{sum(chunk['tokens'] for chunk in selected)}/{total_tokens} tokens"
+        )
+    else:
+        selected_ids = None
+
+    content_parts = []
+    for kind, name, source_chunks in sources:
+        kept = [
+            chunk for chunk in source_chunks
+            if selected_ids is None or (chunk['source'], chunk['position']) in selected_ids
+        ]
+        if not kept:
+            continue
+
+        header = f"=== {kind}: {name} ==="
+        pages = [chunk['label'] for chunk in kept if chunk['label'] is not None]
+        if selected_ids is not None and pages:
+            header = f"=== {kind}: {name} (صفحات {_pages_label(pages)}) ==="
+        content_parts.append(header + "\n" + "\n\n".join(chunk['text'] for chunk in kept))
+
+    return "\n\n".join(content_parts)
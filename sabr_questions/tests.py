@@ -1,3 +1,156 @@
-from django.test import TestCase
+import json
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase
+
+from sabr_questions.ai_generation import StreamingItemParser, _save_items
+
+
+def feed_all(parser, deltas):
+    items = []
+    for delta in deltas:
+        items.extend(parser.feed(delta))
+    return items
+
+
+# ============================================
+# StreamingItemParser
+# ============================================
+
+class StreamingItemParserTests(SimpleTestCase):
+
+    def test_items_split_across_deltas(self):
+        text = json.dumps({'questions': [
+            {'question_text': 'one', 'difficulty': 'EASY'},
+            {'question_text': 'two', 'difficulty': 'HARD'},
+        ]})
+        # كل حرف في delta لوحده
+        items = feed_all(StreamingItemParser(), list(text))
+
+        self.assertEqual(items, [
+            ('questions', {'question_text': 'one', 'difficulty': 'EASY'}),
+            ('questions', {'question_text': 'two', 'difficulty': 'HARD'}),
+        ])
+
+    def test_item_is_emitted_as_soon_as_it_closes(self):
+        parser = StreamingItemParser()
+
+        self.assertEqual(parser.feed('{"questions": [{"question_text": "one"}'), [('questions', {'question_text': 'one'})])
+        self.assertEqual(parser.feed(', {"question_text": "tw'), [])
+        self.assertEqual(parser.feed('o"}]}'), [('questions', {'question_text': 'two'})])
+
+    def test_escaped_quotes_and_brackets_inside_strings(self):
+        item = {'question_text': 'He said \"stop\" {now} [twice] \\ done', 'options': ['a]', '{b', 'c"}']}
+        text = json.dumps({'questions': [item]})
+
+        items = feed_all(StreamingItemParser(), [text[i:i + 7] for i in range(0, len(text), 7)])
+
+        self.assertEqual(items, [('questions', item)])
+
+    def test_code_fence_around_json(self):
+        text = '```json\n' + json.dumps({'questions': [{'question_text': 'one'}]}) + '\n```'
+
+        items = feed_all(StreamingItemParser(), [text[:12], text[12:]])
+
+        self.assertEqual(items, [('questions', {'question_text': 'one'})])
+
+    def test_nested_item_comes_out_whole(self):
+        passage = {
+            'title': 'Passage',
+            'difficulty': 'MEDIUM',
+            'questions': [{'question_text': 'q1'}, {'question_text': 'q2'}],
+        }
+        text = json.dumps({'passages': [passage]})
+
+        self.assertEqual(feed_all(StreamingItemParser(), [text[:40], text[40:]]), [('passages', passage)])
+
+    def test_multiple_top_level_arrays(self):
+        text = json.dumps({
+            'vocabulary_questions': [{'question_text': 'v'}],
+            'grammar_questions': [{'question_text': 'g'}],
+        })
+
+        self.assertEqual(feed_all(StreamingItemParser(), [text]), [
+            ('vocabulary_questions', {'question_text': 'v'}),
+            ('grammar_questions', {'question_text': 'g'}),
+        ])
+
+    def test_truncated_tail_keeps_complete_items(self):
+        text = json.dumps({'questions': [{'question_text': 'one'}, {'question_text': 'two'}]})
+        # الرد اتقطع في نص العنصر التاني
+        truncated = text[:text.index('two') + 2]
+
+        parser = StreamingItemParser()
+        items = feed_all(parser, [truncated])
+
+        self.assertEqual(items, [('questions', {'question_text': 'one'})])
+        self.assertEqual(parser.text, truncated)
+
+    def test_malformed_item_is_skipped(self):
+        text = '{"questions": [{"question_text": "bad",}, {"question_text": "good"}]}'
+
+        with self.assertLogs('sabr_questions.ai_generation', level='WARNING'):
+            items = feed_all(StreamingItemParser(), [text])
+
+        self.assertEqual(items, [('questions', {'question_text': 'good'})])
+
+
+# ============================================
+# _save_items
+# ============================================
+
+class FakeJob:
+    id = 1
+
+    def __init__(self):
+        self.chunk_checkpoints = {}
+        self.questions_created = 0
+        self.saves = 0
+
+    def save(self, update_fields=None):
+        self.saves += 1
+
+
+class SaveItemsTests(TestCase):
+
+    def setUp(self):
+        self.job = FakeJob()
+        self.checkpoints = {'signature': 'x', 'parts': 1, 'chunks': {'0': {'status': 'STREAMING', 'saved_items': 0}}}
+        self.saved = []
+
+    def save_questions(self, data):
+        questions = data.get('questions', [])
+        if any(question.get('question_text') == 'bad' for question in questions):
+            raise ValueError('invalid question')
+        self.saved.extend(questions)
+        return {'vocabulary': len(questions)}
+
+    def test_batch_is_saved_and_counted(self):
+        items = [
+            ('questions', {'question_text': 'one', 'difficulty': 'EASY'}),
+            ('questions', {'question_text': 'two', 'difficulty': 'HARD'}),
+        ]
+
+        _save_items(self.job, self.checkpoints, 0, items, self.save_questions)
+
+        entry = self.checkpoints['chunks']['0']
+        self.assertEqual(len(self.saved), 2)
+        self.assertEqual(self.job.questions_created, 2)
+        self.assertEqual(entry['saved_items'], 2)
+        self.assertEqual(entry['counts'], {'vocabulary': 2})
+        self.assertEqual(entry['difficulty_counts'], {'EASY': 1, 'MEDIUM': 0, 'HARD': 1})
+
+    def test_bad_item_does_not_lose_the_rest_of_the_batch(self):
+        items = [
+            ('questions', {'question_text': 'one', 'difficulty': 'EASY'}),
+            ('questions', {'question_text': 'bad', 'difficulty': 'EASY'}),
+            ('questions', {'question_text': 'three', 'difficulty': 'MEDIUM'}),
+        ]
+
+        with self.assertLogs('sabr_questions.ai_generation', level='ERROR'):
+            _save_items(self.job, self.checkpoints, 0, items, self.save_questions)
+
+        entry = self.checkpoints['chunks']['0']
+        self.assertEqual([question['question_text'] for question in self.saved], ['one', 'three'])
+        self.assertEqual(self.job.questions_created, 2)
+        self.assertEqual(entry['saved_items'], 2)
+        self.assertEqual(entry['difficulty_counts'], {'EASY': 1, 'MEDIUM': 1, 'HARD': 0})
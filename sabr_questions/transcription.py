@@ -0,0 +1,411 @@
+# sabr_questions/transcription.py
+
+import logging
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+
+from sabr_questions.pdf_extraction import download_to_tempfile
+
+logger = logging.getLogger(__name__)
+
+
+# ============================================
+# تفريغ الميديا (step / ielts / esp / general)
+#
+# ✅ المحرك قابل للتغيير (TRANSCRIPTION_CONFIG['backend']):
+#    - whisper        → openai-whisper (PyTorch float32)
+#    - faster_whisper → CTranslate2 int8 على الـ CPU (أسرع بكتير على workers من غير GPU)
+# ✅ كل model بيتحمل مرة واحدة في الـ process وبيتعاد استخدامه في كل الـ tasks
+# ✅ model لكل queue (TRANSCRIPTION_CONFIG['queue_models']) - الافتراضي TRANSCRIPTION_CONFIG['model']
+# ✅ warm-up وقت تشغيل الـ worker (sabrlingua/celery.py):
+#    - prefork → في كل child process (worker_process_init)
+#    - solo/threads → في الـ worker نفسه (worker_init)
+# ✅ ffmpeg → PCM 16kHz mono مباشرة (pipe) → تقسيم على السكوت → أجزاء بالتوازي → تجميع بالـ timestamps
+# ============================================
+
+SAMPLE_RATE = 16000
+FRAME_SECONDS = 0.03
+
+_models: Dict[Tuple[str, str], Any] = {}
+_lock = threading.Lock()
+
+# queues الـ worker الحالي (بتتسجل في worker_init قبل الـ fork)
+_worker_queues: List[str] = []
+
+
+def _config() -> Dict[str, Any]:
+    return getattr(settings, 'TRANSCRIPTION_CONFIG', {
+        'backend': 'whisper',
+        'compute_type': 'int8',
+        'model': 'tiny',
+        'queues': ['cpu'],
+        'queue_models': {},
+        'warmup': True,
+        'language': 'en',
+        'segment_seconds': 60,
+        'max_segment_seconds': 120,
+        'min_silence_seconds': 0.5,
+        'silence_threshold_db': -40,
+        'max_workers': 0,
+        'max_download_mb': 500,
+        'download_timeout': 300,
+    })
+
+
+def model_name_for_queue(queue: Optional[str] = None) -> str:
+    config = _config()
+    return config['queue_models'].get(queue) or config['model']
+
+
+# ============================================
+# Backends
+# ============================================
+
+class TranscriptionBackend:
+    """
+    واجهة محرك التفريغ - load() مرة واحدة لكل process و transcribe() لكل جزء أوديو
+    """
+    name = ''
+
+    def load(self, model_name: str, threads: int = 0):
+        raise NotImplementedError
+
+    def transcribe(self, model, audio, language: Optional[str]) -> List[Dict[str, Any]]:
+        """
+        Returns:
+            [{'start': 0.0, 'end': 4.2, 'text': '...'}] - الوقت نسبةً لبداية الجزء
+        """
+        raise NotImplementedError
+
+
+class WhisperBackend(TranscriptionBackend):
+    name = 'whisper'
+
+    def load(self, model_name: str, threads: int = 0):
+        import whisper
+
+        if threads:
+            import torch
+            torch.set_num_threads(threads)
+        return whisper.load_model(model_name, device='cpu')
+
+    def transcribe(self, model, audio, language: Optional[str]) -> List[Dict[str, Any]]:
+        result = model.transcribe(
+            audio,
+            language=language or None,
+            fp16=False,
+            condition_on_previous_text=False,
+        )
+        return [
+            {'start': segment['start'], 'end': segment['end'], 'text': segment['text']}
+            for segment in result.get('segments', [])
+        ]
+
+
+class FasterWhisperBackend(TranscriptionBackend):
+    name = 'faster_whisper'
+
+    def load(self, model_name: str, threads: int = 0):
+        from faster_whisper import WhisperModel
+
+        return WhisperModel(
+            model_name,
+            device='cpu',
+            compute_type=_config()['compute_type'],
+            cpu_threads=threads,
+        )
+
+    def transcribe(self, model, audio, language: Optional[str]) -> List[Dict[str, Any]]:
+        # segments generator - التفريغ بيحصل وإحنا بنلف عليه
+        segments, _ = model.transcribe(
+            audio,
+            language=language or None,
+            beam_size=1,
+            condition_on_previous_text=False,
+        )
+        return [{'start': segment.start, 'end': segment.end, 'text': segment.text} for segment in segments]
+
+
+BACKENDS: Dict[str, TranscriptionBackend] = {
+    backend.name: backend for backend in (WhisperBackend(), FasterWhisperBackend())
+}
+
+
+def get_backend(name: Optional[str] = None) -> TranscriptionBackend:
+    name = name or _config()['backend']
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown transcription backend '{name}' (available: {', '.join(BACKENDS)})")
+    return BACKENDS[name]
+
+
+def _load_model(backend_name: str, model_name: str, threads: int = 0):
+    key = (backend_name, model_name)
+    model = _models.get(key)
+    if model is not None:
+        return model
+
+    with _lock:
+        model = _models.get(key)
+        if model is None:
+            started = time.monotonic()
+            model = get_backend(backend_name).load(model_name, threads)
+            _models[key] = model
+            logger.info(
+                f"[Transcription] Loaded {backend_name} '{model_name}' in {time.monotonic() - started:.1f}s"
+            )
+    return model
+
+
+def get_model(queue: Optional[str] = None, backend: Optional[str] = None, model: Optional[str] = None):
+    """
+    الـ model المناسب للـ queue اللي الـ task جاي منه (متحمل مرة واحدة في الـ process)
+    """
+    return _load_model(get_backend(backend).name, model or model_name_for_queue(queue))
+
+
+def set_worker_queues(queues: Iterable[str]) -> None:
+    global _worker_queues
+    _worker_queues = list(queues)
+
+
+def warm_up() -> None:
+    """
+    تحميل models الـ queues بتاعة الـ worker قبل أول task
+    """
+    config = _config()
+    if not config['warmup']:
+        return
+
+    # workers الـ llm/light ما بيفرغوش - مفيش داعي للـ model في الذاكرة
+    transcription_queues = set(config['queues']) | set(config['queue_models'])
+    queues = [queue for queue in _worker_queues if queue in transcription_queues]
+    if _worker_queues and not queues:
+        return
+
+    names = {model_name_for_queue(queue) for queue in queues} or {model_name_for_queue()}
+    backend = get_backend().name
+    for name in sorted(names):
+        try:
+            _load_model(backend, name)
+        except Exception as e:
+            # الـ task هيحاول يحمله تاني - ما نوقفش الـ worker
+            logger.warning(f"[Transcription] Warm-up of '{name}' failed: {str(e)}")
+
+
+# ============================================
+# Audio
+# ============================================
+
+def download_media(url: str, suffix: str) -> str:
+    """
+    تحميل الميديا (stream) لملف مؤقت - المسؤولية على الـ caller يمسحه
+
+    Raises:
+        ValueError لو الملف أكبر من max_download_mb
+    """
+    config = _config()
+    return download_to_tempfile(url, suffix, config['max_download_mb'], config['download_timeout'])
+
+
+def load_pcm(path: str):
+    """
+    أي ملف صوت/فيديو → numpy float32 (16kHz mono) عن طريق ffmpeg pipe (من غير shell ولا ملف وسيط)
+    """
+    import numpy as np
+
+    result = subprocess.run(
+        [
+            'ffmpeg', '-nostdin', '-loglevel', 'error', '-i', path,
+            '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-f', 's16le', '-acodec', 'pcm_s16le', '-',
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg فشل في استخراج الأوديو: {result.stderr.decode(errors='ignore')[-300:]}")
+
+    return np.frombuffer(result.stdout, np.int16).astype(np.float32) / 32768.0
+
+
+def split_on_silence(audio) -> List[Tuple[int, int]]:
+    """
+    تقسيم الأوديو لأجزاء (samples) عند السكوت - حوالي segment_seconds لكل جزء
+
+    - السكوت في الأول والآخر بيتشال
+    - أي سكوت أطول من 2 ثانية بيتقطع عنده (ومش بيتبعت للـ model)
+    - جزء من غير سكوت خالص بيتقطع كل max_segment_seconds
+    """
+    import numpy as np
+
+    config = _config()
+    frame = int(SAMPLE_RATE * FRAME_SECONDS)
+    frames = len(audio) // frame
+    if frames == 0:
+        return []
+
+    rms = np.sqrt(np.mean(audio[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+    voiced = rms > 10 ** (config['silence_threshold_db'] / 20)
+    if not voiced.any():
+        return []
+
+    # runs السكوت: [(start_frame, end_frame), ...]
+    edges = np.flatnonzero(np.diff(np.concatenate(([1], voiced.astype(np.int8), [1]))))
+    silences = list(zip(edges[::2], edges[1::2]))
+
+    min_silence = config['min_silence_seconds'] / FRAME_SECONDS
+    long_silence = 2.0 / FRAME_SECONDS
+    target = config['segment_seconds'] / FRAME_SECONDS
+    first_voiced = int(np.argmax(voiced))
+    last_voiced = frames - int(np.argmax(voiced[::-1]))
+
+    segments, start = [], first_voiced
+    for silence_start, silence_end in silences:
+        if silence_start <= start or silence_end - silence_start < min_silence or silence_start >= last_voiced:
+            continue
+        if silence_start - start >= target or silence_end - silence_start >= long_silence:
+            segments.append((start, silence_start))
+            start = silence_end
+    segments.append((start, last_voiced))
+
+    max_frames = int(config['max_segment_seconds'] / FRAME_SECONDS)
+    bounded = []
+    for seg_start, seg_end in segments:
+        for piece_start in range(seg_start, seg_end, max_frames):
+            bounded.append((piece_start * frame, min(seg_end, piece_start + max_frames) * frame))
+    return bounded
+
+
+# ============================================
+# Transcription
+# ============================================
+
+def _transcribe_segment(backend_name: str, model_name: str, audio, offset: float,
+                        language: Optional[str]) -> List[Dict[str, Any]]:
+    model = _load_model(backend_name, model_name)
+    return [
+        {
+            'start': round(offset + segment['start'], 2),
+            'end': round(offset + segment['end'], 2),
+            'text': segment['text'].strip(),
+        }
+        for segment in get_backend(backend_name).transcribe(model, audio, language)
+        if segment['text'].strip()
+    ]
+
+
+def _init_pool_process(backend_name: str, model_name: str, threads: int) -> None:
+    _load_model(backend_name, model_name, threads)
+
+
+# (backend, model) → pool - حجمه ثابت، فالـ processes (والـ model اللي فيها) بتفضل عايشة بين الملفات
+_pools: Dict[Tuple[str, str], ProcessPoolExecutor] = {}
+
+
+def _pool_size() -> int:
+    cpus = os.cpu_count() or 1
+    return max(1, min(_config()['max_workers'] or cpus, cpus))
+
+
+def _get_pool(backend_name: str, model_name: str) -> ProcessPoolExecutor:
+    """
+    pool واحد لكل (backend, model) بيفضل عايش بين الـ tasks (كل process محمل الـ model مرة واحدة)
+    ✅ بـ _lock - الـ cpu worker بيشغل أكتر من task في نفس الوقت (threads)
+    """
+    key = (backend_name, model_name)
+    with _lock:
+        pool = _pools.get(key)
+        # process وقعت (OOM مثلاً) → الـ pool ما بيقبلش شغل تاني
+        if pool is None or getattr(pool, '_broken', False):
+            workers = _pool_size()
+            # spawn: fork بعد ما torch شغّل threads ممكن يعمل deadlock
+            pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_pool_process,
+                initargs=(backend_name, model_name, max(1, (os.cpu_count() or 1) // workers)),
+            )
+            _pools[key] = pool
+    return pool
+
+
+def _map_bounded(pool: ProcessPoolExecutor, jobs: List[tuple], limit: int) -> List[Any]:
+    """
+    pool.map بحد أقصى limit جزء في نفس الوقت - ملف طويل ما يملاش الـ queue قدام الـ tasks التانية
+    """
+    results: List[Any] = [None] * len(jobs)
+    remaining = iter(enumerate(jobs))
+    in_flight = {}
+
+    def submit_next():
+        item = next(remaining, None)
+        if item is not None:
+            in_flight[pool.submit(_transcribe_segment, *item[1])] = item[0]
+
+    for _ in range(limit):
+        submit_next()
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[in_flight.pop(future)] = future.result()
+            submit_next()
+    return results
+
+
+def _worker_count(segments: int) -> int:
+    # Celery prefork workers are daemonic and can't spawn children
+    if multiprocessing.current_process().daemon:
+        return 1
+    return max(1, min(_pool_size(), segments))
+
+
+def transcribe_audio(audio, queue: Optional[str] = None, backend: Optional[str] = None,
+                     model: Optional[str] = None, parallel: bool = True) -> Dict[str, Any]:
+    """
+    تفريغ PCM (16kHz mono float32) - تقسيم على السكوت + الأجزاء بالتوازي
+
+    Returns:
+        {'text': '...', 'segments': [{'start': 0.0, 'end': 4.2, 'text': '...'}], 'duration': 2400}
+    """
+    config = _config()
+    backend_name = get_backend(backend).name
+    model_name = model or model_name_for_queue(queue)
+
+    duration = len(audio) / SAMPLE_RATE
+    ranges = split_on_silence(audio)
+    workers = _worker_count(len(ranges)) if parallel else 1
+
+    logger.info(
+        f"[Transcription] {duration:.0f}s audio → {len(ranges)} segments "
+        f"({workers} processes, {backend_name} '{model_name}')"
+    )
+
+    jobs = [
+        (backend_name, model_name, audio[start:end], start / SAMPLE_RATE, config['language'])
+        for start, end in ranges
+    ]
+    if workers == 1:
+        results = [_transcribe_segment(*job) for job in jobs]
+    else:
+        results = _map_bounded(_get_pool(backend_name, model_name), jobs, workers)
+
+    segments = [segment for result in results for segment in result]
+    return {
+        'text': ' '.join(segment['text'] for segment in segments),
+        'segments': segments,
+        'duration': int(duration),
+    }
+
+
+def transcribe_file(path: str, queue: Optional[str] = None) -> Dict[str, Any]:
+    """
+    تفريغ ملف صوت/فيديو بالمحرك المحدد في TRANSCRIPTION_CONFIG['backend']
+    """
+    return transcribe_audio(load_pcm(path), queue=queue)
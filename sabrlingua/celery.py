@@ -1,8 +1,30 @@
 import os
 from celery import Celery
+from celery.signals import worker_init, worker_process_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sabrlingua.settings')
 
 app = Celery('sabrlingua')
 app.config_from_object('django.conf:settings', namespace='CELERY')
-app.autodiscover_tasks(['step.tasks','ielts.tasks','general.tasks','esp.tasks'])
\ No newline at end of file
+app.autodiscover_tasks(['step.tasks','ielts.tasks','general.tasks','esp.tasks','placement_test.tasks','levels.tasks'])
+
+
+# ✅ Whisper بيتحمل مرة واحدة لكل process (sabr_questions/transcription.py)
+@worker_init.connect
+def _setup_transcription(sender=None, **kwargs):
+    from sabr_questions import transcription
+
+    queues = sender.app.amqp.queues
+    transcription.set_worker_queues((getattr(queues, 'consume_from', None) or queues).keys())
+
+    pool = sender.pool_cls if isinstance(sender.pool_cls, str) else sender.pool_cls.__module__
+    if 'prefork' not in pool and 'processes' not in pool:
+        # solo/threads: الـ tasks بتشتغل في نفس الـ process
+        transcription.warm_up()
+
+
+@worker_process_init.connect
+def _warm_up_transcription(**kwargs):
+    from sabr_questions import transcription
+
+    transcription.warm_up()
@@ -24,6 +24,135 @@ AI_GRADING_CONFIG = {
     'model': os.getenv('AI_GRADING_MODEL', 'gpt-4o-mini'),
     'temperature': float(os.getenv('AI_GRADING_TEMPERATURE', '0.3')),
     'max_tokens': int(os.getenv('AI_GRADING_MAX_TOKENS', '1000')),
+    # تصحيح أسئلة الكتابة بالتوازي (grade_writing_batch)
+    'max_concurrency': int(os.getenv('AI_GRADING_MAX_CONCURRENCY', '5')),
+    'item_timeout': float(os.getenv('AI_GRADING_ITEM_TIMEOUT', '60')),
+    # كاش نتائج التصحيح (WritingGradeCache) - 0 = بدون انتهاء
+    'cache_enabled': os.getenv('AI_GRADING_CACHE_ENABLED', 'True') == 'True',
+    'cache_ttl_days': int(os.getenv('AI_GRADING_CACHE_TTL_DAYS', '0')) or None,
+    # فلتر محلي للإجابات الفاشلة بشكل واضح (pre_grading.py)
+    'pre_grading_enabled': os.getenv('AI_GRADING_PRE_GRADING_ENABLED', 'True') == 'True',
+}
+
+# OpenAI client المشترك (sabr_questions/openai_client.py)
+OPENAI_CLIENT_CONFIG = {
+    # HTTP connection pool لكل process
+    'max_connections': int(os.getenv('OPENAI_MAX_CONNECTIONS', '50')),
+    'max_keepalive_connections': int(os.getenv('OPENAI_MAX_KEEPALIVE_CONNECTIONS', '20')),
+    # retry على 429 / timeout / 5xx - exponential backoff + jitter
+    'max_retries': int(os.getenv('OPENAI_MAX_RETRIES', '5')),
+    'backoff_base': float(os.getenv('OPENAI_BACKOFF_BASE', '1.0')),
+    'backoff_max': float(os.getenv('OPENAI_BACKOFF_MAX', '30')),
+    # حدود الـ account (Redis token bucket مشترك بين gunicorn و Celery) - 0 = بدون حد
+    'requests_per_minute': int(os.getenv('OPENAI_REQUESTS_PER_MINUTE', '500')),
+    'tokens_per_minute': int(os.getenv('OPENAI_TOKENS_PER_MINUTE', '200000')),
+    # أقصى انتظار لمكان في الـ bucket قبل ما الطلب يفشل
+    'limiter_max_wait': float(os.getenv('OPENAI_LIMITER_MAX_WAIT', '120')),
+}
+
+# توليد الأسئلة بالـ AI على أجزاء (sabr_questions/ai_generation.py)
+AI_GENERATION_CONFIG = {
+    'model': os.getenv('AI_GENERATION_MODEL', 'gpt-4o-mini'),
+    'max_output_tokens': int(os.getenv('AI_GENERATION_MAX_OUTPUT_TOKENS', '8000')),
+    # حجم كل جزء من المحتوى (tiktoken)
+    'chunk_tokens': int(os.getenv('AI_GENERATION_CHUNK_TOKENS', '12000')),
+    # أقصى أسئلة في الطلب الواحد عشان الـ JSON ما يتقطعش عند max_tokens
+    'questions_per_request': int(os.getenv('AI_GENERATION_QUESTIONS_PER_REQUEST', '15')),
+    'max_requests': int(os.getenv('AI_GENERATION_MAX_REQUESTS', '8')),
+    'max_concurrency': int(os.getenv('AI_GENERATION_MAX_CONCURRENCY', '4')),
+    'request_timeout': float(os.getenv('AI_GENERATION_REQUEST_TIMEOUT', '180')),
+}
+
+# تحديثات الـ AI jobs للـ dashboard - server-sent events (sabr_questions/job_events.py)
+AI_EVENTS_CONFIG = {
+    # الـ stream بيقفل بعدها والـ client بيعمل reconnect
+    'max_stream_seconds': int(os.getenv('AI_EVENTS_MAX_STREAM_SECONDS', '300')),
+    'heartbeat_seconds': int(os.getenv('AI_EVENTS_HEARTBEAT_SECONDS', '15')),
+    'retry_ms': int(os.getenv('AI_EVENTS_RETRY_MS', '3000')),
+}
+
+# استخراج نص كتب الـ PDF (sabr_questions/pdf_extraction.py)
+PDF_EXTRACTION_CONFIG = {
+    'max_pages': int(os.getenv('PDF_EXTRACTION_MAX_PAGES', '500')),
+    'max_download_mb': int(os.getenv('PDF_EXTRACTION_MAX_DOWNLOAD_MB', '100')),
+    # 0 = عدد الـ cores
+    'max_workers': int(os.getenv('PDF_EXTRACTION_MAX_WORKERS', '0')),
+    # أقل عدد صفحات يستاهل process لوحده
+    'min_pages_per_worker': int(os.getenv('PDF_EXTRACTION_MIN_PAGES_PER_WORKER', '5')),
+    # الصفحات اللي بترجع من الـ process مرة واحدة (حجم الذاكرة)
+    'pages_per_task': int(os.getenv('PDF_EXTRACTION_PAGES_PER_TASK', '10')),
+    'download_timeout': int(os.getenv('PDF_EXTRACTION_DOWNLOAD_TIMEOUT', '120')),
+}
+
+# اختيار أجزاء الكتب/الترانسكريبت المناسبة للتوليد - BM25 (sabr_questions/relevance.py)
+CONTENT_RELEVANCE_CONFIG = {
+    'enabled': os.getenv('CONTENT_RELEVANCE_ENABLED', 'True') == 'True',
+    # المحتوى الأكبر من كده بيتفلتر
+    'max_prompt_tokens': int(os.getenv('CONTENT_RELEVANCE_MAX_PROMPT_TOKENS', '24000')),
+    # حجم أجزاء الترانسكريبت (الكتب بتتقسم بالصفحة)
+    'chunk_tokens': int(os.getenv('CONTENT_RELEVANCE_CHUNK_TOKENS', '800')),
+    'k1': 1.5,
+    'b': 0.75,
+}
+
+# تفريغ الميديا (sabr_questions/transcription.py)
+TRANSCRIPTION_CONFIG = {
+    # whisper (openai-whisper float32) | faster_whisper (CTranslate2 - int8 على الـ CPU)
+    'backend': os.getenv('TRANSCRIPTION_BACKEND', 'whisper'),
+    'compute_type': os.getenv('TRANSCRIPTION_COMPUTE_TYPE', 'int8'),
+    'model': os.getenv('WHISPER_MODEL', 'tiny'),
+    # الـ queues اللي فيها tasks تفريغ (CELERY_TASK_ROUTES) - الـ workers التانية ما بتحملش Whisper
+    'queues': [queue for queue in os.getenv('WHISPER_QUEUES', 'cpu').split(',') if queue],
+    # model مختلف لـ queue معين: WHISPER_QUEUE_MODELS="cpu=base"
+    'queue_models': dict(
+        item.split('=', 1) for item in os.getenv('WHISPER_QUEUE_MODELS', '').split(',') if '=' in item
+    ),
+    # تحميل الـ model وقت تشغيل الـ worker بدل أول task
+    'warmup': os.getenv('WHISPER_WARMUP', 'True') == 'True',
+    'language': os.getenv('WHISPER_LANGUAGE', 'en'),
+    # الأوديو بيتقسم عند السكوت لأجزاء بالطول ده تقريباً وبتتفرغ بالتوازي
+    'segment_seconds': int(os.getenv('WHISPER_SEGMENT_SECONDS', '60')),
+    'max_segment_seconds': int(os.getenv('WHISPER_MAX_SEGMENT_SECONDS', '120')),
+    'min_silence_seconds': float(os.getenv('WHISPER_MIN_SILENCE_SECONDS', '0.5')),
+    'silence_threshold_db': float(os.getenv('WHISPER_SILENCE_THRESHOLD_DB', '-40')),
+    # 0 = عدد الـ cores
+    'max_workers': int(os.getenv('WHISPER_MAX_WORKERS', '0')),
+    'max_download_mb': int(os.getenv('WHISPER_MAX_DOWNLOAD_MB', '500')),
+    'download_timeout': int(os.getenv('WHISPER_DOWNLOAD_TIMEOUT', '300')),
+}
+
+# اختبار تحديد المستوى التكيفي (placement_test/services/adaptive_service.py)
+ADAPTIVE_PLACEMENT_CONFIG = {
+    'min_items': int(os.getenv('ADAPTIVE_MIN_ITEMS', '10')),
+    'max_items': int(os.getenv('ADAPTIVE_MAX_ITEMS', '25')),
+    'se_target': float(os.getenv('ADAPTIVE_SE_TARGET', '0.35')),
+    'writing_count': int(os.getenv('ADAPTIVE_WRITING_COUNT', '2')),
+}
+
+# pools الأسئلة العشوائية في Redis (placement_test/services/question_pools.py)
+QUESTION_POOL_CONFIG = {
+    'enabled': os.getenv('QUESTION_POOL_ENABLED', 'True') == 'True',
+    # حماية إضافية لو حصل تعديل من غير signals (queryset.update)
+    'ttl': int(os.getenv('QUESTION_POOL_TTL', str(60 * 60))),
+}
+
+# وقت الامتحانات على السيرفر (placement_test/services/exam_timer.py)
+EXAM_TIMER_CONFIG = {
+    # مهلة بعد انتهاء الوقت قبل ما الـ sweeper ينهي المحاولة (تأخير الشبكة)
+    'grace_seconds': int(os.getenv('EXAM_TIMER_GRACE_SECONDS', '120')),
+    'sweep_batch_size': int(os.getenv('EXAM_TIMER_SWEEP_BATCH_SIZE', '200')),
+    # أقصى عدد محاولات يسلمها sweeper الوحدات/المستويات في الـ run الواحد (الباقي للـ run الجاي)
+    'sweep_max_attempts': int(os.getenv('EXAM_TIMER_SWEEP_MAX_ATTEMPTS', '500')),
+    # مدة الـ lock بتاع الـ sweeper - لازم تكون أطول من أطول run
+    'sweep_lock_timeout': int(os.getenv('EXAM_TIMER_SWEEP_LOCK_TIMEOUT', '600')),
+}
+
+# كاش شجرة المستويات/الوحدات/الدروس (levels/course_cache.py) - بيتلغي تلقائياً مع أي تعديل
+COURSE_CACHE_CONFIG = {
+    'enabled': os.getenv('COURSE_CACHE_ENABLED', 'True') == 'True',
+    'timeout': int(os.getenv('COURSE_CACHE_TIMEOUT', str(60 * 60 * 24))),
+    # عدد دروس الوحدة - بيتلغي مع أي تغيير، بس مع LocMem كل worker ليه نسخته فلازم يخلص
+    'counts_timeout': int(os.getenv('COURSE_CACHE_COUNTS_TIMEOUT', '300')),
 }
 MOYASAR_SECRET_KEY = os.getenv('MOYASAR_SECRET_KEY')
 # settings.py
@@ -277,11 +406,57 @@ CSRF_TRUSTED_ORIGINS = [
     'https://admin.sabrlingua.com',
 ]
 
+REDIS_URL = os.getenv('REDIS_URL')
+
 # Celery
-CELERY_BROKER_URL = os.getenv('REDIS_URL')
-CELERY_RESULT_BACKEND = os.getenv('REDIS_URL')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Asia/Riyadh'
 
+# ✅ كل نوع شغل ليه queue و worker profile لوحده (start_celery.sh)
+#    cpu   → Whisper + استخراج PDF (threads - الـ task نفسه بيوزع على processes)
+#    llm   → توليد الأسئلة - OpenAI (threads - أغلب الوقت مستني الـ API)
+#    light → الـ sweeps وأي task من غير route
+CELERY_TASK_DEFAULT_QUEUE = 'light'
+CELERY_TASK_ROUTES = {
+    '*.tasks.*extract_book_task': {'queue': 'cpu'},
+    '*.tasks.*extract_media_task': {'queue': 'cpu'},
+    '*.tasks.*generate_skill_task': {'queue': 'llm'},
+    '*.tasks.*add_questions_to_skill_task': {'queue': 'llm'},
+}
+# tasks الـ cpu/llm بتستخدم acks_late - الـ task ما يتأكدش غير لما يخلص
+# لازم visibility_timeout أطول من أطول task وإلا Redis هيبعته لـ worker تاني وهو لسه شغال
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': int(os.getenv('CELERY_VISIBILITY_TIMEOUT', str(6 * 60 * 60))),
+}
+CELERY_BEAT_SCHEDULE = {
+    # ✅ إنهاء محاولات الامتحانات اللي وقتها خلص (placement_test/tasks.py + levels/tasks.py)
+    'sweep-expired-placement-attempts': {
+        'task': 'placement_test.tasks.sweep_expired_placement_attempts',
+        'schedule': 60.0,
+    },
+    'sweep-expired-levels-attempts': {
+        'task': 'levels.tasks.sweep_expired_levels_attempts',
+        'schedule': 60.0,
+    },
+}
+
+# Cache (Redis لو موجود - غير كده local memory)
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+            'KEY_PREFIX': 'sabrlingua',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
@@ -1,2 +1,60 @@
 #!/bin/bash
-celery -A sabrlingua worker --loglevel=info --pool=solo
\ No newline at end of file
+# ============================================================
+# Celery workers - worker لكل queue (الـ routes في sabrlingua/settings.py)
+#
+#   cpu   → Whisper + استخراج PDF  threads - concurrency قليل, prefetch=1
+#           التوازي جوه الـ task نفسه: الصفحات/أجزاء الصوت على ProcessPoolExecutor (process لكل core)
+#           ⚠️ مش prefork: الـ prefork children daemonic وما تقدرش تعمل processes
+#              (_worker_count في pdf_extraction / transcription بيرجع 1 → كل كتاب/ملف على core واحد)
+#   llm   → توليد الأسئلة (OpenAI) threads - concurrency عالي, الوقت كله مستني الـ API
+#   light → sweeps + beat           threads
+#
+# Local / Railway service واحد (التلاتة في نفس الـ container):
+#   ./start_celery.sh
+# Service لكل profile:
+#   ./start_celery.sh cpu   (أو CELERY_PROFILE=cpu)
+#
+# CELERY_CPU_CONCURRENCY (default 2 - كل task بيستخدم كل الـ cores، أكتر من كده الـ tasks بتتزاحم على نفس الـ CPU)
+# CELERY_LLM_CONCURRENCY (default 20) / CELERY_LIGHT_CONCURRENCY (default 4)
+# ============================================================
+
+PROFILE=${1:-${CELERY_PROFILE:-all}}
+
+worker() {
+    case "$1" in
+        cpu)
+            exec celery -A sabrlingua worker -Q cpu -n cpu@%h --loglevel=info \
+                --pool=threads --concurrency="${CELERY_CPU_CONCURRENCY:-2}" \
+                --prefetch-multiplier=1
+            ;;
+        llm)
+            exec celery -A sabrlingua worker -Q llm -n llm@%h --loglevel=info \
+                --pool=threads --concurrency="${CELERY_LLM_CONCURRENCY:-20}" \
+                --prefetch-multiplier=2
+            ;;
+        light)
+            # beat مرة واحدة بس - مع الـ light worker
+            exec celery -A sabrlingua worker -Q light -n light@%h -B --loglevel=info \
+                --pool=threads --concurrency="${CELERY_LIGHT_CONCURRENCY:-4}" \
+                --prefetch-multiplier=4
+            ;;
+        *)
+            echo "Unknown profile '$1' (cpu | llm | light | all)" >&2
+            return 1
+            ;;
+    esac
+}
+
+if [ "$PROFILE" = "all" ]; then
+    trap 'kill $(jobs -p) 2>/dev/null' INT TERM
+    worker cpu &
+    worker llm &
+    worker light &
+    # أي worker يقع → الـ container كله يقف والـ restart policy يشغله من الأول
+    wait -n
+    kill $(jobs -p) 2>/dev/null
+    wait
+    exit 1
+fi
+
+worker "$PROFILE"
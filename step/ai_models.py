@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from cloudinary.models import CloudinaryField
 
+from sabr_questions.models import ExtractedBookPageBase
+from sabr_questions.pdf_extraction import EXTRACTION_MODE_CHOICES, MODE_LAYOUT
+
 User = get_user_model()
 
 
@@ -19,8 +22,14 @@ class ExtractedBook(models.Model):
         resource_type='raw',
         folder='step/ai/books',
     )
+    # SHA-256 للملف (sabr_questions/extraction_store.py)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     extracted_text = models.TextField(blank=True, null=True, verbose_name="النص المستخرج")
     page_count = models.PositiveIntegerField(default=0, verbose_name="عدد الصفحات")
+    extraction_mode = models.CharField(
+        max_length=10, choices=EXTRACTION_MODE_CHOICES, default=MODE_LAYOUT,
+        verbose_name="طريقة الاستخراج"
+    )
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     error_message = models.TextField(blank=True, null=True)
     uploaded_by = models.ForeignKey(
@@ -39,6 +48,18 @@ class ExtractedBook(models.Model):
         return f"{self.name} ({self.status})"
 
 
+class ExtractedBookPage(ExtractedBookPageBase):
+    book = models.ForeignKey(ExtractedBook, on_delete=models.CASCADE, related_name='pages')
+
+    class Meta(ExtractedBookPageBase.Meta):
+        verbose_name = "Extracted Book Page"
+        verbose_name_plural = "Extracted Book Pages"
+        unique_together = [('book', 'page_number')]
+
+    def __str__(self):
+        return f"{self.book.name} - p{self.page_number}"
+
+
 class ExtractedMedia(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -57,8 +78,12 @@ class ExtractedMedia(models.Model):
         resource_type='raw',
         folder='step/ai/media',
     )
+    # SHA-256 للملف (sabr_questions/extraction_store.py)
+    content_hash = models.CharField(max_length=64, blank=True, default='', db_index=True)
     media_type = models.CharField(max_length=10, choices=MEDIA_TYPE_CHOICES)
     transcript = models.TextField(blank=True, null=True, verbose_name="الترانسكريبت")
+    # [{"start": 0.0, "end": 4.2, "text": "..."}]
+    transcript_segments = models.JSONField(default=list, blank=True)
     duration_seconds = models.PositiveIntegerField(default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     error_message = models.TextField(blank=True, null=True)
@@ -104,6 +129,8 @@ class AIGenerationJob(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING')
     error_message = models.TextField(blank=True, null=True)
     questions_created = models.PositiveIntegerField(default=0)
+    # checkpoint لكل جزء من التوليد (sabr_questions/ai_generation.py) - الـ retry بيكمل من عندها
+    chunk_checkpoints = models.JSONField(default=dict, blank=True)
 
     created_by = models.ForeignKey(
         User, on_delete=models.SET_NULL, null=True, blank=True,
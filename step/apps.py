@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class StepConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'step'
+
+    def ready(self):
+        # ✅ نشر تحديثات الـ AI jobs للـ dashboard
+        from step import signals  # noqa: F401
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 23:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('step', '0003_stepsubscriptionplan_stepsubscription'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='aigenerationjob',
+            name='chunk_checkpoints',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
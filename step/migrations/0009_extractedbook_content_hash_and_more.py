@@ -0,0 +1,23 @@
+# Generated by Django 5.2 on 2026-10-18 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('step', '0008_extractedmedia_transcript_segments'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='extractedbook',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='extractedmedia',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=64),
+        ),
+    ]
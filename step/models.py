@@ -330,4 +330,4 @@ class STEPSubscription(TimeStampedModel):
         )
 
 # Import AI models عشان يتعمل migrate معاهم
-from .ai_models import ExtractedBook, ExtractedMedia, AIGenerationJob
\ No newline at end of file
+from .ai_models import ExtractedBook, ExtractedBookPage, ExtractedMedia, AIGenerationJob
\ No newline at end of file
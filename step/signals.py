@@ -0,0 +1,16 @@
+# step/signals.py
+
+from step.ai_models import AIGenerationJob, ExtractedBook, ExtractedMedia
+from sabr_questions.job_events import connect_job_events
+
+
+# ============================================
+# تحديثات الكتب/الميديا/الـ jobs → ai/events/ (sabr_questions/job_events.py)
+# ============================================
+
+connect_job_events(
+    'step',
+    book_model=ExtractedBook,
+    media_model=ExtractedMedia,
+    job_model=AIGenerationJob,
+)